@@ -0,0 +1,171 @@
+#### File: analyzer_profile.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Opt-in per-phase and per-production profiling of the syntax analyzer
+
+
+# Json module to dump the profiles
+import json
+# Time module for the timers
+import time
+# Context manager decorator for the phase timers
+from contextlib import contextmanager
+
+from syntax_analyzer import SyntaxAnalyzer, tokenize
+
+
+# Methods of the analyzer that are not grammar productions
+NOT_PRODUCTIONS = ('parse', 'parse_recovering')
+
+
+# ProductionStats class
+# Counters of one production; time, tokens and nodes are inclusive of the nested productions,
+# counted once for recursive calls (like the cumulative time of cProfile)
+class ProductionStats:
+    __slots__ = ('name', 'calls', 'seconds', 'self_seconds', 'tokens', 'nodes', 'max_depth', 'active')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        # Time spent in the production, with and without the nested productions
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+        # Tokens consumed and nodes created
+        self.tokens = 0
+        self.nodes = 0
+        # Deepest nesting of productions at which it was entered
+        self.max_depth = 0
+        # Number of calls of the production being run (above 1 in recursive calls)
+        self.active = 0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'active'}
+
+
+# AnalyzerProfile class
+# Collects the timers and counters of the phases (lexing, parsing, ...) and of the
+# productions of the analyzers it instruments. Instrumentation replaces the methods
+# of one analyzer instance by counting wrappers, so analyzers that are not
+# instrumented run the plain methods, without any overhead.
+class AnalyzerProfile:
+    def __init__(self):
+        # Phase name -> [calls, seconds]
+        self.phases = {}
+        # Production name -> ProductionStats
+        self.productions = {}
+        # Hot-path counters
+        self.advance_calls = 0
+        self.match_calls = 0
+        self.nodes = 0
+        # Current and deepest nesting of productions
+        self.depth = 0
+        self.max_depth = 0
+        # Time spent in the nested productions of each production being run
+        # (the first entry collects the time of the outermost productions)
+        self.child_seconds = [0.0]
+
+    # Time a phase: `with profile.phase('lex'): ...`
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+
+    # Wrap the methods of `analyzer` and return it
+    def instrument(self, analyzer: SyntaxAnalyzer):
+        for name in dir(type(analyzer)):
+            if name.startswith('parse_') and name not in NOT_PRODUCTIONS:
+                setattr(analyzer, name, self.wrap_production(analyzer, name, getattr(analyzer, name)))
+        analyzer.advance = self.wrap_counter(analyzer.advance, 'advance_calls')
+        analyzer.match = self.wrap_counter(analyzer.match, 'match_calls')
+        analyzer.create_node = self.wrap_counter(analyzer.create_node, 'nodes')
+        analyzer.create_leaf = self.wrap_counter(analyzer.create_leaf, 'nodes')
+        return analyzer
+
+    # Count the calls of `function` in the `counter` attribute
+    def wrap_counter(self, function, counter: str):
+        profile = self
+
+        def wrapper(*args):
+            setattr(profile, counter, getattr(profile, counter) + 1)
+            return function(*args)
+        return wrapper
+
+    # Time and count the calls of the production `function` of `analyzer`
+    def wrap_production(self, analyzer, name: str, function):
+        profile = self
+        stats = self.productions.setdefault(name, ProductionStats(name))
+        perf_counter = time.perf_counter
+
+        def wrapper(*args):
+            depth = profile.depth = profile.depth + 1
+            if depth > stats.max_depth:
+                stats.max_depth = depth
+                if depth > profile.max_depth:
+                    profile.max_depth = depth
+            token_index, nodes = analyzer.token_index, profile.nodes
+            child_seconds = profile.child_seconds
+            child_seconds.append(0.0)
+            stats.active += 1
+            start = perf_counter()
+            try:
+                return function(*args)
+            finally:
+                # Also counted when the production fails, so that recovered errors show up
+                elapsed = perf_counter() - start
+                nested = child_seconds.pop()
+                child_seconds[-1] += elapsed
+                profile.depth = depth - 1
+                stats.active -= 1
+                stats.calls += 1
+                stats.self_seconds += elapsed - nested
+                if not stats.active:
+                    # Outermost call: the nested recursive calls are already included
+                    stats.seconds += elapsed
+                    stats.tokens += analyzer.token_index - token_index
+                    stats.nodes += profile.nodes - nodes
+        return wrapper
+
+    def to_dict(self):
+        return {
+            'phases': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.phases.items()},
+            'productions': {name: stats.to_dict() for name, stats in self.productions.items() if stats.calls},
+            'advance_calls': self.advance_calls,
+            'match_calls': self.match_calls,
+            'nodes': self.nodes,
+            'max_depth': self.max_depth,
+        }
+
+    def dump(self, file_path: str):
+        with open(file_path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    # Human-readable report, productions sorted by self time
+    def report(self):
+        lines = ["----------PROFILE----------"]
+        for name, (calls, seconds) in self.phases.items():
+            lines.append(f'phase {name:<18} {calls:8d} calls {seconds * 1000:10.3f} ms')
+        lines.append(f'{self.advance_calls} advance, {self.match_calls} match, {self.nodes} nodes, '
+                     f'max depth {self.max_depth}')
+        lines.append(f'{"production":<18}{"calls":>9}{"total ms":>11}{"self ms":>10}{"tokens":>9}{"nodes":>9}{"depth":>7}')
+        productions = sorted((stats for stats in self.productions.values() if stats.calls),
+                             key=lambda stats: stats.self_seconds, reverse=True)
+        for stats in productions:
+            lines.append(f'{stats.name:<18}{stats.calls:9d}{stats.seconds * 1000:11.3f}{stats.self_seconds * 1000:10.3f}'
+                         f'{stats.tokens:9d}{stats.nodes:9d}{stats.max_depth:7d}')
+        return '\n'.join(lines)
+
+
+# Lex and parse a source under a new profile and return the profile
+# A parsing error is raised as is: profile invalid sources with recover=True
+def profile_source(source_code: str, analyzer_class=SyntaxAnalyzer, **options):
+    profile = AnalyzerProfile()
+    with profile.phase('lex'):
+        tokens = tokenize(source_code)
+    analyzer = profile.instrument(analyzer_class(tokens, **options))
+    with profile.phase('parse'):
+        analyzer.parse()
+    return profile
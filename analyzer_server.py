@@ -0,0 +1,324 @@
+#### File: analyzer_server.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Long-running analyzer server (Unix socket or stdin/stdout) and its thin client
+
+
+# Argparse module to parse the command line
+import argparse
+# Asyncio module for the server connections
+import asyncio
+# Io module to capture the text outputs
+import io
+# Json module for the request protocol
+import json
+# Os module for the socket file and the absolute paths
+import os
+# Socket module for the client
+import socket
+# Sys module for the standard input and output
+import sys
+# Time module to measure the analysis time
+import time
+# Process pool to serve the requests in parallel
+from concurrent.futures import ProcessPoolExecutor
+# Partial to bind the server options of the worker function
+from functools import partial
+
+from syntax_analyzer import ParsingError, SyntaxAnalyzer, get_parse_cache, tokenize
+from parse_cache import flatten_tree
+from parse_tree_io import FORMATS
+from stream_parser import open_stdin_reader
+
+
+# Protocol: one JSON object per line in each direction.
+#   Request:  {"id": 1, "method": "analyze", "params": {...}}
+#   Response: {"id": 1, "result": {...}} or {"id": 1, "error": {"message": ...}}
+# Responses of a connection may come back in any order, matched by their id.
+# Methods:
+#   analyze   params: "path" (absolute, read by the server) or "source",
+#             "recover" (report every syntax error), "output" ("text" or "jsonl":
+#             the output of the command line in that format), "tree" (preorder
+#             [label, number of children, line or null] records of the parse tree)
+#             result: "tokens", "errors" (list of {"message", "line", "expected",
+#             "found"}), "elapsed" (seconds) and the requested "output" and "tree"
+#   ping      result: "pong"
+#   shutdown  stops the server once the pending requests are answered
+
+# Longest request line accepted (sources can be sent inline)
+MAX_LINE = 64 * 1024 * 1024
+
+
+# Structured form of a syntax error
+def error_record(exception):
+    if isinstance(exception, ParsingError):
+        return {'message': str(exception), 'line': exception.line_number,
+                'expected': exception.expected, 'found': exception.found}
+    return {'message': f'{type(exception).__name__}: {exception}'}
+
+
+# Serve one analyze request; defined at module level so it can run in worker processes
+def analyze_request(params, cache_dir: str = None):
+    recover = bool(params.get('recover', False))
+    output = params.get('output')
+    if output is not None and (output not in FORMATS or FORMATS[output][1]):
+        raise ValueError(f'Unsupported output format: {output}')
+    start = time.perf_counter()
+    if 'source' in params:
+        source_code = params['source']
+    else:
+        with open(params['path'], 'r') as file:
+            source_code = file.read()
+
+    parse_tree = None
+    diagnostics = []
+    if cache_dir is not None and not recover:
+        # Reuse the tokens and tree of an identical source analyzed before
+        tokens, parse_tree, error = get_parse_cache(cache_dir).analyze_source_result(source_code)
+        if error is not None:
+            diagnostics.append(error)
+    else:
+        tokens = tokenize(source_code)
+        analyzer = SyntaxAnalyzer(tokens, recover=recover)
+        try:
+            analyzer.parse()
+            parse_tree = analyzer.parse_tree
+        except Exception as exception:
+            diagnostics.append(exception)
+        diagnostics[:0] = analyzer.diagnostics
+
+    result = {
+        'tokens': len(tokens),
+        'errors': [error_record(diagnostic) for diagnostic in diagnostics],
+        'elapsed': time.perf_counter() - start,
+    }
+    if output is not None:
+        buffer = io.StringIO()
+        FORMATS[output][0](buffer, tokens, parse_tree, diagnostics)
+        result['output'] = buffer.getvalue()
+    if params.get('tree'):
+        result['tree'] = flatten_tree(parse_tree) if parse_tree is not None else None
+    return result
+
+
+# Run in each worker process once, so that the first requests do not pay for its start
+def warm_up():
+    return os.getpid()
+
+
+# AnalyzerServer class
+# Reads requests from Unix socket connections or from the standard input and
+# answers them as soon as they are served by the pool of worker processes,
+# which keep the modules imported and the regular expressions compiled
+class AnalyzerServer:
+    def __init__(self, workers: int = None, cache_dir: str = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.executor = None
+        # Set by the shutdown method
+        self.stopping = None
+
+    async def start(self):
+        self.stopping = asyncio.Event()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Start every worker now
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, warm_up) for _ in range(self.workers)))
+
+    def stop(self):
+        self.executor.shutdown()
+
+    # Answer one request line
+    async def respond(self, line: bytes):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            method = request.get('method')
+            params = request.get('params') or {}
+            if method == 'analyze':
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor,
+                                                    partial(analyze_request, params, cache_dir=self.cache_dir))
+            elif method == 'ping':
+                result = 'pong'
+            elif method == 'shutdown':
+                self.stopping.set()
+                result = None
+            else:
+                raise ValueError(f'Unknown method: {method}')
+            response = {'id': request_id, 'result': result}
+        except Exception as exception:
+            response = {'id': request_id, 'error': error_record(exception)}
+        return json.dumps(response).encode() + b'\n'
+
+    # Serve the requests of one stream until its end, writing each response once ready
+    async def serve_stream(self, reader, write):
+        pending = set()
+
+        async def answer(line):
+            write(await self.respond(line))
+
+        # Stop reading on a shutdown request, even from another connection
+        shutdown = asyncio.create_task(self.stopping.wait())
+        while True:
+            reading = asyncio.create_task(reader.readline())
+            await asyncio.wait((reading, shutdown), return_when=asyncio.FIRST_COMPLETED)
+            if not reading.done():
+                reading.cancel()
+                break
+            line = reading.result()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(answer(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        shutdown.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+    # Serve the connections of a Unix socket until a shutdown request
+    async def serve_socket(self, socket_path: str):
+        await self.start()
+
+        connections = set()
+
+        async def serve_connection(reader, writer):
+            connections.add(asyncio.current_task())
+            try:
+                await self.serve_stream(reader, writer.write)
+                await writer.drain()
+            finally:
+                writer.close()
+                connections.discard(asyncio.current_task())
+
+        server = await asyncio.start_unix_server(serve_connection, socket_path, limit=MAX_LINE)
+        try:
+            async with server:
+                await self.stopping.wait()
+                # Let the connections answer their pending requests
+                await asyncio.gather(*connections, return_exceptions=True)
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.stop()
+
+    # Serve the requests of the standard input on the standard output
+    async def serve_stdio(self):
+        await self.start()
+        reader = await open_stdin_reader(limit=MAX_LINE)
+
+        def write(data):
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+
+        try:
+            await self.serve_stream(reader, write)
+        finally:
+            self.stop()
+
+
+# AnalyzerClient class
+# Thin blocking client of a server listening on a Unix socket
+class AnalyzerClient:
+    def __init__(self, socket_path: str):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.file = self.socket.makefile('rwb')
+        self.next_id = 0
+
+    def send(self, method: str, params=None):
+        self.next_id += 1
+        request = {'id': self.next_id, 'method': method, 'params': params or {}}
+        self.file.write(json.dumps(request).encode() + b'\n')
+        return self.next_id
+
+    # Send every request, then collect the responses: the server works on all of them
+    # at once. Returns the responses (result or error objects) in the order of the requests
+    def call_many(self, requests):
+        ids = [self.send(method, params) for method, params in requests]
+        self.file.flush()
+        responses = {}
+        while len(responses) < len(ids):
+            line = self.file.readline()
+            if not line:
+                raise ConnectionError('Connection closed by the server')
+            response = json.loads(line)
+            responses[response['id']] = response
+        return [responses[request_id] for request_id in ids]
+
+    # Result of a single request; raises an Exception on a protocol error
+    def call(self, method: str, params=None):
+        response = self.call_many([(method, params)])[0]
+        if 'error' in response:
+            raise Exception(response['error']['message'])
+        return response['result']
+
+    # Analyze files (paths are sent absolute since the server has its own working directory)
+    def analyze_files(self, paths, **params):
+        return self.call_many([('analyze', dict(params, path=os.path.abspath(path))) for path in paths])
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Analyze files through a server and print their status (and outputs)
+# Returns the number of files that failed
+def run_client(socket_path: str, paths, recover: bool = False, output: str = None):
+    failures = 0
+    params = {'recover': recover}
+    if output is not None:
+        params['output'] = output
+    with AnalyzerClient(socket_path) as client:
+        for path, response in zip(paths, client.analyze_files(paths, **params)):
+            if 'error' in response:
+                failures += 1
+                print(f'FAIL  {path}\t{response["error"]["message"]}')
+                continue
+            result = response['result']
+            if output is not None:
+                sys.stdout.write(result['output'])
+            if result['errors']:
+                failures += 1
+                print(f'FAIL  {path}\t' + '; '.join(error['message'] for error in result['errors']))
+            else:
+                print(f'OK    {path}\t({result["tokens"]} tokens, {result["elapsed"] * 1000:.2f} ms)')
+    return failures
+
+
+# Main
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description='Analyzer server and client')
+    subparsers = argument_parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help='run the server')
+    serve_parser.add_argument('--socket', metavar='PATH', default=None, help='listen on a Unix socket (default: stdin/stdout)')
+    serve_parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: CPU count)')
+    serve_parser.add_argument('--cache', metavar='DIR', default=None, help='reuse tokens and parse trees cached in DIR')
+    client_parser = subparsers.add_parser('client', help='analyze files through a running server')
+    client_parser.add_argument('--socket', metavar='PATH', required=True, help='Unix socket of the server')
+    client_parser.add_argument('paths', nargs='*', help='Java source files')
+    client_parser.add_argument('--recover', action='store_true', help='report every syntax error')
+    client_parser.add_argument('--output', choices=[name for name, (_, binary) in FORMATS.items() if not binary],
+                               default=None, help='also print the output of each file in this format')
+    client_parser.add_argument('--shutdown', action='store_true', help='stop the server afterwards')
+    arguments = argument_parser.parse_args()
+
+    if arguments.command == 'serve':
+        server = AnalyzerServer(arguments.workers, arguments.cache)
+        if arguments.socket is not None:
+            asyncio.run(server.serve_socket(arguments.socket))
+        else:
+            asyncio.run(server.serve_stdio())
+    else:
+        failures = run_client(arguments.socket, arguments.paths, arguments.recover, arguments.output)
+        if arguments.shutdown:
+            with AnalyzerClient(arguments.socket) as client:
+                client.call('shutdown')
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,318 @@
+#### File: benchmark.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Throughput benchmarks for the lexer, parsers, interpreters and optimizer of the 2023 Compiler Term Project
+
+
+# Regular expressions module
+import re
+# Sys and platform modules to describe the environment in the JSON output
+import sys
+import platform
+# Argparse module to parse the command line
+import argparse
+# Json module for the machine-readable output
+import json
+# Math module for the scaling exponents
+import math
+# Glob module to find the example files
+import glob
+# Os module to build paths relative to this file
+import os
+# Time module for the timers
+import time
+# Tracemalloc module to measure peak memory
+import tracemalloc
+
+from syntax_analyzer import SyntaxAnalyzer, Token, TokenStream, tokenize, iter_tokens
+from slr_parser import SLRParser, get_tables
+from parse_cache import flatten_tree
+from corpus_generator import SHAPES, generate_source
+from expression_ast import count_nodes
+from interpreter import SUBSET_PROGRAMS, execute, load_program
+from optimizer import PassManager
+
+
+# Directory holding the sample Java sources
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples')
+
+
+# Token patterns of the previous lexer engine: one named group per terminal,
+# tried in order, so every identifier was first tested against the keywords
+ORDERED_TOKEN_PATTERNS = [
+    ('vtype', r'int|double|boolean|char|String|void'),
+    ('num', r'-?\d+'),
+    ('character', r"'.'"),
+    ('boolstr', r'true|false'),
+    ('literal', r'"[^"]*"'),
+    ('if', r'if'),
+    ('else', r'else'),
+    ('while', r'while'),
+    ('return', r'return'),
+    ('class', r'class'),
+    ('comment', r'//.*'),
+    ('id', r'[A-Za-z_]\w*'),
+    ('addsub', r'\+|-'),
+    ('multdiv', r'\*|/'),
+    ('assign', r'='),
+    ('comp', r'==|!=|<=|>=|<|>'),
+    ('semi', r';'),
+    ('comma', r','),
+    ('lparen', r'\('),
+    ('rparen', r'\)'),
+    ('lbrace', r'{'),
+    ('rbrace', r'}'),
+    ('whitespace', r'\s+')
+]
+ORDERED_TOKEN_REGEX = re.compile('|'.join('(?P<%s>%s)' % pair for pair in ORDERED_TOKEN_PATTERNS))
+
+
+# Reference implementation: the original `tokenize`, which rebuilds and
+# re-joins the pattern list on every call and materializes the whole list
+def tokenize_uncompiled(source_code: str):
+    patterns = list(ORDERED_TOKEN_PATTERNS)
+    combined_pattern = '|'.join('(?P<%s>%s)' % pair for pair in patterns)
+    tokens = []
+    line_number = 1
+    for match in re.finditer(combined_pattern, source_code):
+        token_type = match.lastgroup
+        token_value = match.group(token_type)
+        if token_type != 'whitespace' and token_type != 'comment':
+            tokens.append(Token(token_type, token_value, line_number))
+        if '\n' in token_value:
+            line_number += token_value.count('\n')
+    return tokens
+
+
+# Previous engine: compiled ordered alternation, token type from `lastgroup`
+def tokenize_ordered(source_code: str):
+    tokens = []
+    line_number = 1
+    for match in ORDERED_TOKEN_REGEX.finditer(source_code):
+        token_type = match.lastgroup
+        token_value = match.group()
+        if token_type != 'whitespace' and token_type != 'comment':
+            tokens.append(Token(token_type, token_value, line_number))
+        if '\n' in token_value:
+            line_number += token_value.count('\n')
+    return tokens
+
+
+# Build a synthetic source by repeating the example files `scale` times
+def load_scaled_examples(scale: int):
+    sources = []
+    for file_path in sorted(glob.glob(os.path.join(EXAMPLES_DIR, '*.java'))):
+        with open(file_path, 'r') as file:
+            sources.append(file.read())
+    return '\n'.join(sources) * scale
+
+
+# Consume the generator without keeping the tokens alive
+def drain_iter_tokens(source_code: str):
+    count = 0
+    for _ in iter_tokens(source_code):
+        count += 1
+    return count
+
+
+# Time `function(source_code)` and measure its peak memory
+def measure(function, source_code: str, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(source_code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    function(source_code)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+# Compare the original lexer and the previous engine against the current ones
+def run_lexer_benchmark(scale: int, repeat: int):
+    source_code = load_scaled_examples(scale)
+    token_count = len(tokenize(source_code))
+    print(f'Source: {len(source_code)} characters, {token_count} tokens (scale x{scale})')
+    candidates = [
+        ('tokenize (uncompiled)', tokenize_uncompiled),
+        ('tokenize (ordered regex)', tokenize_ordered),
+        ('tokenize', tokenize),
+        ('iter_tokens (streamed)', drain_iter_tokens),
+        ('TokenStream (compact)', TokenStream.from_source),
+    ]
+    for name, function in candidates:
+        best, peak = measure(function, source_code, repeat)
+        print(f'{name:<24} {best * 1000:10.2f} ms  {token_count / best:12.0f} tokens/s  '
+              f'peak {peak / 1024:10.1f} KiB')
+
+
+# Parse `tokens` with a new parser from `parser_factory` and return the parser
+def run_parser(parser_factory, tokens):
+    parser = parser_factory(tokens)
+    parser.parse()
+    return parser
+
+
+# Compare the recursive-descent SyntaxAnalyzer against the table-driven SLRParser
+def run_parser_benchmark(scale: int, repeat: int):
+    # Build (or load) the tables outside of the timed section
+    get_tables()
+    # Top-level declarations are accepted by both parsers
+    tokens = tokenize(generate_source('declarations', scale))
+    trees = [flatten_tree(run_parser(parser_class, tokens).parse_tree) for parser_class in (SyntaxAnalyzer, SLRParser)]
+    print(f'Source: {len(tokens)} tokens, {len(trees[0])} nodes, identical trees: {trees[0] == trees[1]}')
+    for name, parser_class in (('SyntaxAnalyzer', SyntaxAnalyzer), ('SLRParser', SLRParser)):
+        best, peak = measure(lambda tokens: run_parser(parser_class, tokens), tokens, repeat)
+        print(f'{name:<24} {best * 1000:10.2f} ms  {len(tokens) / best:12.0f} tokens/s  '
+              f'peak {peak / 1024:10.1f} KiB')
+
+
+# Parsers measured by the suite
+# SyntaxAnalyzer does not follow the grammar for every construct (functions, classes),
+# so it runs in recovering mode and the number of errors it reports is recorded
+SUITE_PARSERS = (
+    ('SyntaxAnalyzer', lambda tokens: SyntaxAnalyzer(tokens, recover=True)),
+    ('SLRParser', SLRParser),
+)
+
+
+# Measure the lexer and the parsers on every shape and size of generated source
+# Returns the list of records (one per shape, size and component)
+def run_suite(shapes, sizes, repeat: int):
+    # Build (or load) the tables outside of the timed section
+    get_tables()
+    records = []
+    for shape in shapes:
+        for size in sizes:
+            source_code = generate_source(shape, size)
+            tokens = tokenize(source_code)
+            base = {'shape': shape, 'size': size, 'characters': len(source_code), 'tokens': len(tokens)}
+
+            best, peak = measure(tokenize, source_code, repeat)
+            records.append(dict(base, component='tokenize', seconds=best, peak_bytes=peak,
+                                tokens_per_second=len(tokens) / best))
+
+            for name, parser_factory in SUITE_PARSERS:
+                try:
+                    parser = run_parser(parser_factory, tokens)
+                except RecursionError:
+                    records.append(dict(base, component=name, error='RecursionError'))
+                    continue
+                best, peak = measure(lambda tokens: run_parser(parser_factory, tokens), tokens, repeat)
+                nodes = count_nodes(parser.parse_tree)
+                records.append(dict(base, component=name, seconds=best, peak_bytes=peak, nodes=nodes,
+                                    errors=len(getattr(parser, 'diagnostics', ())),
+                                    tokens_per_second=len(tokens) / best, nodes_per_second=nodes / best))
+    return records
+
+
+# Print the records as a table, followed by the scaling of each component
+def print_suite(records):
+    print(f'{"shape":<18}{"size":>7}{"tokens":>9}  {"component":<16}{"ms":>10}{"tokens/s":>12}'
+          f'{"nodes/s":>12}{"peak KiB":>11}{"errors":>8}')
+    for record in records:
+        if 'error' in record:
+            print(f'{record["shape"]:<18}{record["size"]:>7}{record["tokens"]:>9}  {record["component"]:<16}'
+                  f'{record["error"]:>10}')
+            continue
+        nodes_per_second = f'{record["nodes_per_second"]:12.0f}' if 'nodes_per_second' in record else ' ' * 12
+        errors = f'{record["errors"]:8d}' if 'errors' in record else ''
+        print(f'{record["shape"]:<18}{record["size"]:>7}{record["tokens"]:>9}  {record["component"]:<16}'
+              f'{record["seconds"] * 1000:10.2f}{record["tokens_per_second"]:12.0f}{nodes_per_second}'
+              f'{record["peak_bytes"] / 1024:11.1f}{errors}')
+
+    # Scaling: exponent k of time ~ tokens^k between the smallest and largest sizes (1 = linear)
+    print("----------SCALING----------")
+    series = {}
+    for record in records:
+        if 'seconds' in record:
+            series.setdefault((record['shape'], record['component']), []).append(record)
+    for (shape, component), points in series.items():
+        if len(points) > 1 and points[-1]['tokens'] > points[0]['tokens']:
+            exponent = (math.log(points[-1]['seconds'] / points[0]['seconds'])
+                        / math.log(points[-1]['tokens'] / points[0]['tokens']))
+            print(f'{shape:<18}{component:<16} time ~ tokens^{exponent:.2f}')
+
+
+# Time `scale` calls of each subset program with the bytecode interpreter and the tree-walking evaluator
+def run_interpreter_benchmark(scale: int, repeat: int):
+    for name, (source_code, function_name, arguments) in SUBSET_PROGRAMS.items():
+        functions, evaluator = load_program(source_code)
+        function = functions[function_name]
+        candidates = (
+            ('TreeEvaluator', lambda: evaluator.call(function_name, arguments)),
+            ('bytecode', lambda: execute(function, list(arguments))),
+        )
+        results = [run() for _, run in candidates]
+        print(f'{name}: {function_name}{arguments} = {results[0]}, {len(function)} instructions, '
+              f'identical results: {results[0] == results[1]}')
+        timings = []
+        for candidate, run in candidates:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(scale):
+                    run()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+            print(f'{candidate:<24} {best * 1000:10.2f} ms  {scale / best:12.0f} calls/s')
+        print(f'{"speedup":<24} {timings[0] / timings[1]:10.2f} x')
+
+
+# Time `scale` calls of each subset program before and after the optimization passes
+def run_optimizer_benchmark(scale: int, repeat: int):
+    pass_manager = PassManager()
+    for name, (source_code, function_name, arguments) in SUBSET_PROGRAMS.items():
+        function = load_program(source_code)[0][function_name]
+        start = time.perf_counter()
+        optimized = pass_manager.run(function)
+        elapsed = time.perf_counter() - start
+        results = [execute(candidate, list(arguments)) for candidate in (function, optimized)]
+        print(f'{name}: {function_name}{arguments} = {results[0]}, identical results: {results[0] == results[1]}, '
+              f'optimized in {elapsed * 1000:.2f} ms')
+        timings = []
+        for candidate, compiled in (('bytecode', function), ('optimized bytecode', optimized)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(scale):
+                    execute(compiled, list(arguments))
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+            print(f'{candidate:<24} {best * 1000:10.2f} ms  {scale / best:12.0f} calls/s  '
+                  f'{len(compiled):5d} instructions {compiled.register_count:4d} registers')
+        print(f'{"speedup":<24} {timings[0] / timings[1]:10.2f} x')
+    print(pass_manager.report())
+
+
+# Main
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description='Lexer, parser, interpreter and optimizer benchmarks')
+    argument_parser.add_argument('target', choices=['lexer', 'parser', 'suite', 'interpreter', 'optimizer'],
+                                 help='component to benchmark')
+    argument_parser.add_argument('--scale', type=int, default=200, help='size factor of the generated source')
+    argument_parser.add_argument('--repeat', type=int, default=5, help='number of timed runs (the best one is kept)')
+    argument_parser.add_argument('--shape', choices=sorted(SHAPES), action='append',
+                                 help='suite: shape of the generated sources (repeatable, default: all)')
+    argument_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 40, 160],
+                                 help='suite: sizes of the generated sources, for the scaling curves')
+    argument_parser.add_argument('--json', metavar='FILE', default=None, help='suite: also write the records to FILE')
+    arguments = argument_parser.parse_args()
+
+    if arguments.target == 'lexer':
+        run_lexer_benchmark(arguments.scale, arguments.repeat)
+    elif arguments.target == 'parser':
+        run_parser_benchmark(arguments.scale * 30, arguments.repeat)
+    elif arguments.target == 'interpreter':
+        run_interpreter_benchmark(arguments.scale, arguments.repeat)
+    elif arguments.target == 'optimizer':
+        run_optimizer_benchmark(arguments.scale, arguments.repeat)
+    else:
+        records = run_suite(arguments.shape or sorted(SHAPES), sorted(arguments.sizes), arguments.repeat)
+        print_suite(records)
+        if arguments.json is not None:
+            with open(arguments.json, 'w') as file:
+                json.dump({'python': sys.version, 'platform': platform.platform(), 'records': records}, file, indent=2)
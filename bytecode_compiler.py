@@ -0,0 +1,424 @@
+#### File: bytecode_compiler.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Compilation of the functions of SLRParser trees into register-based bytecode
+
+
+# Array module for the compact instruction arrays
+from array import array
+# Sys module to get program's arguments
+import sys
+
+from syntax_analyzer import tokenize
+from slr_parser import SLRParser
+from semantic_analyzer import SemanticAnalyzer, Symbol, SymbolTable, first_line
+from expression_ast import BinaryOp, Constant, ExpressionLowering
+
+
+# Opcodes. Every instruction has an opcode and three operands (a, b, c), which are
+# register numbers, except the jump targets (instruction numbers).
+MOVE = 0         # r[a] = r[b]
+INT_TO_DOUBLE = 1  # r[a] = float(r[b])
+CHAR_TO_INT = 2  # r[a] = ord(r[b])
+ADD = 3          # r[a] = r[b] + r[c] (int, wrapped around)
+SUB = 4          # r[a] = r[b] - r[c] (int)
+MUL = 5          # r[a] = r[b] * r[c] (int)
+DIV = 6          # r[a] = r[b] / r[c] (int, truncated; ArithmeticError on zero)
+DADD = 7         # r[a] = r[b] + r[c] (double)
+DSUB = 8         # r[a] = r[b] - r[c] (double)
+DMUL = 9         # r[a] = r[b] * r[c] (double)
+DDIV = 10        # r[a] = r[b] / r[c] (double)
+CONCAT = 11      # r[a] = string(r[b]) + string(r[c])
+JUMP = 12        # go to a
+JUMP_IF = 13     # go to b if r[a]
+JUMP_IF_NOT = 14  # go to b if not r[a]
+JUMP_LT = 15     # go to c if r[a] < r[b]
+JUMP_GE = 16     # go to c if r[a] >= r[b]
+JUMP_GT = 17     # go to c if r[a] > r[b]
+JUMP_LE = 18     # go to c if r[a] <= r[b]
+JUMP_EQ = 19     # go to c if r[a] == r[b]
+JUMP_NE = 20     # go to c if r[a] != r[b]
+RETURN = 21      # return r[a]
+REM = 22         # r[a] = r[b] % r[c] (int, sign of r[b]; ArithmeticError on zero), only from the optimizer
+
+OPCODE_NAMES = ('MOVE', 'INT_TO_DOUBLE', 'CHAR_TO_INT', 'ADD', 'SUB', 'MUL', 'DIV', 'DADD', 'DSUB', 'DMUL', 'DDIV',
+                'CONCAT', 'JUMP', 'JUMP_IF', 'JUMP_IF_NOT', 'JUMP_LT', 'JUMP_GE', 'JUMP_GT', 'JUMP_LE', 'JUMP_EQ',
+                'JUMP_NE', 'RETURN', 'REM')
+
+# Operations of the expressions, by result type and operator
+INT_OPCODES = {'+': ADD, '-': SUB, '*': MUL, '/': DIV}
+DOUBLE_OPCODES = {'+': DADD, '-': DSUB, '*': DMUL, '/': DDIV}
+# Conditional jumps of the comparisons, and of their negations
+COMPARISON_JUMPS = {'<': JUMP_LT, '>=': JUMP_GE, '>': JUMP_GT, '<=': JUMP_LE, '==': JUMP_EQ, '!=': JUMP_NE}
+NEGATED_COMPARISONS = {'<': '>=', '>=': '<', '>': '<=', '<=': '>', '==': '!=', '!=': '=='}
+# Operand slots of each opcode that hold a register (the others are jump targets or unused)
+REGISTER_SLOTS = {opcode: (1, 2, 3) for opcode in range(len(OPCODE_NAMES))}
+REGISTER_SLOTS.update({MOVE: (1, 2), INT_TO_DOUBLE: (1, 2), CHAR_TO_INT: (1, 2), JUMP: (), JUMP_IF: (1,),
+                       JUMP_IF_NOT: (1,), RETURN: (1,)})
+REGISTER_SLOTS.update({opcode: (1, 2) for opcode in COMPARISON_JUMPS.values()})
+# Operand slots holding a jump target
+TARGET_SLOTS = {JUMP: 1, JUMP_IF: 2, JUMP_IF_NOT: 2}
+TARGET_SLOTS.update({opcode: 3 for opcode in COMPARISON_JUMPS.values()})
+
+
+# CompileError class
+# Construct of a (semantically valid) tree that cannot be compiled
+class CompileError(Exception):
+    def __init__(self, message: str, line_number: int):
+        super().__init__(f'Compile error (L{line_number}): {message}')
+        self.line_number = line_number
+
+
+# Function class
+# Compiled function: its instructions are stored in a flat array of opcodes and
+# operands (4 integers per instruction), with the source line of each instruction.
+# Registers 0 to len(parameters) - 1 receive the arguments, and the constants are
+# stored in the last registers of the frame, so that they are never loaded.
+class Function:
+    def __init__(self, name: str, parameters, return_type: str, code: array, lines: array,
+                 register_count: int, constants):
+        self.name = name
+        # Types of the parameters
+        self.parameters = parameters
+        self.return_type = return_type
+        self.code = code
+        self.lines = lines
+        # Number of registers, constants included
+        self.register_count = register_count
+        self.constants = constants
+        # Initial registers of a call: the constants after the variables and temporaries
+        self.frame = [None] * (register_count - len(constants)) + list(constants)
+        # Decoded instructions, see instructions()
+        self.decoded = None
+
+    # (opcode, a, b, c) tuples of the instructions, decoded once from the array
+    def instructions(self):
+        if self.decoded is None:
+            code = self.code
+            self.decoded = [tuple(code[index:index + 4]) for index in range(0, len(code), 4)]
+        return self.decoded
+
+    def __len__(self):
+        return len(self.code) // 4
+
+    # Text listing of the instructions
+    def disassemble(self):
+        lines = [f'{self.return_type} {self.name}({", ".join(self.parameters)}): '
+                 f'{self.register_count} registers, constants {self.constants}']
+        for index, (opcode, a, b, c) in enumerate(self.instructions()):
+            operands = (a, b, c)[:max(REGISTER_SLOTS[opcode] + (TARGET_SLOTS.get(opcode, 0),))]
+            text = ' '.join(f'@{operand}' if slot + 1 == TARGET_SLOTS.get(opcode) else f'r{operand}'
+                            for slot, operand in enumerate(operands))
+            lines.append(f'{index:5d}  {OPCODE_NAMES[opcode]:<14}{text:<20}(L{self.lines[index]})')
+        return '\n'.join(lines)
+
+
+# FunctionCompiler class
+# Compiles one FDECL(vtype, id, ARG, BLOCK, RETURN) node of an SLRParser tree.
+# The variables are bound to registers in a SymbolTable (one scope per block), and
+# the temporaries of a statement are freed at its end; the registers of the
+# variables of a block are reused after it.
+class FunctionCompiler:
+    def __init__(self, node, name: str):
+        self.node = node
+        self.name = name
+        self.table = SymbolTable()
+        self.registers = {}
+        self.lowering = ExpressionLowering(self.variable_type)
+        # Instructions being emitted, and the line of each one
+        self.code = array('i')
+        self.lines = array('I')
+        self.line_number = 0
+        self.next_register = 0
+        self.register_count = 0
+        # Constants: (type, value) -> constant number, and the code slots referring to them
+        self.constant_numbers = {}
+        self.constant_slots = []
+
+    # Type of a variable in scope (used by the expression lowering)
+    def variable_type(self, name: str):
+        symbol = self.table.lookup(name)
+        return symbol.type if symbol is not None else None
+
+    def new_register(self):
+        register = self.next_register
+        self.next_register += 1
+        if self.next_register > self.register_count:
+            self.register_count = self.next_register
+        return register
+
+    # Register of a constant: numbered from -1 down while compiling, and mapped
+    # to the last registers of the frame once their number is known
+    def constant_register(self, constant: Constant):
+        key = (constant.type, constant.value)
+        number = self.constant_numbers.get(key)
+        if number is None:
+            number = self.constant_numbers[key] = len(self.constant_numbers)
+        return -1 - number
+
+    def emit(self, opcode: int, a: int = 0, b: int = 0, c: int = 0):
+        position = len(self.code)
+        self.code.extend((opcode, a, b, c))
+        self.lines.append(self.line_number)
+        for slot in REGISTER_SLOTS[opcode]:
+            if self.code[position + slot] < 0:
+                self.constant_slots.append(position + slot)
+        return position // 4
+
+    # Instruction number of the next instruction
+    def here(self):
+        return len(self.code) // 4
+
+    # Set the target of the jump instruction `index`
+    def patch(self, index: int, target: int):
+        position = 4 * index
+        self.code[position + TARGET_SLOTS[self.code[position]]] = target
+
+    def compile(self):
+        children = self.node.children
+        return_type = children[0].label
+        self.table.enter('function', self.name)
+        parameters = []
+        for child in children[2:]:
+            if child.label == 'ARG':
+                parameters = self.declare_parameters(child)
+            elif child.label == 'BLOCK':
+                self.compile_block(child, new_scope=False)
+            elif child.label == 'RETURN':
+                self.compile_return(child, return_type)
+        self.table.exit()
+
+        # Constants go after the other registers
+        base = self.register_count
+        code = self.code
+        for position in self.constant_slots:
+            code[position] = base - 1 - code[position]
+        constants = [None] * len(self.constant_numbers)
+        for (_, value), number in self.constant_numbers.items():
+            constants[number] = value
+        return Function(self.name, parameters, return_type, code, self.lines,
+                        base + len(constants), constants)
+
+    # ARG(vtype, id, MOREARGS(',', vtype, id, ...)): registers 0, 1, ...
+    def declare_parameters(self, node):
+        leaves = [child for child in node.children if not child.children]
+        for child in node.children:
+            if child.label == 'MOREARGS':
+                leaves.extend(leaf for leaf in child.children if leaf.label != ',')
+        types = []
+        for index in range(0, len(leaves) - 1, 2):
+            self.declare(leaves[index].label, leaves[index + 1], self.new_register())
+            types.append(leaves[index].label)
+        return types
+
+    def declare(self, type: str, leaf, register: int):
+        symbol = Symbol(leaf.label, 'variable', type, getattr(leaf, 'line_number', None), leaf)
+        self.table.declare(symbol)
+        self.registers[symbol] = register
+
+    # Register of a variable
+    def variable_register(self, name: str):
+        symbol = self.table.lookup(name)
+        if symbol is None or symbol not in self.registers:
+            raise CompileError(f'{name} is not a local variable or argument', self.line_number)
+        return self.registers[symbol]
+
+    # Statements of a BLOCK chain; the registers of its variables are reused after it
+    def compile_block(self, node, new_scope: bool = True):
+        if new_scope:
+            self.table.enter('block')
+            mark = self.next_register
+        stack = [node]
+        statements = []
+        while stack:
+            block = stack.pop()
+            for child in block.children:
+                if child.label == 'BLOCK':
+                    stack.append(child)
+                else:
+                    statements.append(child)
+        for statement in statements:
+            self.compile_statement(statement)
+        if new_scope:
+            self.table.exit()
+            self.next_register = mark
+
+    def compile_statement(self, node):
+        children = node.children
+        mark = self.next_register
+        first = children[0]
+        self.line_number = first_line(node) or self.line_number
+        if first.label == 'VDECL':
+            vdecl = first.children
+            # The register is taken first so that the temporaries of the initialization come after it
+            register = self.new_register()
+            mark = self.next_register
+            if len(vdecl) > 2:
+                self.compile_assignment(register, vdecl[0].label, vdecl[2])
+            self.declare(vdecl[0].label, vdecl[1], register)
+        elif first.label == 'COND':
+            if len(children) == 3:
+                self.compile_if(first, children[1], children[2])
+            else:
+                self.compile_while(first, children[1])
+        elif len(children) == 2 and children[1].label == 'ASSIGN':
+            self.compile_assignment(self.variable_register(first.label), self.variable_type(first.label), children[1])
+        else:
+            raise CompileError(f'Unsupported statement {first.label}', self.line_number)
+        self.next_register = mark
+
+    # Expression tree of an expression node (or of a bare operand leaf)
+    def lower(self, node):
+        if not node.children:
+            return self.lowering.operand(node)
+        return self.lowering.lower(node)
+
+    # ASSIGN('=', EXPR) into `register`, holding a variable of type `target_type`
+    def compile_assignment(self, register: int, target_type: str, assign):
+        self.compile_converted(self.lower(assign.children[-1]), target_type, register)
+
+    # Register holding the value of an expression converted to `target_type` (widening
+    # of char and int values), computed into `target` if given
+    def compile_converted(self, expression, target_type: str, target: int = None):
+        if target_type == 'double' and expression.type in ('int', 'char'):
+            opcode = INT_TO_DOUBLE
+        elif target_type == 'int' and expression.type == 'char':
+            opcode = CHAR_TO_INT
+        else:
+            return self.compile_expression(expression, target)
+        value = self.compile_expression(expression)
+        if opcode == INT_TO_DOUBLE:
+            value = self.as_int(value, expression.type)
+        if target is None:
+            target = self.new_register()
+        self.emit(opcode, target, value)
+        return target
+
+    # Convert a char operand to int when needed
+    def as_int(self, register: int, type: str):
+        if type != 'char':
+            return register
+        converted = self.new_register()
+        self.emit(CHAR_TO_INT, converted, register)
+        return converted
+
+    # Register holding the value of an expression tree, computed into `target` if given
+    # Temporaries are allocated for the operations (freed at the end of the statement)
+    def compile_expression(self, expression, target: int = None):
+        results = []
+        stack = [(expression, False)]
+        while stack:
+            node, ready = stack.pop()
+            if node.__class__ is not BinaryOp:
+                if node.__class__ is Constant:
+                    results.append(self.constant_register(node))
+                else:
+                    results.append(self.variable_register(node.name))
+                continue
+            if not ready:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+                continue
+            right = results.pop()
+            left = results.pop()
+            if node.type == 'String':
+                opcode = CONCAT
+            else:
+                left = self.as_int(left, node.left.type)
+                right = self.as_int(right, node.right.type)
+                opcode = (DOUBLE_OPCODES if node.type == 'double' else INT_OPCODES)[node.operator]
+            destination = target if node is expression and target is not None else self.new_register()
+            # On the line of the operator, like the errors of TreeEvaluator
+            statement_line, self.line_number = self.line_number, node.line_number or self.line_number
+            self.emit(opcode, destination, left, right)
+            self.line_number = statement_line
+            results.append(destination)
+        register = results[0]
+        if target is not None and register != target:
+            self.emit(MOVE, target, register)
+            return target
+        return register
+
+    # Emit a jump to be patched, taken when the condition is `when`; returns its index
+    def compile_branch(self, cond, when: bool):
+        children = cond.children
+        self.line_number = next((line for line in map(first_line, children) if line), self.line_number)
+        if len(children) == 3:
+            left, comparison, right = children
+            left, right = self.lower(left), self.lower(right)
+            left_register = self.compile_expression(left)
+            right_register = self.compile_expression(right)
+            if left.type == 'char' and right.type != 'char':
+                left_register = self.as_int(left_register, left.type)
+            if right.type == 'char' and left.type != 'char':
+                right_register = self.as_int(right_register, right.type)
+            operator = comparison.label if when else NEGATED_COMPARISONS[comparison.label]
+            return self.emit(COMPARISON_JUMPS[operator], left_register, right_register, -1)
+        register = self.compile_expression(self.lower(children[0]))
+        return self.emit(JUMP_IF if when else JUMP_IF_NOT, register, -1)
+
+    # if (COND) BLOCK ELSE
+    def compile_if(self, cond, block, else_node):
+        mark = self.next_register
+        to_else = self.compile_branch(cond, False)
+        self.next_register = mark
+        self.compile_block(block)
+        if else_node.children:
+            to_end = self.emit(JUMP, -1)
+            self.patch(to_else, self.here())
+            self.compile_block(else_node.children[0])
+            self.patch(to_end, self.here())
+        else:
+            self.patch(to_else, self.here())
+
+    # while (COND) BLOCK, with the condition tested at the bottom of the loop
+    def compile_while(self, cond, block):
+        to_condition = self.emit(JUMP, -1)
+        body = self.here()
+        self.compile_block(block)
+        self.patch(to_condition, self.here())
+        mark = self.next_register
+        self.patch(self.compile_branch(cond, True), body)
+        self.next_register = mark
+
+    def compile_return(self, node, return_type: str):
+        self.line_number = first_line(node) or self.line_number
+        if not node.children:
+            raise CompileError('Missing return value', self.line_number)
+        self.emit(RETURN, self.compile_converted(self.lower(node.children[0]), return_type))
+
+
+# Compile the functions of an SLRParser tree: top-level ones by name, methods as Class.name
+# The tree is checked by SemanticAnalyzer first; its first error is raised
+def compile_tree(parse_tree):
+    errors = SemanticAnalyzer(parse_tree).analyze()
+    if errors:
+        raise errors[0]
+    functions = {}
+    stack = [(parse_tree, '')]
+    while stack:
+        node, prefix = stack.pop()
+        if node.label == 'FDECL':
+            name = prefix + node.children[1].label
+            functions[name] = FunctionCompiler(node, name).compile()
+        elif node.label == 'CDECL':
+            stack.extend((child, prefix + node.children[1].label + '.') for child in reversed(node.children[2:]))
+        elif node.label in ('CODE', 'ODECL'):
+            stack.extend((child, prefix) for child in reversed(node.children))
+    return functions
+
+
+# Parse a source with SLRParser and compile its functions
+def compile_source(source_code: str):
+    parser = SLRParser(tokenize(source_code))
+    parser.parse()
+    return compile_tree(parser.parse_tree)
+
+
+# Main: print the bytecode of the functions of a source
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(f'usage: {sys.argv[0]} FILE')
+    with open(sys.argv[1], 'r') as file:
+        for function in compile_source(file.read()).values():
+            print(function.disassemble())
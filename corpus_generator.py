@@ -0,0 +1,160 @@
+#### File: corpus_generator.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Synthetic Java sources following the project grammar, for benchmarks
+
+
+# Argparse module to parse the command line
+import argparse
+# Os module to write the generated files
+import os
+# Random module, seeded so that a corpus can be generated again identically
+import random
+
+
+# Shapes of source that can be generated, with what `size` controls for each of them
+SHAPES = {
+    'declarations': 'number of top-level variable declarations',
+    'long_expressions': 'number of operands of each expression',
+    'long_blocks': 'number of statements in the function body',
+    'deep_nesting': 'depth of the nested while/if statements',
+    'many_classes': 'number of classes',
+}
+
+# Operators, kept surrounded by spaces so that `- 1` is not lexed as a negative number
+ADDSUB = ('+', '-')
+MULTDIV = ('*', '/')
+# Comparison operators
+COMPARISONS = ('<', '>', '<=', '>=', '==', '!=')
+
+
+# SourceGenerator class
+# Builds sources made only of constructs of the grammar (see java_subset.grammar)
+class SourceGenerator:
+    def __init__(self, seed: int = 0):
+        self.random = random.Random(seed)
+        # Counter used to give every declared name a distinct suffix
+        self.counter = 0
+
+    def new_name(self, prefix: str):
+        self.counter += 1
+        return f'{prefix}{self.counter}'
+
+    # A single operand: identifier or number
+    def operand(self, names):
+        if names and self.random.random() < 0.6:
+            return self.random.choice(names)
+        return str(self.random.randint(0, 999))
+
+    # An expression with `length` operands, with some parenthesized sub-expressions
+    def expression(self, names, length: int = 3):
+        parts = [self.operand(names)]
+        remaining = length - 1
+        while remaining > 0:
+            operator = self.random.choice(ADDSUB + MULTDIV)
+            if remaining >= 3 and self.random.random() < 0.15:
+                # Parenthesized group of 2 or 3 operands
+                group = self.random.randint(2, min(3, remaining))
+                parts.append(f'{operator} ({self.expression(names, group)})')
+                remaining -= group
+            else:
+                parts.append(f'{operator} {self.operand(names)}')
+                remaining -= 1
+        return ' '.join(parts)
+
+    def condition(self, names):
+        if self.random.random() < 0.1:
+            return self.random.choice(('true', 'false'))
+        return f'{self.expression(names, 2)} {self.random.choice(COMPARISONS)} {self.expression(names, 2)}'
+
+    # A top-level or class-level variable declaration (declares its name in `names`)
+    def variable_declaration(self, names, length: int = 3):
+        name = self.new_name('v')
+        if self.random.random() < 0.2:
+            declaration = f'int {name};'
+        else:
+            declaration = f'int {name} = {self.expression(names, length)};'
+        names.append(name)
+        return declaration
+
+    # A simple statement: declaration or assignment
+    def simple_statement(self, names):
+        if not names or self.random.random() < 0.5:
+            name = self.new_name('x')
+            statement = f'int {name} = {self.expression(names)};'
+            names.append(name)
+            return statement
+        return f'{self.random.choice(names)} = {self.expression(names)};'
+
+    # A function taking two int arguments, whose body is built by `body(names)`
+    def function(self, body, indent: str = ''):
+        name = self.new_name('f')
+        names = ['a', 'b']
+        lines = [f'{indent}int {name}(int a, int b) {{']
+        lines.extend(body(names))
+        lines.append(f'{indent}  return {self.random.choice(names)};')
+        lines.append(f'{indent}}}')
+        return '\n'.join(lines)
+
+    def declarations(self, size: int):
+        names = []
+        return '\n'.join(self.variable_declaration(names) for _ in range(size))
+
+    def long_expressions(self, size: int):
+        names = []
+        return '\n'.join(self.variable_declaration(names, size) for _ in range(10))
+
+    def long_blocks(self, size: int):
+        return self.function(lambda names: ['  ' + self.simple_statement(names) for _ in range(size)])
+
+    def deep_nesting(self, size: int):
+        def body(names):
+            # Names declared in a nested block are only visible in the blocks below it
+            scope = names
+            lines = []
+            for depth in range(size):
+                indent = '  ' * (depth + 1)
+                lines.append(indent + self.simple_statement(scope))
+                keyword = 'while' if depth % 2 == 0 else 'if'
+                lines.append(f'{indent}{keyword} ({self.condition(scope)}) {{')
+                scope = list(scope)
+            lines.append('  ' * (size + 1) + self.simple_statement(scope))
+            for depth in reversed(range(size)):
+                lines.append('  ' * (depth + 1) + '}')
+            return lines
+        return self.function(body)
+
+    def many_classes(self, size: int):
+        classes = []
+        for _ in range(size):
+            fields = []
+            members = [f'  {self.variable_declaration(fields)}' for _ in range(3)]
+            members.append(self.function(lambda names: ['    ' + self.simple_statement(names) for _ in range(5)], '  '))
+            classes.append(f'class {self.new_name("C")} {{\n' + '\n'.join(members) + '\n}')
+        return '\n'.join(classes)
+
+
+# Generate a source of the given shape and size
+def generate_source(shape: str, size: int, seed: int = 0):
+    if shape not in SHAPES:
+        raise ValueError(f'Unknown shape: {shape}')
+    return getattr(SourceGenerator(seed), shape)(size) + '\n'
+
+
+# Main
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description='Generate a corpus of Java sources following the project grammar')
+    argument_parser.add_argument('directory', help='output directory')
+    argument_parser.add_argument('--shape', choices=sorted(SHAPES), action='append',
+                                 help='shape of the sources (repeatable, default: all)')
+    argument_parser.add_argument('--size', type=int, default=100, help='size of each source (see the shapes)')
+    argument_parser.add_argument('--count', type=int, default=1, help='number of files per shape')
+    argument_parser.add_argument('--seed', type=int, default=0, help='random seed')
+    arguments = argument_parser.parse_args()
+
+    os.makedirs(arguments.directory, exist_ok=True)
+    for shape in arguments.shape or sorted(SHAPES):
+        for index in range(arguments.count):
+            file_path = os.path.join(arguments.directory, f'{shape}_{index}.java')
+            with open(file_path, 'w') as file:
+                file.write(generate_source(shape, arguments.size, arguments.seed + index))
+            print(file_path)
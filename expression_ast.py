@@ -0,0 +1,312 @@
+#### File: expression_ast.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Lowering of the EXPR/TERM/FACTOR parse trees into typed binary expression trees, with constant folding
+
+
+# Sys module to intern the identifiers and get program's arguments
+import sys
+
+from syntax_analyzer import classify_lexeme, print_parse_tree, tokenize
+from slr_parser import SLRParser
+
+
+# Binary operators and their precedence (all left-associative)
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+# Labels of the parse tree nodes making up an expression
+EXPRESSION_LABELS = frozenset(('EXPR', 'TERM', 'FACTOR', 'RHS'))
+# Numeric types, each one assignable to the following ones
+NUMERIC_TYPES = ('char', 'int', 'double')
+NUMERIC_RANKS = {name: rank for rank, name in enumerate(NUMERIC_TYPES)}
+# Range of the Java int type
+INT_MIN = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+
+# Value of an int computation, wrapped around like Java ints
+def java_int(value: int):
+    return (value - INT_MIN) % 2 ** 32 + INT_MIN
+
+
+# Type of a binary operation on operands of the given types, None when unknown or invalid
+# (also used by semantic_analyzer to check the expression trees)
+def operation_type(operator: str, left: str, right: str):
+    if left is None or right is None:
+        return None
+    if operator == '+' and (left == 'String' or right == 'String'):
+        return 'String'
+    if left in NUMERIC_RANKS and right in NUMERIC_RANKS:
+        # char operands are promoted to int
+        return NUMERIC_TYPES[max(NUMERIC_RANKS[left], NUMERIC_RANKS[right], NUMERIC_RANKS['int'])]
+    return None
+
+
+# Java int operations; None when the operation cannot be folded
+def fold_int(operator: str, left: int, right: int):
+    if operator == '+':
+        return java_int(left + right)
+    if operator == '-':
+        return java_int(left - right)
+    if operator == '*':
+        return java_int(left * right)
+    if right == 0:
+        # ArithmeticException at run time: left to the program
+        return None
+    # Java division truncates towards zero
+    quotient = abs(left) // abs(right)
+    return java_int(quotient if (left < 0) == (right < 0) else -quotient)
+
+
+# The expression trees are made of three kinds of nodes with a type ('int',
+# 'boolean', 'String', 'char', 'double' or None when unknown). Like ParseTreeNode,
+# they have a label and children, so that they can be printed by print_parse_tree.
+
+# Constant class
+# Literal or folded value: int, bool, str (String without its quotes, or the char)
+class Constant:
+    __slots__ = ('value', 'type')
+
+    def __init__(self, value, type: str):
+        self.value = value
+        self.type = type
+
+    # Java spelling of the value
+    @property
+    def label(self):
+        if self.type == 'boolean':
+            return 'true' if self.value else 'false'
+        if self.type == 'String':
+            return f'"{self.value}"'
+        if self.type == 'char':
+            return f"'{self.value}'"
+        return str(self.value)
+
+    children = ()
+
+    def __repr__(self):
+        return f'Constant({self.label}: {self.type})'
+
+
+# Name class
+# Identifier; a single interned Name is shared by all the uses of a name with a given type
+class Name:
+    __slots__ = ('name', 'type')
+
+    def __init__(self, name: str, type: str):
+        self.name = name
+        self.type = type
+
+    @property
+    def label(self):
+        return self.name
+
+    children = ()
+
+    def __repr__(self):
+        return f'Name({self.name}: {self.type})'
+
+
+# BinaryOp class
+# Binary operation on two expressions, with the line of its operator
+class BinaryOp:
+    __slots__ = ('operator', 'left', 'right', 'type', 'line_number')
+
+    def __init__(self, operator: str, left, right, type: str, line_number: int = None):
+        self.operator = operator
+        self.left = left
+        self.right = right
+        self.type = type
+        self.line_number = line_number
+
+    @property
+    def label(self):
+        return self.operator
+
+    @property
+    def children(self):
+        return (self.left, self.right)
+
+    def __repr__(self):
+        return f'BinaryOp({self.left!r} {self.operator} {self.right!r}: {self.type})'
+
+
+# Whether a node of a parse tree is an operator leaf
+def is_operator(node):
+    return not node.children and node.label in PRECEDENCE
+
+
+# ExpressionLowering class
+# Lowers the expressions of parse trees built by SyntaxAnalyzer or SLRParser, in which
+# operands and operators are flat, interleaved children (a TERM holding a whole
+# `a + b * c`, operands as RHS leaves, parenthesized FACTOR(EXPR) groups, and in
+# SyntaxAnalyzer trees bare operand leaves and nested EXPR groups after the first TERM).
+# The precedence of the operators is restored by precedence climbing, constant int
+# operations are folded with Java semantics, and identifiers are interned.
+class ExpressionLowering:
+    def __init__(self, name_type=None):
+        # Type of an identifier (e.g. looked up in a symbol table), or None
+        self.name_type = name_type
+        # Interned names: (name, type) -> Name
+        self.names = {}
+        # Counters: parse tree nodes lowered, expression nodes (names counted once) and operations folded
+        self.parse_nodes = 0
+        self.ast_nodes = 0
+        self.folded = 0
+
+    # Expression tree of an EXPR, TERM, FACTOR or RHS node
+    def lower(self, node):
+        # Groups (the expression and its parenthesized subexpressions) are lowered
+        # innermost first, with an explicit stack instead of recursion
+        lowered = {}
+        stack = [(node, None)]
+        while stack:
+            group, items = stack.pop()
+            if items is not None:
+                lowered[id(group)] = self.climb(items, lowered)
+                continue
+            items = self.flatten(group)
+            stack.append((group, items))
+            stack.extend((item, None) for item in items if item.children)
+        return lowered[id(node)]
+
+    # Operands and operators of a group, in order: TERM children are spliced in,
+    # RHS operands are replaced by their leaf, and a FACTOR by its expression.
+    # Other nodes (e.g. a stale tree appended by SyntaxAnalyzer.parse_expr) are skipped.
+    def flatten(self, group):
+        if group.label == 'RHS':
+            return list(group.children[:1])
+        items = []
+        stack = [iter(group.children)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+            children = child.children
+            self.parse_nodes += 1
+            if not children:
+                items.append(child)
+            elif child.label == 'TERM':
+                stack.append(iter(children))
+            elif child.label == 'RHS':
+                items.append(children[0])
+            elif child.label == 'FACTOR':
+                items.extend(grandchild for grandchild in children if grandchild.label in EXPRESSION_LABELS)
+            elif child.label == 'EXPR':
+                items.append(child)
+        return items
+
+    # Precedence climbing over operands and operators
+    def climb(self, items, lowered):
+        if not items or is_operator(items[0]):
+            raise ValueError(f'Invalid expression: {" ".join(item.label for item in items)}')
+        position = 0
+
+        def operand():
+            nonlocal position
+            item = items[position]
+            position += 1
+            if item.children:
+                return lowered[id(item)]
+            return self.operand(item)
+
+        # Parse the operations whose operators bind at least as tightly as `minimum`
+        def expression(minimum: int):
+            nonlocal position
+            left = operand()
+            while position < len(items):
+                operator = items[position]
+                precedence = PRECEDENCE.get(operator.label) if is_operator(operator) else None
+                if precedence is None:
+                    raise ValueError(f'Expected an operator, found {operator.label}')
+                if precedence < minimum:
+                    break
+                position += 1
+                if position == len(items):
+                    raise ValueError(f'Missing operand after {operator.label}')
+                # Left-associative: the right operand only takes tighter operators
+                right = expression(precedence + 1)
+                left = self.binary(operator.label, left, right, operator.line_number)
+            return left
+
+        return expression(1)
+
+    # Expression node of an operand leaf
+    def operand(self, leaf):
+        lexeme = leaf.label
+        token_type = classify_lexeme(lexeme)
+        if token_type == 'id':
+            return self.name(lexeme)
+        self.ast_nodes += 1
+        if token_type == 'num':
+            return Constant(int(lexeme), 'int')
+        if token_type == 'boolstr':
+            return Constant(lexeme == 'true', 'boolean')
+        if token_type == 'literal':
+            return Constant(lexeme[1:-1], 'String')
+        if token_type == 'character':
+            return Constant(lexeme[1:-1], 'char')
+        raise ValueError(f'Invalid operand: {lexeme}')
+
+    # Interned Name node of an identifier
+    def name(self, lexeme: str):
+        name_type = self.name_type(lexeme) if self.name_type is not None else None
+        name = self.names.get((lexeme, name_type))
+        if name is None:
+            name = self.names[(lexeme, name_type)] = Name(sys.intern(lexeme), name_type)
+            self.ast_nodes += 1
+        return name
+
+    # Binary operation node, folded when both operands are int (or char) constants
+    def binary(self, operator: str, left, right, line_number: int = None):
+        result_type = operation_type(operator, left.type, right.type)
+        if result_type == 'int' and left.__class__ is Constant and right.__class__ is Constant:
+            value = fold_int(operator, self.int_value(left), self.int_value(right))
+            if value is not None:
+                self.folded += 1
+                # The two constant operands are replaced by one
+                self.ast_nodes -= 1
+                return Constant(value, 'int')
+        self.ast_nodes += 1
+        return BinaryOp(operator, left, right, result_type, line_number)
+
+    @staticmethod
+    def int_value(constant: Constant):
+        return ord(constant.value) if constant.type == 'char' else constant.value
+
+    # Expression trees of the outermost expressions of a parse tree, in preorder:
+    # yields (parse tree node, expression tree) pairs
+    def iter_expressions(self, parse_tree):
+        stack = [parse_tree]
+        while stack:
+            node = stack.pop()
+            if node.label in ('EXPR', 'TERM', 'FACTOR') or (node.label == 'RHS' and node.children):
+                yield node, self.lower(node)
+                continue
+            stack.extend(reversed(node.children))
+
+
+# Number of nodes of an expression tree or parse tree
+def count_nodes(root):
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+# Main: print the expression trees of a source (parsed with SLRParser)
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(f'usage: {sys.argv[0]} FILE')
+    with open(sys.argv[1], 'r') as file:
+        parser = SLRParser(tokenize(file.read()))
+    parser.parse()
+    lowering = ExpressionLowering()
+    parse_nodes = 0
+    for expression, tree in lowering.iter_expressions(parser.parse_tree):
+        parse_nodes += count_nodes(expression)
+        print_parse_tree(tree)
+    print(f'{parse_nodes} parse tree nodes -> {lowering.ast_nodes} expression nodes '
+          f'({lowering.folded} operations folded, {len(lowering.names)} names)', file=sys.stderr)
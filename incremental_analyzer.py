@@ -0,0 +1,252 @@
+#### File: incremental_analyzer.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Incremental re-lexing and re-parsing of a source after small edits
+
+
+# Array module for the spliced token arrays
+from array import array
+# Bisect module to find the first token touched by an edit
+from bisect import bisect_left
+
+from syntax_analyzer import TOKEN_CODES, TOKEN_REGEX, SyntaxAnalyzer, TokenStream, classify_lexeme
+
+
+# SpanTrackingAnalyzer class
+# SyntaxAnalyzer remembering the range of tokens [start, end) consumed by the
+# productions that can be re-parsed on their own (their result only depends on
+# the position of their first token), as [node, production, start, end] records,
+# and the token of every leaf, as [leaf, token index] records
+class SpanTrackingAnalyzer(SyntaxAnalyzer):
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.node_spans = []
+        self.leaf_tokens = []
+
+    # Run `production` and record the span of its node
+    def track(self, production, parse_function):
+        start = self.token_index
+        node = parse_function()
+        if node is not None:
+            self.node_spans.append([node, production, start, self.token_index])
+        return node
+
+    def create_leaf(self):
+        leaf = super().create_leaf()
+        self.leaf_tokens.append([leaf, self.token_index])
+        return leaf
+
+    def parse_decl(self):
+        return self.track('parse_decl', super().parse_decl)
+
+    def parse_block(self):
+        return self.track('parse_block', super().parse_block)
+
+    def parse_stmt(self):
+        return self.track('parse_stmt', super().parse_stmt)
+
+
+# Iterate over every node of a subtree
+def iter_subtree(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children)
+
+
+# IncrementalAnalyzer class
+# Keeps the tokens and the parse tree of a source up to date across edits:
+# only the tokens around an edit are lexed again, and only the smallest
+# enclosing declaration, block or statement is parsed again, every other
+# subtree of the previous parse tree being reused as is
+class IncrementalAnalyzer:
+    def __init__(self, source_code: str):
+        self.source = source_code
+        self.tokens = TokenStream.from_source(source_code)
+        # Statistics of the last edit: (number of tokens lexed, production re-parsed)
+        self.last_edit = None
+        self.full_parse()
+
+    # Parse the whole token stream from scratch
+    # On a parsing error the tree is left to None and the error is raised
+    def full_parse(self):
+        self.parse_tree = None
+        self.node_spans = []
+        self.leaf_tokens = []
+        self.parents = {}
+        analyzer = SpanTrackingAnalyzer(self.tokens)
+        analyzer.parse()
+        self.parse_tree = analyzer.parse_tree
+        self.node_spans = analyzer.node_spans
+        self.leaf_tokens = analyzer.leaf_tokens
+        self.index_parents(self.parse_tree)
+
+    # Record the parent of every node below `root`
+    def index_parents(self, root):
+        parents = self.parents
+        for node in iter_subtree(root):
+            for child in node.children:
+                parents[id(child)] = node
+
+    # Apply an edit replacing `removed_length` characters at `offset` by `inserted_text`
+    # and return the updated parse tree
+    def apply_edit(self, offset: int, removed_length: int, inserted_text: str):
+        removed_text = self.source[offset:offset + removed_length]
+        self.source = self.source[:offset] + inserted_text + self.source[offset + removed_length:]
+        first, old_end, new_count, first_kind_changed = self.relex(offset, removed_length, inserted_text, removed_text)
+        token_delta = new_count - (old_end - first)
+
+        # Counted as a full parse until a subtree could be re-parsed on its own
+        self.last_edit = (new_count, 'full')
+        if self.parse_tree is None:
+            # The previous version did not parse: nothing to reuse
+            self.full_parse()
+        else:
+            self.last_edit = (new_count, self.reparse(first, old_end, token_delta, first_kind_changed))
+            if self.last_edit[1] != 'full' and inserted_text.count('\n') != removed_text.count('\n'):
+                # The reused leaves after the edit still hold the lines of their tokens before it
+                lines = self.tokens.lines
+                for leaf, index in self.leaf_tokens:
+                    if index >= first:
+                        leaf.line_number = lines[index]
+        return self.parse_tree
+
+    # Lex again the tokens around the edit and splice them into the token stream
+    # Returns (first changed token, end of the changed old tokens, number of new tokens,
+    # whether the kind of the token at `first` changed)
+    def relex(self, offset, removed_length, inserted_text, removed_text):
+        tokens = self.tokens
+        kinds, starts, ends = tokens.kinds, tokens.starts, tokens.ends
+        delta = len(inserted_text) - removed_length
+        line_delta = inserted_text.count('\n') - removed_text.count('\n')
+
+        # First token ending at or after the edit, backed up by one token since
+        # the text it ends with may merge with the edited text
+        first = bisect_left(ends, offset)
+        if first > 0:
+            first -= 1
+            position, line_number = starts[first], tokens.lines[first]
+        else:
+            # The edit may come before the first token
+            position, line_number = 0, 1
+
+        # Lex from `position` until a token lines up again with an old token
+        source = self.source
+        edit_end = offset + len(inserted_text)
+        codes = TOKEN_CODES
+        new_kinds, new_starts, new_ends, new_lines = array('B'), array('I'), array('I'), array('I')
+        old_index = first
+        old_end = len(tokens)
+        for match in TOKEN_REGEX.finditer(source, position):
+            lexeme = match.group()
+            start, end = match.span()
+            code = codes.get(classify_lexeme(lexeme))
+            if code is not None:
+                if start >= edit_end:
+                    # Past the edit: stop at the first token identical to an old one
+                    while old_index < len(tokens) and starts[old_index] + delta < start:
+                        old_index += 1
+                    if (old_index < len(tokens) and starts[old_index] + delta == start
+                            and ends[old_index] + delta == end and kinds[old_index] == code):
+                        old_end = old_index
+                        break
+                new_kinds.append(code)
+                new_starts.append(start)
+                new_ends.append(end)
+                new_lines.append(line_number)
+            if '\n' in lexeme:
+                line_number += lexeme.count('\n')
+
+        # Leave out the leading tokens that were lexed again identically
+        same = 0
+        while (same < len(new_kinds) and first + same < old_end and new_kinds[same] == kinds[first + same]
+               and new_starts[same] == starts[first + same] and new_ends[same] == ends[first + same]):
+            same += 1
+        first += same
+        old_first_kind = kinds[first] if first < len(kinds) else None
+        if same < len(new_kinds):
+            new_first_kind = new_kinds[same]
+        else:
+            new_first_kind = kinds[old_end] if old_end < len(kinds) else None
+
+        # Splice the new tokens in and shift the unchanged tail
+        tokens.source = source
+        kinds[first:] = new_kinds[same:] + kinds[old_end:]
+        starts[first:] = new_starts[same:] + array('I', map(delta.__add__, starts[old_end:]))
+        ends[first:] = new_ends[same:] + array('I', map(delta.__add__, ends[old_end:]))
+        tokens.lines[first:] = new_lines[same:] + array('I', map(line_delta.__add__, tokens.lines[old_end:]))
+        return first, old_end, len(new_kinds) - same, old_first_kind != new_first_kind
+
+    # Parse again the smallest resumable subtree enclosing the changed tokens [first, old_end)
+    # Returns the name of the re-parsed production ('full' when everything was parsed again)
+    def reparse(self, first, old_end, token_delta, first_kind_changed):
+        # Candidate subtrees: they contain the changed tokens, innermost first
+        candidates = [span for span in self.node_spans if span[2] <= first and span[3] >= old_end]
+        candidates.sort(key=lambda span: span[3] - span[2])
+
+        for span in candidates:
+            node, production, start, end = span
+            # Callers only pick parse_decl after checking its first token (see parse_odecl),
+            # whereas parse_block is always called and parse_stmt fails on any other token
+            if production == 'parse_decl' and start == first and first_kind_changed:
+                continue
+            analyzer = SpanTrackingAnalyzer(self.tokens)
+            analyzer.token_index = start - 1
+            analyzer.advance()
+            try:
+                new_node = getattr(analyzer, production)()
+            except Exception:
+                continue
+            # The parser state after the subtree must be the one the parent continued from
+            if new_node is None or analyzer.token_index != end + token_delta:
+                continue
+            self.splice(span, new_node, analyzer.node_spans, analyzer.leaf_tokens, token_delta)
+            return production
+
+        # No enclosing subtree could be re-parsed on its own
+        self.full_parse()
+        return 'full'
+
+    # Replace the subtree of `span` by `new_node` and update the spans, leaf tokens and parent links
+    def splice(self, span, new_node, new_spans, new_leaf_tokens, token_delta):
+        old_node, _, old_start, old_end = span
+        parent = self.parents.get(id(old_node))
+        old_ids = set()
+        for node in iter_subtree(old_node):
+            old_ids.add(id(node))
+            self.parents.pop(id(node), None)
+
+        # Swap the subtree in its parent
+        if parent is None:
+            self.parse_tree = new_node
+        else:
+            children = parent.children
+            children[children.index(old_node)] = new_node
+            self.parents[id(new_node)] = parent
+        self.index_parents(new_node)
+
+        # Update the spans: drop the old subtree, shift what follows it
+        updated_spans = []
+        for other in self.node_spans:
+            node, production, start, end = other
+            if id(node) in old_ids:
+                if node is old_node and other is not span:
+                    # Another production returned the same node (e.g. parse_decl around parse_block)
+                    updated_spans.append([new_node, production, start, end + token_delta])
+            elif start >= old_end and start > old_start:
+                updated_spans.append([node, production, start + token_delta, end + token_delta])
+            elif start <= old_start and end >= old_end:
+                updated_spans.append([node, production, start, end + token_delta])
+            else:
+                updated_spans.append(other)
+        updated_spans.extend(new_spans)
+        self.node_spans = updated_spans
+
+        # Same for the token indices of the leaves
+        updated_leaf_tokens = []
+        for leaf, index in self.leaf_tokens:
+            if id(leaf) in old_ids:
+                continue
+            updated_leaf_tokens.append([leaf, index + token_delta] if index >= old_end else [leaf, index])
+        updated_leaf_tokens.extend(new_leaf_tokens)
+        self.leaf_tokens = updated_leaf_tokens
@@ -0,0 +1,342 @@
+#### File: interpreter.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Dispatch-loop interpreter of the bytecode, and the tree-walking evaluator it is compared with
+
+
+# Math module for the double divisions by zero
+import math
+# Sys module to get program's arguments
+import sys
+
+from syntax_analyzer import tokenize
+from slr_parser import SLRParser
+from expression_ast import INT_MAX, INT_MIN, BinaryOp, Constant, ExpressionLowering, java_int
+from bytecode_compiler import (ADD, CHAR_TO_INT, CONCAT, DADD, DDIV, DIV, DMUL, DSUB, INT_TO_DOUBLE, JUMP, JUMP_EQ,
+                               JUMP_GE, JUMP_GT, JUMP_IF, JUMP_IF_NOT, JUMP_LE, JUMP_LT, JUMP_NE, MOVE, MUL, REM,
+                               RETURN, SUB, compile_tree)
+
+
+# Versions of the example programs restricted to the grammar (no modifiers, calls,
+# break, % operator or Math.pow; OctalDecimal takes the base as an argument):
+# source, function to run and its arguments
+SUBSET_PROGRAMS = {
+    'adder': ('''
+class Adder {
+  int add(int first, int second) {
+    // add two numbers
+    int sum = first + second;
+    return sum;
+  }
+}
+''', 'Adder.add', (10, 20)),
+    'lcm': ('''
+class LeastCommonMultiple {
+  int lcm(int n1, int n2) {
+    // Maximum number between n1 and n2 is stored in lcm
+    int lcm = n2;
+    if (n1 > n2) {
+      lcm = n1;
+    }
+    boolean searching = true;
+    while (searching) {
+      // lcm % n1 == 0 and lcm % n2 == 0
+      if (lcm - lcm / n1 * n1 == 0) {
+        if (lcm - lcm / n2 * n2 == 0) {
+          searching = false;
+        } else {
+          lcm = lcm + 1;
+        }
+      } else {
+        lcm = lcm + 1;
+      }
+    }
+    return lcm;
+  }
+}
+''', 'LeastCommonMultiple.lcm', (72, 120)),
+    'octal': ('''
+class OctalDecimal {
+  int convertToDecimal(int number, int base) {
+    int radix = 10;
+    int decimalNumber = 0;
+    int i = 0;
+    boolean valid = true;
+    while (number != 0) {
+      // number % radix
+      int digit = number - number / radix * radix;
+      if (digit > base - 1) {
+        valid = false;
+      }
+      // Math.pow(base, i)
+      int power = 1;
+      int j = 0;
+      while (j < i) {
+        power = power * base;
+        j = j + 1;
+      }
+      decimalNumber = decimalNumber + digit * power;
+      i = i + 1;
+      number = number / radix;
+    }
+    if (valid) {
+    } else {
+      decimalNumber = 0 - 1;
+    }
+    return decimalNumber;
+  }
+}
+''', 'OctalDecimal.convertToDecimal', (1234567, 8)),
+}
+
+
+# String conversion of a value, as Java does it in a concatenation
+def java_string(value):
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value.__class__ is float:
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return 'Infinity' if value > 0 else '-Infinity'
+    return str(value)
+
+
+# Java int division: truncated towards zero
+def divide_int(dividend: int, divisor: int, line_number: int):
+    if not divisor:
+        raise ArithmeticError(f'Runtime error (L{line_number}): / by zero')
+    quotient = abs(dividend) // abs(divisor)
+    if (dividend < 0) != (divisor < 0):
+        quotient = -quotient
+    return quotient if quotient <= INT_MAX else java_int(quotient)
+
+
+# Java int remainder: sign of the dividend
+def remainder_int(dividend: int, divisor: int, line_number: int):
+    if not divisor:
+        raise ArithmeticError(f'Runtime error (L{line_number}): / by zero')
+    remainder = abs(dividend) % abs(divisor)
+    return -remainder if dividend < 0 else remainder
+
+
+# Java double division: infinite or NaN results instead of errors
+def divide_double(dividend: float, divisor: float):
+    if divisor:
+        return dividend / divisor
+    if dividend == 0 or math.isnan(dividend):
+        return math.nan
+    return math.copysign(math.inf, dividend) * math.copysign(1.0, divisor)
+
+
+# Run a compiled Function on a list of arguments and return its result
+def execute(function, arguments):
+    registers = function.frame[:]
+    registers[:len(arguments)] = arguments
+    code = function.instructions()
+    int_min, int_max = INT_MIN, INT_MAX
+    pc = 0
+    # Dispatch loop: the most frequent instructions are tested first
+    while True:
+        opcode, a, b, c = code[pc]
+        pc += 1
+        if opcode == ADD:
+            value = registers[b] + registers[c]
+            registers[a] = value if int_min <= value <= int_max else java_int(value)
+        elif opcode == SUB:
+            value = registers[b] - registers[c]
+            registers[a] = value if int_min <= value <= int_max else java_int(value)
+        elif opcode == JUMP_LT:
+            if registers[a] < registers[b]:
+                pc = c
+        elif opcode == JUMP_GE:
+            if registers[a] >= registers[b]:
+                pc = c
+        elif opcode == JUMP_GT:
+            if registers[a] > registers[b]:
+                pc = c
+        elif opcode == JUMP_LE:
+            if registers[a] <= registers[b]:
+                pc = c
+        elif opcode == JUMP_EQ:
+            if registers[a] == registers[b]:
+                pc = c
+        elif opcode == JUMP_NE:
+            if registers[a] != registers[b]:
+                pc = c
+        elif opcode == JUMP_IF:
+            if registers[a]:
+                pc = b
+        elif opcode == JUMP_IF_NOT:
+            if not registers[a]:
+                pc = b
+        elif opcode == MOVE:
+            registers[a] = registers[b]
+        elif opcode == MUL:
+            value = registers[b] * registers[c]
+            registers[a] = value if int_min <= value <= int_max else java_int(value)
+        elif opcode == DIV:
+            registers[a] = divide_int(registers[b], registers[c], function.lines[pc - 1])
+        elif opcode == REM:
+            registers[a] = remainder_int(registers[b], registers[c], function.lines[pc - 1])
+        elif opcode == JUMP:
+            pc = a
+        elif opcode == RETURN:
+            return registers[a]
+        elif opcode == DADD:
+            registers[a] = registers[b] + registers[c]
+        elif opcode == DSUB:
+            registers[a] = registers[b] - registers[c]
+        elif opcode == DMUL:
+            registers[a] = registers[b] * registers[c]
+        elif opcode == DDIV:
+            registers[a] = divide_double(registers[b], registers[c])
+        elif opcode == CONCAT:
+            registers[a] = java_string(registers[b]) + java_string(registers[c])
+        elif opcode == INT_TO_DOUBLE:
+            registers[a] = float(registers[b])
+        elif opcode == CHAR_TO_INT:
+            registers[a] = ord(registers[b])
+        else:
+            raise ValueError(f'Invalid opcode {opcode} at {pc - 1} in {function.name}')
+
+
+# TreeEvaluator class
+# Reference interpreter walking the SLRParser tree of the functions at every call,
+# with the variables in a dictionary; the expressions are only lowered once
+class TreeEvaluator:
+    def __init__(self, parse_tree):
+        self.functions = {}
+        stack = [(parse_tree, '')]
+        while stack:
+            node, prefix = stack.pop()
+            if node.label == 'FDECL':
+                self.functions[prefix + node.children[1].label] = node
+            elif node.label == 'CDECL':
+                stack.extend((child, prefix + node.children[1].label + '.') for child in node.children[2:])
+            elif node.label in ('CODE', 'ODECL'):
+                stack.extend((child, prefix) for child in node.children)
+        # Types of the variables of the running call, used to type the expressions
+        self.types = {}
+        self.lowering = ExpressionLowering(self.types.get)
+        # Expression trees, by id of their parse tree node
+        self.expressions = {}
+
+    def call(self, name: str, arguments):
+        node = self.functions[name]
+        return_type, _, arg, block, return_node = node.children
+        self.types.clear()
+        variables = {}
+        leaves = [child for child in arg.children if not child.children]
+        for child in arg.children:
+            if child.label == 'MOREARGS':
+                leaves.extend(leaf for leaf in child.children if leaf.label != ',')
+        for (vtype, name_leaf), value in zip(zip(leaves[0::2], leaves[1::2]), arguments):
+            self.types[name_leaf.label] = vtype.label
+            variables[name_leaf.label] = value
+        self.run_block(block, variables)
+        return self.convert(self.evaluate(return_node.children[0], variables), return_type.label)
+
+    # Widening of char and int values
+    @staticmethod
+    def convert(value, target_type: str):
+        if target_type == 'double' and value.__class__ is not float:
+            return float(ord(value) if value.__class__ is str else value)
+        if target_type == 'int' and value.__class__ is str:
+            return ord(value)
+        return value
+
+    def run_block(self, block, variables):
+        for statement in block.children:
+            if statement.label == 'BLOCK':
+                self.run_block(statement, variables)
+            else:
+                self.run_statement(statement, variables)
+
+    def run_statement(self, statement, variables):
+        children = statement.children
+        first = children[0]
+        if first.label == 'VDECL':
+            vtype, name = first.children[0].label, first.children[1].label
+            self.types[name] = vtype
+            if len(first.children) > 2:
+                variables[name] = self.convert(self.evaluate(first.children[2].children[-1], variables), vtype)
+        elif first.label == 'COND':
+            if len(children) == 3:
+                if self.condition(first, variables):
+                    self.run_block(children[1], variables)
+                elif children[2].children:
+                    self.run_block(children[2].children[0], variables)
+            else:
+                while self.condition(first, variables):
+                    self.run_block(children[1], variables)
+        else:
+            variables[first.label] = self.convert(self.evaluate(children[1].children[-1], variables),
+                                                  self.types[first.label])
+
+    def condition(self, cond, variables):
+        children = cond.children
+        if len(children) == 1:
+            return self.evaluate(children[0], variables)
+        left = self.evaluate(children[0], variables)
+        right = self.evaluate(children[2], variables)
+        if (left.__class__ is str) != (right.__class__ is str):
+            left, right = (ord(left) if left.__class__ is str else left), (ord(right) if right.__class__ is str else right)
+        operator = children[1].label
+        if operator == '<':
+            return left < right
+        if operator == '>':
+            return left > right
+        if operator == '<=':
+            return left <= right
+        if operator == '>=':
+            return left >= right
+        if operator == '==':
+            return left == right
+        return left != right
+
+    def evaluate(self, node, variables):
+        expression = self.expressions.get(id(node))
+        if expression is None:
+            expression = self.lowering.operand(node) if not node.children else self.lowering.lower(node)
+            self.expressions[id(node)] = expression
+        return self.evaluate_tree(expression, variables)
+
+    def evaluate_tree(self, expression, variables):
+        if expression.__class__ is Constant:
+            return expression.value
+        if expression.__class__ is not BinaryOp:
+            return variables[expression.name]
+        left = self.evaluate_tree(expression.left, variables)
+        right = self.evaluate_tree(expression.right, variables)
+        operator = expression.operator
+        if expression.type == 'String':
+            return java_string(left) + java_string(right)
+        if left.__class__ is str:
+            left = ord(left)
+        if right.__class__ is str:
+            right = ord(right)
+        if expression.type == 'double':
+            if operator == '/':
+                return divide_double(left, right)
+            return left + right if operator == '+' else left - right if operator == '-' else left * right
+        if operator == '/':
+            return divide_int(left, right, expression.line_number)
+        return java_int(left + right if operator == '+' else left - right if operator == '-' else left * right)
+
+
+# Parse a source with SLRParser, returning its compiled functions and its tree evaluator
+def load_program(source_code: str):
+    parser = SLRParser(tokenize(source_code))
+    parser.parse()
+    return compile_tree(parser.parse_tree), TreeEvaluator(parser.parse_tree)
+
+
+# Main: run a function of a source with integer arguments
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(f'usage: {sys.argv[0]} FILE FUNCTION [ARGUMENT ...]')
+    with open(sys.argv[1], 'r') as file:
+        functions, _ = load_program(file.read())
+    print(execute(functions[sys.argv[2]], [int(argument) for argument in sys.argv[3:]]))
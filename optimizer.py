@@ -0,0 +1,713 @@
+#### File: optimizer.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Pass manager and optimization passes over the bytecode of compiled functions
+
+
+# Array module for the instruction arrays of the optimized functions
+from array import array
+# Sys module to get program's arguments
+import sys
+# Time module for the pass timers
+import time
+
+from expression_ast import fold_int
+from bytecode_compiler import (ADD, CHAR_TO_INT, COMPARISON_JUMPS, CONCAT, DADD, DDIV, DIV, DMUL, DSUB, INT_TO_DOUBLE,
+                               JUMP, JUMP_EQ, JUMP_GE, JUMP_GT, JUMP_IF, JUMP_IF_NOT, JUMP_LE, JUMP_LT, JUMP_NE, MOVE,
+                               MUL, REGISTER_SLOTS, REM, RETURN, SUB, TARGET_SLOTS, Function, compile_source)
+from interpreter import divide_double, java_string, remainder_int
+
+
+# Instructions writing their first operand, and the operand slots each instruction reads
+DEFINING = frozenset((MOVE, INT_TO_DOUBLE, CHAR_TO_INT, ADD, SUB, MUL, DIV, REM, DADD, DSUB, DMUL, DDIV, CONCAT))
+USE_SLOTS = {opcode: slots[1:] if opcode in DEFINING else slots for opcode, slots in REGISTER_SLOTS.items()}
+CONDITIONAL_JUMPS = frozenset(COMPARISON_JUMPS.values()) | {JUMP_IF, JUMP_IF_NOT}
+# Operators of the int operations, for fold_int
+INT_OPERATORS = {ADD: '+', SUB: '-', MUL: '*', DIV: '/'}
+# Conditional jump taken when the given one is not
+NEGATED_JUMPS = {JUMP_IF: JUMP_IF_NOT, JUMP_IF_NOT: JUMP_IF, JUMP_LT: JUMP_GE, JUMP_GE: JUMP_LT, JUMP_GT: JUMP_LE,
+                 JUMP_LE: JUMP_GT, JUMP_EQ: JUMP_NE, JUMP_NE: JUMP_EQ}
+# Value of a register that is not a known constant (constant propagation lattice)
+VARYING = object()
+
+
+# IR class
+# Mutable form of a compiled Function for the passes: a list of [opcode, a, b, c]
+# instructions with their lines, and the values of the constant registers
+class IR:
+    def __init__(self, function: Function):
+        self.name = function.name
+        self.parameters = function.parameters
+        self.return_type = function.return_type
+        self.instructions = [list(instruction) for instruction in function.instructions()]
+        self.lines = list(function.lines)
+        self.register_count = function.register_count
+        base = function.register_count - len(function.constants)
+        # Constant register -> value, and (type, value) -> constant register
+        self.values = {base + number: value for number, value in enumerate(function.constants)}
+        self.constant_registers = {(value.__class__, value): register for register, value in self.values.items()}
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def new_register(self):
+        self.register_count += 1
+        return self.register_count - 1
+
+    # Register holding a constant value (added to the frame if needed)
+    def constant(self, value):
+        key = (value.__class__, value)
+        register = self.constant_registers.get(key)
+        if register is None:
+            register = self.constant_registers[key] = self.new_register()
+            self.values[register] = value
+        return register
+
+    # Remove the instructions at the given indices; a jump to a removed instruction
+    # goes to the next instruction kept
+    def delete(self, indices):
+        indices = set(indices)
+        if not indices:
+            return
+        new_index = []
+        kept = 0
+        for index in range(len(self.instructions) + 1):
+            new_index.append(kept)
+            if index not in indices:
+                kept += 1
+        self.instructions = [instruction for index, instruction in enumerate(self.instructions) if index not in indices]
+        self.lines = [line for index, line in enumerate(self.lines) if index not in indices]
+        self.retarget(new_index.__getitem__)
+
+    # Insert instructions before `position`; the jumps to `position` reach the new instructions
+    def insert(self, position: int, instructions, lines):
+        count = len(instructions)
+        self.retarget(lambda target: target + count if target > position else target)
+        self.instructions[position:position] = instructions
+        self.lines[position:position] = lines
+
+    def retarget(self, mapping):
+        for instruction in self.instructions:
+            slot = TARGET_SLOTS.get(instruction[0])
+            if slot is not None:
+                instruction[slot] = mapping(instruction[slot])
+
+    # Registers read or written by the instructions, constants included
+    def used_registers(self):
+        used = set()
+        for instruction in self.instructions:
+            used.update(instruction[slot] for slot in REGISTER_SLOTS[instruction[0]])
+        return used
+
+    # Compiled Function of the IR, with its registers renumbered: the parameters first,
+    # then the other registers in use, then the constants in use
+    def to_function(self):
+        used = self.used_registers()
+        values = self.values
+        variables = sorted(register for register in used if register not in values and register >= len(self.parameters))
+        constants = sorted(register for register in used if register in values)
+        numbers = {register: register for register in range(len(self.parameters))}
+        for register in variables + constants:
+            numbers[register] = len(numbers)
+        code = array('i')
+        for instruction in self.instructions:
+            opcode = instruction[0]
+            slots = REGISTER_SLOTS[opcode]
+            code.append(opcode)
+            code.extend(numbers[instruction[slot]] if slot in slots else instruction[slot] for slot in (1, 2, 3))
+        return Function(self.name, self.parameters, self.return_type, code, array('I', self.lines), len(numbers),
+                        [values[register] for register in constants])
+
+
+# Basic blocks of a list of instructions: (start, end) pairs, the successors of each
+# block, and the block starting at each leader
+def basic_blocks(instructions):
+    count = len(instructions)
+    leaders = {0}
+    for index, instruction in enumerate(instructions):
+        opcode = instruction[0]
+        if opcode in TARGET_SLOTS:
+            leaders.add(instruction[TARGET_SLOTS[opcode]])
+            leaders.add(index + 1)
+        elif opcode == RETURN:
+            leaders.add(index + 1)
+    starts = sorted(leader for leader in leaders if leader < count)
+    blocks = list(zip(starts, starts[1:] + [count]))
+    block_at = {start: number for number, (start, _) in enumerate(blocks)}
+    successors = []
+    for start, end in blocks:
+        last = instructions[end - 1]
+        opcode = last[0]
+        if opcode == JUMP:
+            targets = [last[1]]
+        elif opcode in CONDITIONAL_JUMPS:
+            targets = [last[TARGET_SLOTS[opcode]], end]
+        elif opcode == RETURN:
+            targets = []
+        else:
+            targets = [end]
+        successors.append([block_at[target] for target in targets if target < count])
+    return blocks, successors, block_at
+
+
+# Registers read and written by an instruction
+def uses(instruction):
+    return [instruction[slot] for slot in USE_SLOTS[instruction[0]]]
+
+
+def definition(instruction):
+    return instruction[1] if instruction[0] in DEFINING else None
+
+
+# Live registers at the start and at the end of each block (backward dataflow)
+def liveness(instructions, blocks, successors):
+    gen, kill = [], []
+    for start, end in blocks:
+        used, defined = set(), set()
+        for instruction in instructions[start:end]:
+            used.update(register for register in uses(instruction) if register not in defined)
+            register = definition(instruction)
+            if register is not None:
+                defined.add(register)
+        gen.append(used)
+        kill.append(defined)
+    live_in = [set(used) for used in gen]
+    live_out = [set() for _ in blocks]
+    changed = True
+    while changed:
+        changed = False
+        for number in range(len(blocks) - 1, -1, -1):
+            out = set()
+            for successor in successors[number]:
+                out |= live_in[successor]
+            if out != live_out[number]:
+                live_out[number] = out
+                live_in[number] = gen[number] | (out - kill[number])
+                changed = True
+    return live_in, live_out
+
+
+# Whether an instruction may raise an error (int division or remainder by a register that may be zero)
+def may_raise(ir: IR, instruction):
+    return instruction[0] in (DIV, REM) and not ir.values.get(instruction[3])
+
+
+# Value of an operation on constant values, or VARYING when it cannot be folded
+def fold(opcode: int, operands):
+    if opcode == MOVE:
+        return operands[0]
+    if opcode == INT_TO_DOUBLE:
+        return float(operands[0])
+    if opcode == CHAR_TO_INT:
+        return ord(operands[0])
+    if opcode == CONCAT:
+        return java_string(operands[0]) + java_string(operands[1])
+    left, right = operands
+    if opcode in INT_OPERATORS:
+        value = fold_int(INT_OPERATORS[opcode], left, right)
+        return VARYING if value is None else value
+    if opcode == REM:
+        return remainder_int(left, right, 0) if right else VARYING
+    if opcode == DADD:
+        return left + right
+    if opcode == DSUB:
+        return left - right
+    if opcode == DMUL:
+        return left * right
+    return divide_double(left, right)
+
+
+# Whether a conditional jump on constant values is taken
+def jump_taken(opcode: int, operands):
+    if opcode == JUMP_IF:
+        return bool(operands[0])
+    if opcode == JUMP_IF_NOT:
+        return not operands[0]
+    left, right = operands
+    if opcode == JUMP_LT:
+        return left < right
+    if opcode == JUMP_GE:
+        return left >= right
+    if opcode == JUMP_GT:
+        return left > right
+    if opcode == JUMP_LE:
+        return left <= right
+    if opcode == JUMP_EQ:
+        return left == right
+    return left != right
+
+
+# Passes: functions modifying an IR in place
+
+# Give a register of its own to each value used only in the block defining it
+# (the temporaries of the expressions share registers between statements, which
+# would otherwise keep their instructions in loops)
+def split_live_ranges(ir: IR):
+    instructions = ir.instructions
+    blocks, successors, _ = basic_blocks(instructions)
+    _, live_out = liveness(instructions, blocks, successors)
+    definitions = {}
+    for instruction in instructions:
+        register = definition(instruction)
+        if register is not None:
+            definitions[register] = definitions.get(register, 0) + 1
+    for number, (start, end) in enumerate(blocks):
+        for index in range(start, end):
+            register = definition(instructions[index])
+            if register is None or definitions[register] < 2:
+                continue
+            # Uses of this value, up to the next definition of the register in the block
+            readers = []
+            local = False
+            for later in range(index + 1, end):
+                instruction = instructions[later]
+                if register in uses(instruction):
+                    readers.append(later)
+                if definition(instruction) == register:
+                    local = True
+                    break
+            if not local and register in live_out[number]:
+                continue
+            renamed = ir.new_register()
+            instructions[index][1] = renamed
+            for later in readers:
+                instruction = instructions[later]
+                for slot in USE_SLOTS[instruction[0]]:
+                    if instruction[slot] == register:
+                        instruction[slot] = renamed
+            definitions[register] -= 1
+
+
+# Constant propagation over the control flow graph: the registers holding a known
+# constant at each instruction are replaced by constant registers, operations on
+# constants are folded into moves, and jumps on constants are resolved. The register
+# tested by a JUMP_IF or JUMP_IF_NOT (a boolean) is known on each of its two edges,
+# and a JUMP to a conditional jump whose outcome is known at the JUMP goes straight
+# to the destination of that jump (e.g. to the exit of a loop after `searching = false`).
+def propagate_constants(ir: IR):
+    instructions = ir.instructions
+    blocks, successors, block_at = basic_blocks(instructions)
+    values = ir.values
+    predecessors = [[] for _ in blocks]
+    for number, targets in enumerate(successors):
+        for successor in targets:
+            predecessors[successor].append(number)
+
+    # State at the end of a block along its edge to `successor`
+    def edge_state(number, successor):
+        out = states_out[number]
+        if out is None:
+            return None
+        start, end = blocks[number]
+        last = instructions[end - 1]
+        if last[0] not in (JUMP_IF, JUMP_IF_NOT) or last[1] in values or block_at.get(last[2]) == block_at.get(end):
+            return out
+        taken = successor == block_at.get(last[2])
+        out = dict(out)
+        out[last[1]] = taken if last[0] == JUMP_IF else not taken
+        return out
+
+    # Value of an operand in a state (register -> constant value or VARYING)
+    def value(state, register):
+        if register in values:
+            return values[register]
+        return state.get(register, VARYING)
+
+    def transfer(state, instruction):
+        register = definition(instruction)
+        if register is not None:
+            operands = [value(state, operand) for operand in uses(instruction)]
+            state[register] = VARYING if VARYING in operands else fold(instruction[0], operands)
+
+    # Registers not written on a path are left out of the states (unknown so far)
+    entry = {register: VARYING for register in range(len(ir.parameters))}
+    states_in = [None] * len(blocks)
+    states_out = [None] * len(blocks)
+    states_in[0] = entry
+    worklist = [0]
+    while worklist:
+        number = worklist.pop()
+        state = dict(states_in[number])
+        start, end = blocks[number]
+        for instruction in instructions[start:end]:
+            transfer(state, instruction)
+        if state == states_out[number]:
+            continue
+        states_out[number] = state
+        for successor in successors[number]:
+            # Meet of the states of the predecessors reached so far
+            merged = None
+            for predecessor in predecessors[successor]:
+                out = edge_state(predecessor, successor)
+                if out is None:
+                    continue
+                if merged is None:
+                    merged = dict(out)
+                    continue
+                for register, constant in out.items():
+                    known = merged.get(register, constant)
+                    same = known is constant or (known.__class__ is constant.__class__ and known == constant)
+                    merged[register] = known if same else VARYING
+            if successor == 0:
+                merged.update(entry)
+            if merged != states_in[successor]:
+                states_in[successor] = merged
+                worklist.append(successor)
+
+    # Rewrite the instructions with the states at their start
+    removed = []
+    for number, (start, end) in enumerate(blocks):
+        if states_in[number] is None:
+            # Unreachable block
+            continue
+        state = dict(states_in[number])
+        for index in range(start, end):
+            instruction = instructions[index]
+            opcode = instruction[0]
+            operands = [value(state, operand) for operand in uses(instruction)]
+            for slot, constant in zip(USE_SLOTS[opcode], operands):
+                if constant is not VARYING:
+                    instruction[slot] = ir.constant(constant)
+            if VARYING not in operands:
+                if opcode in DEFINING:
+                    folded = fold(opcode, operands)
+                    if folded is not VARYING:
+                        instruction[0:4] = [MOVE, instruction[1], ir.constant(folded), 0]
+                elif opcode in CONDITIONAL_JUMPS:
+                    if jump_taken(opcode, operands):
+                        instruction[0:4] = [JUMP, instruction[TARGET_SLOTS[opcode]], 0, 0]
+                    else:
+                        removed.append(index)
+            transfer(state, instruction)
+        # Jump threading, with the state at the end of the block
+        last = instructions[end - 1]
+        target = last[1]
+        seen = set()
+        while last[0] == JUMP and target < len(instructions) and instructions[target][0] == JUMP and target not in seen:
+            seen.add(target)
+            target = instructions[target][1]
+        if last[0] == JUMP and target < len(instructions) and instructions[target][0] in CONDITIONAL_JUMPS:
+            jump = instructions[target]
+            operands = [value(state, operand) for operand in uses(jump)]
+            if VARYING not in operands:
+                last[1] = jump[TARGET_SLOTS[jump[0]]] if jump_taken(jump[0], operands) else target + 1
+    ir.delete(removed)
+
+
+# Simplify the control flow: jumps to jumps go to the final target, a conditional jump
+# over a JUMP is inverted to take its place, and jumps to the next instruction and
+# unreachable instructions are removed
+def clean_jumps(ir: IR):
+    while True:
+        instructions = ir.instructions
+        targets = {instruction[TARGET_SLOTS[instruction[0]]] for instruction in instructions
+                   if instruction[0] in TARGET_SLOTS}
+        inverted = []
+        for index, instruction in enumerate(instructions[:-1]):
+            opcode = instruction[0]
+            following = instructions[index + 1]
+            if (opcode in CONDITIONAL_JUMPS and instruction[TARGET_SLOTS[opcode]] == index + 2
+                    and following[0] == JUMP and index + 1 not in targets):
+                instruction[0] = NEGATED_JUMPS[opcode]
+                instruction[TARGET_SLOTS[opcode]] = following[1]
+                targets.add(following[1])
+                inverted.append(index + 1)
+        ir.delete(inverted)
+        instructions = ir.instructions
+        for instruction in instructions:
+            slot = TARGET_SLOTS.get(instruction[0])
+            if slot is None:
+                continue
+            seen = set()
+            target = instruction[slot]
+            while target < len(instructions) and instructions[target][0] == JUMP and target not in seen:
+                seen.add(target)
+                target = instructions[target][1]
+            instruction[slot] = target
+        removed = {index for index, instruction in enumerate(instructions)
+                   if instruction[0] in TARGET_SLOTS and instruction[TARGET_SLOTS[instruction[0]]] == index + 1}
+        blocks, successors, _ = basic_blocks(instructions)
+        reached = {0}
+        stack = [0]
+        while stack:
+            for successor in successors[stack.pop()]:
+                if successor not in reached:
+                    reached.add(successor)
+                    stack.append(successor)
+        for number, (start, end) in enumerate(blocks):
+            if number not in reached:
+                removed.update(range(start, end))
+        if not removed:
+            return
+        ir.delete(removed)
+
+
+# Dead-store elimination: instructions writing a register that is not read afterwards
+# are removed (unless they may raise an error), until none is left
+def eliminate_dead_stores(ir: IR):
+    while True:
+        instructions = ir.instructions
+        blocks, successors, _ = basic_blocks(instructions)
+        _, live_out = liveness(instructions, blocks, successors)
+        removed = []
+        for number, (start, end) in enumerate(blocks):
+            live = set(live_out[number])
+            for index in range(end - 1, start - 1, -1):
+                instruction = instructions[index]
+                register = definition(instruction)
+                if register is not None and not may_raise(ir, instruction) and (
+                        register not in live or (instruction[0] == MOVE and instruction[2] == register)):
+                    removed.append(index)
+                    continue
+                if register is not None:
+                    live.discard(register)
+                live.update(uses(instruction))
+        if not removed:
+            return
+        ir.delete(removed)
+
+
+# Loop-invariant code motion for the while loops, compiled as
+#   JUMP condition; body: ...; condition: ...; conditional jump to body
+# Instructions of the loop whose operands are not written in the loop are moved before
+# its first JUMP when their register is written once in the loop, and is read neither
+# before that write in the loop nor after the loop (a loop may run zero times)
+def hoist_loop_invariants(ir: IR):
+    moved = True
+    while moved:
+        moved = False
+        instructions = ir.instructions
+        blocks, successors, block_at = basic_blocks(instructions)
+        live_in, _ = liveness(instructions, blocks, successors)
+        # Back edges, innermost loops first
+        loops = []
+        for index, instruction in enumerate(instructions):
+            slot = TARGET_SLOTS.get(instruction[0])
+            if slot is not None and 0 < instruction[slot] <= index:
+                loops.append((index - instruction[slot], instruction[slot], index))
+        for _, body, last in sorted(loops):
+            entry = instructions[body - 1]
+            if entry[0] != JUMP or not body <= entry[1] <= last:
+                continue
+            region = range(body, last + 1)
+            # Only entered by its first JUMP, and left at its end or by jumps
+            exits = set()
+            valid = True
+            for index, instruction in enumerate(instructions):
+                slot = TARGET_SLOTS.get(instruction[0])
+                inside = index in region
+                if instruction[0] == RETURN and inside:
+                    valid = False
+                if slot is None:
+                    continue
+                target = instruction[slot]
+                if not inside and index != body - 1 and target in region:
+                    valid = False
+                elif inside and target not in region:
+                    exits.add(target)
+            if not valid:
+                continue
+            exits.add(last + 1)
+            live_outside = set()
+            for target in exits:
+                if target in block_at:
+                    live_outside |= live_in[block_at[target]]
+            live_outside |= live_in[block_at[entry[1]]] | live_in[block_at[body]]
+
+            definitions = {}
+            for index in region:
+                register = definition(instructions[index])
+                if register is not None:
+                    definitions[register] = definitions.get(register, 0) + 1
+            invariants = []
+            hoisted = set()
+            for index in region:
+                instruction = instructions[index]
+                register = definition(instruction)
+                if (register is None or definitions[register] != 1 or register in live_outside
+                        or may_raise(ir, instruction)):
+                    continue
+                if all(operand not in definitions or operand in hoisted for operand in uses(instruction)):
+                    invariants.append(index)
+                    hoisted.add(register)
+            if invariants:
+                moved_instructions = [instructions[index] for index in invariants]
+                moved_lines = [ir.lines[index] for index in invariants]
+                ir.delete(invariants)
+                ir.insert(body - 1, moved_instructions, moved_lines)
+                moved = True
+                break
+
+
+# Registers live after each instruction of a block, given the registers live at its end
+def live_after(instructions, start: int, end: int, live_out):
+    live = set(live_out)
+    result = [None] * (end - start)
+    for index in range(end - 1, start - 1, -1):
+        result[index - start] = set(live)
+        instruction = instructions[index]
+        register = definition(instruction)
+        if register is not None:
+            live.discard(register)
+        live.update(uses(instruction))
+    return result
+
+
+# Fuse the remainder idiom of the subset (it has no % operator), a - a / b * b compiled as
+#   DIV t a b; MUL u t b; SUB v a u
+# into REM v a b when t and u are not read afterwards: one instruction instead of three,
+# raising the same error at the same line on a zero divisor
+def fuse_remainders(ir: IR):
+    instructions = ir.instructions
+    blocks, successors, _ = basic_blocks(instructions)
+    _, live_out = liveness(instructions, blocks, successors)
+    removed = []
+    for number, (start, end) in enumerate(blocks):
+        live = live_after(instructions, start, end, live_out[number])
+        index = start
+        while index + 2 < end:
+            division, product, difference = instructions[index:index + 3]
+            quotient, dividend, divisor = division[1:]
+            result = difference[1]
+            if (division[0] == DIV and product[0] == MUL and difference[0] == SUB
+                    and tuple(product[2:]) in ((quotient, divisor), (divisor, quotient))
+                    and difference[2] == dividend and difference[3] == product[1]
+                    and quotient not in (dividend, divisor) and product[1] != dividend
+                    and all(register == result or register not in live[index + 2 - start]
+                            for register in (quotient, product[1]))):
+                division[0:4] = [REM, result, dividend, divisor]
+                removed.extend((index + 1, index + 2))
+                index += 3
+            else:
+                index += 1
+    ir.delete(removed)
+
+
+# Coalesce the registers whose values are never live at the same time, the variables
+# and temporaries left by the compiler and by split_live_ranges: registers are colored
+# greedily over their interference graph, a MOVE between two registers that do not
+# otherwise interfere giving them the same register (the MOVE is then removed). The
+# parameters, and any register read before being written, keep their number.
+def coalesce_registers(ir: IR):
+    instructions = ir.instructions
+    if not instructions:
+        return
+    blocks, successors, _ = basic_blocks(instructions)
+    live_in, live_out = liveness(instructions, blocks, successors)
+    values = ir.values
+    fixed = set(range(len(ir.parameters))) | {register for register in live_in[0] if register not in values}
+    interference = {}
+    partners = {}
+    for number, (start, end) in enumerate(blocks):
+        live = live_after(instructions, start, end, live_out[number])
+        for index in range(start, end):
+            instruction = instructions[index]
+            register = definition(instruction)
+            if register is None:
+                continue
+            neighbors = interference.setdefault(register, set())
+            source = instruction[2] if instruction[0] == MOVE else None
+            if source is not None and source not in values:
+                partners.setdefault(register, []).append(source)
+                partners.setdefault(source, []).append(register)
+            for other in live[index - start]:
+                if other != register and other != source and other not in values:
+                    neighbors.add(other)
+                    interference.setdefault(other, set()).add(register)
+
+    colors = {register: register for register in fixed}
+    palette = [register for register in range(ir.register_count) if register not in values]
+    for register in sorted(set(interference) - fixed):
+        taken = {colors[other] for other in interference[register] if other in colors}
+        preferred = [colors[partner] for partner in partners.get(register, ()) if partner in colors]
+        colors[register] = next(color for color in preferred + palette if color not in taken)
+
+    removed = []
+    for index, instruction in enumerate(instructions):
+        for slot in REGISTER_SLOTS[instruction[0]]:
+            instruction[slot] = colors.get(instruction[slot], instruction[slot])
+        if instruction[0] == MOVE and instruction[1] == instruction[2]:
+            removed.append(index)
+    ir.delete(removed)
+
+
+# Optimization passes by name
+PASSES = {
+    'split-live-ranges': split_live_ranges,
+    'constant-propagation': propagate_constants,
+    'jump-cleanup': clean_jumps,
+    'loop-invariant-code-motion': hoist_loop_invariants,
+    'dead-store-elimination': eliminate_dead_stores,
+    'remainder-fusion': fuse_remainders,
+    'register-coalescing': coalesce_registers,
+}
+
+# Constant propagation runs twice: the branches it folds and threads give the second
+# run more precise states at the loop headers
+DEFAULT_PIPELINE = ('split-live-ranges', 'jump-cleanup', 'constant-propagation', 'jump-cleanup', 'constant-propagation',
+                    'jump-cleanup', 'loop-invariant-code-motion', 'dead-store-elimination', 'remainder-fusion',
+                    'register-coalescing', 'jump-cleanup')
+
+
+# PassStats class
+# Time and IR size (instructions and registers in use) around one run of a pass
+class PassStats:
+    __slots__ = ('name', 'function', 'seconds', 'instructions_before', 'instructions_after', 'registers_before',
+                 'registers_after')
+
+    def __init__(self, name: str, function: str):
+        self.name = name
+        self.function = function
+        self.seconds = 0.0
+        self.instructions_before = self.instructions_after = 0
+        self.registers_before = self.registers_after = 0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# PassManager class
+# Runs a pipeline of passes (names of PASSES, or (name, function) pairs for other
+# passes) over functions, recording a PassStats for each pass run
+class PassManager:
+    def __init__(self, pipeline=DEFAULT_PIPELINE):
+        self.pipeline = [(step, PASSES[step]) if isinstance(step, str) else step for step in pipeline]
+        self.statistics = []
+
+    # Optimized copy of a compiled Function
+    def run(self, function: Function):
+        ir = IR(function)
+        for name, optimization in self.pipeline:
+            stats = PassStats(name, function.name)
+            stats.instructions_before, stats.registers_before = len(ir), len(ir.used_registers())
+            start = time.perf_counter()
+            optimization(ir)
+            stats.seconds = time.perf_counter() - start
+            stats.instructions_after, stats.registers_after = len(ir), len(ir.used_registers())
+            self.statistics.append(stats)
+        return ir.to_function()
+
+    # Optimize the functions of a program (name -> Function)
+    def run_all(self, functions):
+        return {name: self.run(function) for name, function in functions.items()}
+
+    def report(self):
+        width = max([len(stats.function) for stats in self.statistics] + [len('function')]) + 2
+        lines = ["----------PASSES----------",
+                 f'{"function":<{width}}{"pass":<28}{"ms":>9}{"instructions":>15}{"registers":>12}']
+        for stats in self.statistics:
+            lines.append(f'{stats.function:<{width}}{stats.name:<28}{stats.seconds * 1000:9.3f}'
+                         f'{stats.instructions_before:>7} -> {stats.instructions_after:<4}'
+                         f'{stats.registers_before:>5} -> {stats.registers_after:<3}')
+        return '\n'.join(lines)
+
+
+# Main: print the optimized bytecode of the functions of a source, and the pass statistics
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(f'usage: {sys.argv[0]} FILE')
+    with open(sys.argv[1], 'r') as file:
+        functions = compile_source(file.read())
+    pass_manager = PassManager()
+    for optimized in pass_manager.run_all(functions).values():
+        print(optimized.disassemble())
+    print(pass_manager.report(), file=sys.stderr)
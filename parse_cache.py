@@ -0,0 +1,216 @@
+#### File: parse_cache.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: On-disk cache of tokens and parse trees keyed by source content
+
+
+# Hashlib module to hash the source contents
+import hashlib
+# Os module to manage the cache files
+import os
+# Pickle module to store the cache entries
+import pickle
+# Ordered dictionary used as the LRU index
+from collections import OrderedDict
+
+from syntax_analyzer import ANALYZER_VERSION, ParseTreeNode, ParsingError, SyntaxAnalyzer, Token, tokenize
+
+
+# Default bounds of the cache
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Suffix of the cache entry files
+ENTRY_SUFFIX = '.parse'
+
+
+# Flatten a parse tree into a preorder list of (label, number of children, line number)
+# records (the line number of the inner nodes is None)
+# Iterative so that deep trees do not hit the recursion limit
+def flatten_tree(root):
+    records = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        records.append((node.label, len(node.children), node.line_number))
+        # Push the children in reverse order to visit them left to right
+        stack.extend(reversed(node.children))
+    return records
+
+
+# Rebuild a parse tree from the records of `flatten_tree`
+def build_tree(records):
+    root = None
+    # Stack of [node, number of children still to attach]
+    pending = []
+    for label, child_count, line_number in records:
+        node = ParseTreeNode(label)
+        if line_number is not None:
+            node.line_number = line_number
+        if pending:
+            parent = pending[-1]
+            parent[0].children.append(node)
+            parent[1] -= 1
+            if parent[1] == 0:
+                pending.pop()
+        else:
+            root = node
+        if child_count:
+            pending.append([node, child_count])
+    return root
+
+
+# Picklable record of a parsing failure: (message, line number, expected, found),
+# the line number being None for errors other than ParsingError
+def error_fields(exception):
+    if isinstance(exception, ParsingError):
+        return exception.message, exception.line_number, exception.expected, exception.found
+    return str(exception), None, None, None
+
+
+# Exception of an error record
+def error_from_fields(fields):
+    message, line_number, expected, found = fields
+    if line_number is None:
+        return Exception(message)
+    return ParsingError(message, line_number, expected, found)
+
+
+# ParseCache class
+# Maps the hash of a source (plus the analyzer version) to its tokens and
+# parse tree, stored as one file per entry and evicted least recently used first
+# The LRU index is read from the disk once per process: processes sharing a directory
+# only bound it by the entries they know of (see run_batch in syntax_analyzer)
+class ParseCache:
+    def __init__(self, directory: str, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Hit and miss counters
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        # LRU index: key -> entry size, least recently used first
+        self.index = OrderedDict()
+        self.total_bytes = 0
+        self.load_index()
+
+    # Rebuild the LRU index from the files on disk, ordered by modification time
+    def load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name[:-len(ENTRY_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.index[key] = size
+            self.total_bytes += size
+
+    # Cache key of a source
+    @staticmethod
+    def key(source_bytes: bytes):
+        digest = hashlib.sha256(ANALYZER_VERSION.encode())
+        digest.update(b'\0')
+        digest.update(source_bytes)
+        return digest.hexdigest()
+
+    def entry_path(self, key: str):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    # Return the cached (tokens, tree records, error) for `key`, or None
+    def get(self, key: str):
+        if key not in self.index:
+            return None
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as file:
+                entry = pickle.load(file)
+            # Touch the file so the recency survives across runs
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, ImportError):
+            # Entry removed by another process, corrupted, or referring to classes that changed
+            self.discard(key)
+            return None
+        self.index.move_to_end(key)
+        return entry
+
+    # Store an entry and evict the least recently used ones if needed
+    def put(self, key: str, entry):
+        path = self.entry_path(key)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary_path, 'wb') as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            # Atomic replace so concurrent readers never see a partial entry
+            os.replace(temporary_path, path)
+        finally:
+            # Left behind only when the entry could not be written
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        size = os.path.getsize(path)
+        if key in self.index:
+            self.total_bytes -= self.index[key]
+        self.index[key] = size
+        self.index.move_to_end(key)
+        self.total_bytes += size
+        self.evict()
+
+    # Drop least recently used entries until the bounds are respected
+    def evict(self):
+        while self.index and (len(self.index) > self.max_entries or self.total_bytes > self.max_bytes):
+            key = next(iter(self.index))
+            self.discard(key)
+
+    # Remove an entry from the index and from the disk
+    def discard(self, key: str):
+        size = self.index.pop(key, None)
+        if size is not None:
+            self.total_bytes -= size
+        try:
+            os.remove(self.entry_path(key))
+        except OSError:
+            pass
+
+    # Tokens and parse tree of a source, from the cache when possible
+    # Raises the original parsing error for sources known to be invalid
+    def analyze_source(self, source_code: str):
+        tokens, parse_tree, error = self.analyze_source_result(source_code)
+        if error is not None:
+            raise error
+        return tokens, parse_tree
+
+    # Same as `analyze_source` for a file
+    def analyze_file(self, file_path: str):
+        with open(file_path, 'r') as file:
+            return self.analyze_source(file.read())
+
+    # Tokens, parse tree (None on failure) and parsing error (None on success) of a source,
+    # from the cache when possible: the tokens of an invalid source are returned as well
+    def analyze_source_result(self, source_code: str):
+        key = self.key(source_code.encode())
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+            tokens = tokenize(source_code)
+            try:
+                analyzer = SyntaxAnalyzer(tokens)
+                analyzer.parse()
+                records, error = flatten_tree(analyzer.parse_tree), None
+            except Exception as exception:
+                records, error = None, error_fields(exception)
+            entry = ([(token.type, token.value, token.line_number) for token in tokens], records, error)
+            self.put(key, entry)
+        else:
+            self.hits += 1
+        token_records, records, error = entry
+        tokens = [Token(token_type, value, line_number) for token_type, value, line_number in token_records]
+        if error is not None:
+            return tokens, None, error_from_fields(error)
+        return tokens, build_tree(records), None
+
+    # Same as `analyze_source_result` for a file
+    def analyze_file_result(self, file_path: str):
+        with open(file_path, 'r') as file:
+            return self.analyze_source_result(file.read())
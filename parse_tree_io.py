@@ -0,0 +1,328 @@
+#### File: parse_tree_io.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Buffered output of tokens and parse trees (text, JSON lines) and binary dump/load of trees
+
+
+# Array module for the binary node records
+from array import array
+# Io module for the in-memory binary output
+import io
+# Json string encoder (C implementation) for the JSON lines values
+from json.encoder import encode_basestring
+# Mmap module to load binary trees without reading them into memory
+import mmap
+# Struct module for the binary header
+import struct
+# Sys module for the byte order, the standard output and the command line
+import sys
+
+
+# Number of lines joined into a single write
+CHUNK_LINES = 8192
+
+# Binary tree format (see dump): magic, version, then the header fields
+BINARY_MAGIC = b'PTRE'
+BINARY_VERSION = 3
+# Header: magic, version, number of labels, number of nodes, size of the string table
+BINARY_HEADER = struct.Struct('<4sIIII')
+
+
+# Write lines to a text file in chunks instead of one write per line
+def write_lines(file, lines):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == CHUNK_LINES:
+            chunk.append('')
+            file.write('\n'.join(chunk))
+            chunk = []
+    if chunk:
+        chunk.append('')
+        file.write('\n'.join(chunk))
+
+
+# Token lines of the text output: value, line number and type
+def iter_token_lines(tokens):
+    for token in tokens:
+        yield f'{token.value}\t(L{token.line_number})\t--->\t{token.type}'
+
+
+# Tree lines of the text output: one label per line, indented by depth
+def iter_tree_lines(root, indent: str = ''):
+    # Indent strings are built once per depth and reused
+    indents = [indent]
+    stack = [(root, 0)]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        node, depth = pop()
+        yield indents[depth] + node.label
+        children = node.children
+        if children:
+            depth += 1
+            if depth == len(indents):
+                indents.append(indents[-1] + '  ')
+            # Push the children in reverse order to write them left to right
+            extend((child, depth) for child in reversed(children))
+
+
+# The writers take the tokens, the parse tree (None when parsing failed, only the
+# tokens are written then) and the syntax errors found in recovering mode
+
+# Text output, identical to the one of print and print_parse_tree
+def write_text(file, tokens, parse_tree, diagnostics=()):
+    file.write("----------TOKENS----------\n")
+    write_lines(file, iter_token_lines(tokens))
+    if parse_tree is None:
+        return
+    file.write("----------PARSE TREE----------\n")
+    write_lines(file, iter_tree_lines(parse_tree))
+    if diagnostics:
+        file.write("----------ERRORS----------\n")
+        write_lines(file, (str(diagnostic) for diagnostic in diagnostics))
+
+
+# JSON lines output: one object per token, per node (preorder, with its number of
+# children so the tree can be rebuilt) and per syntax error
+def write_jsonl(file, tokens, parse_tree, diagnostics=()):
+    encode = encode_basestring
+    write_lines(file, (f'{{"kind":"token","type":"{token.type}","value":{encode(token.value)},'
+                       f'"line":{token.line_number}}}' for token in tokens))
+
+    def iter_node_lines():
+        stack = [parse_tree] if parse_tree is not None else []
+        while stack:
+            node = stack.pop()
+            children = node.children
+            yield f'{{"kind":"node","label":{encode(node.label)},"children":{len(children)}}}'
+            stack.extend(reversed(children))
+    write_lines(file, iter_node_lines())
+
+    write_lines(file, (f'{{"kind":"error","line":{diagnostic.line_number},'
+                       f'"message":{encode(str(diagnostic))}}}' for diagnostic in diagnostics))
+
+
+# Binary tree format (dump / load), all integers little-endian uint32:
+#   header (BINARY_HEADER), then for the nodes in preorder: their label codes, their
+#   numbers of children, the sizes of their subtrees (so that the next sibling
+#   of node i is node i + size[i]) and the line numbers of the leaves (0 for the
+#   inner nodes and the leaves without a line), then the end offsets of the labels in the
+#   string table and the string table itself (UTF-8 labels, concatenated)
+def dump(parse_tree, file):
+    label_codes = {}
+    labels = []
+    node_labels = array('I')
+    child_counts = array('I')
+    node_lines = array('I')
+    stack = [parse_tree]
+    while stack:
+        node = stack.pop()
+        label = node.label
+        code = label_codes.get(label)
+        if code is None:
+            code = label_codes[label] = len(labels)
+            labels.append(label.encode())
+        node_labels.append(code)
+        children = node.children
+        child_counts.append(len(children))
+        node_lines.append(0 if children else node.line_number or 0)
+        stack.extend(reversed(children))
+
+    # Subtree sizes, from the last node backwards: the sizes of the children of a
+    # node are then on top of the stack, first child first
+    subtree_sizes = array('I', bytes(4 * len(child_counts)))
+    sizes = []
+    for index in range(len(child_counts) - 1, -1, -1):
+        size = 1
+        for _ in range(child_counts[index]):
+            size += sizes.pop()
+        subtree_sizes[index] = size
+        sizes.append(size)
+
+    label_ends = array('I')
+    end = 0
+    for label in labels:
+        end += len(label)
+        label_ends.append(end)
+    if sys.byteorder != 'little':
+        for values in (node_labels, child_counts, subtree_sizes, node_lines, label_ends):
+            values.byteswap()
+
+    file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(labels), len(node_labels), end))
+    file.write(node_labels.tobytes())
+    file.write(child_counts.tobytes())
+    file.write(subtree_sizes.tobytes())
+    file.write(node_lines.tobytes())
+    file.write(label_ends.tobytes())
+    file.write(b''.join(labels))
+
+
+# Binary format as bytes
+def dumps(parse_tree):
+    buffer = io.BytesIO()
+    dump(parse_tree, buffer)
+    return buffer.getvalue()
+
+
+# LoadedTree class
+# Parse tree read from the binary format without building its nodes: the arrays
+# are memoryviews over the data (a memory-mapped file for `load`), and nodes are
+# LoadedNode views created on access, with their labels decoded on first use
+class LoadedTree:
+    def __init__(self, data, mapping=None):
+        # Memory map to close with the tree (None for in-memory data)
+        self.mapping = mapping
+        self.data = memoryview(data)
+        magic, version, label_count, node_count, strings_size = BINARY_HEADER.unpack_from(self.data)
+        if magic != BINARY_MAGIC:
+            raise ValueError('Not a binary parse tree')
+        if version != BINARY_VERSION:
+            raise ValueError(f'Unsupported binary parse tree version: {version}')
+        offset = BINARY_HEADER.size
+        self.node_labels, offset = self.uint32_array(offset, node_count)
+        self.child_counts, offset = self.uint32_array(offset, node_count)
+        self.subtree_sizes, offset = self.uint32_array(offset, node_count)
+        self.node_lines, offset = self.uint32_array(offset, node_count)
+        self.label_ends, offset = self.uint32_array(offset, label_count)
+        self.strings = self.data[offset:offset + strings_size]
+        if len(self.strings) != strings_size:
+            raise ValueError('Truncated binary parse tree')
+        # Decoded labels, filled on demand
+        self.labels = [None] * label_count
+
+    # `count` uint32 values at `offset`, and the offset following them
+    def uint32_array(self, offset: int, count: int):
+        end = offset + 4 * count
+        if end > len(self.data):
+            raise ValueError('Truncated binary parse tree')
+        values = self.data[offset:end].cast('I')
+        if sys.byteorder != 'little':
+            # Copied once to the native byte order
+            values = array('I', values.tobytes())
+            values.byteswap()
+        return values, end
+
+    def __len__(self):
+        return len(self.node_labels)
+
+    # Label of a node
+    def label(self, index: int):
+        code = self.node_labels[index]
+        label = self.labels[code]
+        if label is None:
+            start = self.label_ends[code - 1] if code else 0
+            label = self.labels[code] = str(self.strings[start:self.label_ends[code]], 'utf-8')
+        return label
+
+    # Line number of a leaf, None when unknown
+    def line_number(self, index: int):
+        return self.node_lines[index] or None
+
+    # Numbers of the children of a node, in order
+    def iter_children(self, index: int):
+        subtree_sizes = self.subtree_sizes
+        child = index + 1
+        for _ in range(self.child_counts[index]):
+            yield child
+            child += subtree_sizes[child]
+
+    # Preorder (label, number of children, line number) records, as parse_cache.flatten_tree
+    def iter_records(self):
+        child_counts = self.child_counts
+        for index in range(len(self.node_labels)):
+            yield self.label(index), child_counts[index], self.line_number(index)
+
+    @property
+    def root(self):
+        return LoadedNode(self, 0)
+
+    # Release the views and the memory map
+    def close(self):
+        for values in (self.node_labels, self.child_counts, self.subtree_sizes, self.node_lines, self.label_ends):
+            if isinstance(values, memoryview):
+                values.release()
+        self.strings.release()
+        self.data.release()
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# LoadedNode class
+# Read-only view of a node of a LoadedTree, usable wherever a ParseTreeNode is read
+# (label, children and line_number), e.g. by print_parse_tree, the writers of this
+# module or SemanticAnalyzer
+class LoadedNode:
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def label(self):
+        return self.tree.label(self.index)
+
+    @property
+    def line_number(self):
+        return self.tree.line_number(self.index)
+
+    # Views of the same node are equal, so that nodes can key dictionaries
+    def __eq__(self, other):
+        return other.__class__ is LoadedNode and other.tree is self.tree and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    @property
+    def children(self):
+        tree = self.tree
+        return [LoadedNode(tree, child) for child in tree.iter_children(self.index)]
+
+
+# Load a binary parse tree from a file, memory-mapped so that only the parts of the
+# tree that are traversed are read (close the tree, or use it as a context manager)
+def load(file_path: str):
+    with open(file_path, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return LoadedTree(mapping, mapping)
+
+
+# Load a binary parse tree from bytes (not copied)
+def loads(data):
+    return LoadedTree(data)
+
+
+# Binary output of the parse tree (tokens and errors are left out)
+def write_binary(file, tokens, parse_tree, diagnostics=()):
+    if parse_tree is not None:
+        dump(parse_tree, file)
+
+
+# Output formats: name -> (writer, whether it writes bytes)
+FORMATS = {
+    'text': (write_text, False),
+    'jsonl': (write_jsonl, False),
+    'binary': (write_binary, True),
+}
+
+
+# Write the tokens, parse tree and errors to the standard output in the given format
+def write_output(output_format: str, tokens, parse_tree, diagnostics=()):
+    writer, binary = FORMATS[output_format]
+    file = sys.stdout.buffer if binary else sys.stdout
+    writer(file, tokens, parse_tree, diagnostics)
+    file.flush()
+
+
+# Main: print a binary parse tree (written with --format binary) as text
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(f'usage: {sys.argv[0]} TREE_FILE')
+    with load(sys.argv[1]) as tree:
+        write_lines(sys.stdout, iter_tree_lines(tree.root))
@@ -0,0 +1,552 @@
+#### File: semantic_analyzer.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Scoped symbol table and semantic checks (undeclared identifiers, types) over parse trees
+
+
+# Sys module to get program's arguments
+import sys
+
+from syntax_analyzer import classify_lexeme, tokenize
+from slr_parser import SLRParser
+from expression_ast import NUMERIC_RANKS, ExpressionLowering, Name
+
+
+# Type of the literal operands, by token type
+LITERAL_TYPES = {'num': 'int', 'literal': 'String', 'character': 'char', 'boolstr': 'boolean'}
+# Operators of the conditions
+ORDER_COMPARISONS = frozenset(('<', '>', '<=', '>='))
+COMPARISONS = ORDER_COMPARISONS | {'==', '!='}
+# Scopes inside a function body, where a name cannot be declared twice
+LOCAL_SCOPES = ('function', 'block')
+
+
+# Symbol class
+# A declared name: kind ('variable', 'argument', 'function' or 'class'), type
+# (the vtype; return type for functions, None for classes) and line of declaration
+class Symbol:
+    __slots__ = ('name', 'kind', 'type', 'line_number', 'scope', 'node')
+
+    def __init__(self, name: str, kind: str, type: str, line_number: int, node):
+        self.name = name
+        self.kind = kind
+        self.type = type
+        self.line_number = line_number
+        # Scope it is declared in, set by SymbolTable.declare
+        self.scope = None
+        # Declaration node (VDECL, FDECL, CDECL or ARG)
+        self.node = node
+
+    def __repr__(self):
+        return f'Symbol({self.kind} {self.type} {self.name}, L{self.line_number})'
+
+
+# Reference class
+# A use of a name in an expression or as the target of an assignment,
+# with the symbol it resolves to (None for an undeclared name)
+class Reference:
+    __slots__ = ('name', 'line_number', 'symbol', 'node')
+
+    def __init__(self, name: str, line_number: int, symbol, node):
+        self.name = name
+        self.line_number = line_number
+        self.symbol = symbol
+        self.node = node
+
+    def __repr__(self):
+        return f'Reference({self.name}, L{self.line_number} -> {self.symbol})'
+
+
+# Scope class
+# Names declared directly in a scope ('global', 'class', 'function' or 'block')
+class Scope:
+    __slots__ = ('kind', 'name', 'parent', 'symbols')
+
+    def __init__(self, kind: str, name: str, parent):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.symbols = {}
+
+
+# SymbolTable class
+# Chain of scopes, with an index of the visible declarations: each name maps to the
+# stack of its declarations in the open scopes, innermost last, so a lookup is a single
+# dictionary access instead of a walk up the scope chain. Closing a scope pops the
+# declarations it added.
+class SymbolTable:
+    def __init__(self):
+        self.bindings = {}
+        # Innermost open scope
+        self.scope = None
+        # Every scope opened, in order
+        self.scopes = []
+
+    def enter(self, kind: str, name: str = None):
+        self.scope = Scope(kind, name, self.scope)
+        self.scopes.append(self.scope)
+        return self.scope
+
+    def exit(self):
+        bindings = self.bindings
+        for name in self.scope.symbols:
+            stack = bindings[name]
+            stack.pop()
+            if not stack:
+                del bindings[name]
+        self.scope = self.scope.parent
+
+    # Declare a symbol in the innermost scope
+    # Returns the symbol already declared with that name in the scope, if any (nothing is declared then)
+    def declare(self, symbol: Symbol):
+        scope = self.scope
+        existing = scope.symbols.get(symbol.name)
+        if existing is not None:
+            return existing
+        scope.symbols[symbol.name] = symbol
+        symbol.scope = scope
+        self.bindings.setdefault(symbol.name, []).append(symbol)
+        return None
+
+    # Visible declaration of a name, or None
+    def lookup(self, name: str):
+        stack = self.bindings.get(name)
+        return stack[-1] if stack else None
+
+
+# SemanticError class
+# Semantic error with the line it was found on
+class SemanticError(Exception):
+    def __init__(self, message: str, line_number: int):
+        super().__init__(f'Semantic error (L{line_number}): {message}')
+        self.line_number = line_number
+
+
+# Line of the first leaf of a subtree that has one
+def first_line(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        line_number = getattr(node, 'line_number', None)
+        if line_number is not None:
+            return line_number
+        stack.extend(reversed(node.children))
+    return None
+
+
+# Whether a value of type `value` can be assigned to a variable of type `target`
+def assignable(value: str, target: str):
+    if value == target:
+        return True
+    return value in NUMERIC_RANKS and target in NUMERIC_RANKS and NUMERIC_RANKS[value] <= NUMERIC_RANKS[target]
+
+
+# TypingLowering class
+# ExpressionLowering typing the expressions for a SemanticAnalyzer: identifiers are
+# resolved in its symbol table, and the operators that cannot be applied to their
+# operands are reported, once the precedence of the operators is restored
+class TypingLowering(ExpressionLowering):
+    def __init__(self, analyzer):
+        super().__init__()
+        self.analyzer = analyzer
+
+    def operand(self, leaf):
+        if classify_lexeme(leaf.label) == 'id':
+            return Name(leaf.label, self.analyzer.operand_type(leaf))
+        return super().operand(leaf)
+
+    def binary(self, operator: str, left, right, line_number: int = None):
+        node = super().binary(operator, left, right, line_number)
+        if node.type is None and left.type is not None and right.type is not None:
+            self.analyzer.error(f'Operator {operator} cannot be applied to {left.type} and {right.type}', line_number)
+        return node
+
+
+# SemanticAnalyzer class
+# Walks a parse tree (from SLRParser or SyntaxAnalyzer; ParseTreeNode, ArenaNode or
+# LoadedNode) once, declaring the VDECL, FDECL, CDECL and ARG names in a SymbolTable,
+# resolving every identifier, and checking the types of the initializations,
+# assignments, expressions, conditions and return values. The declarations and
+# references are kept, indexed for the queries, after the walk.
+class SemanticAnalyzer:
+    def __init__(self, parse_tree):
+        self.parse_tree = parse_tree
+        self.table = SymbolTable()
+        # Every semantic error found
+        self.errors = []
+        # Every declaration (name -> symbols, in order) and every reference
+        self.declarations = {}
+        self.references = []
+        # Query indexes, built by analyze()
+        self.references_by_line = {}
+        self.references_by_symbol = {}
+        # Symbols declared ahead of their declaration node, by node
+        self.predeclared = {}
+        self.lowering = TypingLowering(self)
+        # Definite assignment: local variables assigned on every path to the statement
+        # being visited (None in unreachable code), and the sets saved at the branches
+        self.assigned = set()
+        self.saved_assigned = []
+
+    # Analyze the whole tree and return the semantic errors
+    def analyze(self):
+        # Explicit stack of (handler, argument) instead of recursion, so deep trees can be analyzed
+        stack = [(self.visit, self.parse_tree)]
+        self.stack = stack
+        if self.parse_tree.label != 'CODE':
+            # Single declaration (e.g. from StreamParser)
+            self.table.enter('global')
+        while stack:
+            handler, argument = stack.pop()
+            handler(argument)
+        self.index()
+        return self.errors
+
+    def error(self, message: str, line_number: int):
+        self.errors.append(SemanticError(message, line_number))
+
+    # Schedule handlers, run in the given order
+    def schedule(self, *work):
+        self.stack.extend(reversed(work))
+
+    def visit(self, node):
+        visitor = getattr(self, 'visit_' + node.label, None)
+        if visitor is not None:
+            visitor(node)
+        else:
+            # Other nodes (e.g. the loose ARG or BLOCK declarations of SyntaxAnalyzer)
+            self.schedule(*((self.visit, child) for child in node.children if child.children))
+
+    # Scopes
+    def enter_scope(self, scope):
+        self.table.enter(*scope)
+
+    def exit_scope(self, _):
+        self.table.exit()
+
+    # Declare a symbol, reporting a name declared twice in a scope or a local
+    # variable hiding another one of the same function
+    def declare(self, symbol: Symbol):
+        table = self.table
+        if table.scope.kind in LOCAL_SCOPES:
+            visible = table.lookup(symbol.name)
+            if visible is not None and visible.scope.kind in LOCAL_SCOPES and visible.scope is not table.scope:
+                self.error(f'{symbol.name} is already declared in this function (L{visible.line_number})',
+                           symbol.line_number)
+        existing = table.declare(symbol)
+        if existing is not None:
+            if existing is not symbol:
+                self.error(f'{symbol.name} is already declared in this scope (L{existing.line_number})',
+                           symbol.line_number)
+            return
+        self.declarations.setdefault(symbol.name, []).append(symbol)
+
+    # Symbol of a declaration node, declared ahead of its visit (functions and classes,
+    # members of classes) so that it can be used before its declaration
+    def declaration_symbol(self, node):
+        children = node.children
+        if node.label == 'VDECL' and len(children) >= 2:
+            return Symbol(children[1].label, 'variable', children[0].label, children[1].line_number, node)
+        if node.label == 'FDECL' and len(children) >= 2:
+            return Symbol(children[1].label, 'function', children[0].label, children[1].line_number, node)
+        if node.label == 'CDECL' and len(children) >= 2:
+            return Symbol(children[1].label, 'class', None, children[1].line_number, node)
+        return None
+
+    def predeclare(self, declarations, kinds):
+        symbols = {}
+        for declaration in declarations:
+            if declaration.label in kinds:
+                symbol = self.declaration_symbol(declaration)
+                if symbol is not None:
+                    self.declare(symbol)
+                    symbols[declaration] = symbol
+        return symbols
+
+    def visit_CODE(self, node):
+        self.table.enter('global')
+        # Functions and classes can be used before their declaration
+        self.predeclared.update(self.predeclare(node.children, ('FDECL', 'CDECL')))
+        self.schedule(*((self.visit, child) for child in node.children), (self.exit_scope, None))
+
+    def visit_VDECL(self, node):
+        children = node.children
+        if len(children) < 2:
+            return
+        symbol = self.predeclared.get(node) or self.declaration_symbol(node)
+        if len(children) > 2 and children[2].label == 'ASSIGN':
+            # The variable is only declared after its initialization
+            self.check_assignment(symbol.type, children[2], symbol.name, symbol.line_number)
+            self.mark_assigned(symbol)
+        self.declare(symbol)
+
+    def visit_FDECL(self, node):
+        children = node.children
+        if len(children) < 2:
+            return
+        function = self.predeclared.get(node) or self.declaration_symbol(node)
+        self.declare(function)
+        self.table.enter('function', function.name)
+        self.assigned = set()
+        work = []
+        for child in children[2:]:
+            if child.label == 'ARG':
+                self.declare_arguments(child)
+            elif child.label == 'BLOCK':
+                # The body shares the scope of the arguments
+                work.extend(self.block_work(child))
+            elif child.label == 'RETURN':
+                work.append((self.check_return, (child, function)))
+        self.schedule(*work, (self.exit_scope, None))
+
+    def visit_CDECL(self, node):
+        children = node.children
+        if len(children) < 2:
+            return
+        self.declare(self.predeclared.get(node) or self.declaration_symbol(node))
+        self.table.enter('class', children[1].label)
+        # ODECL(decl, ODECL(...)) chain of members
+        members = []
+        stack = [child for child in reversed(children[2:]) if child.label == 'ODECL']
+        while stack:
+            odecl = stack.pop()
+            for child in odecl.children:
+                if child.label == 'ODECL':
+                    stack.append(child)
+                else:
+                    members.append(child)
+        # Fields and methods can be used before their declaration
+        self.predeclared.update(self.predeclare(members, ('VDECL', 'FDECL', 'CDECL')))
+        self.schedule(*((self.visit, member) for member in members), (self.exit_scope, None))
+
+    # Declare the arguments of ARG(vtype, id, MOREARGS(',', vtype, id, ...))
+    def declare_arguments(self, node):
+        leaves = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for child in reversed(current.children):
+                if child.children:
+                    stack.append(child)
+            leaves.extend(child for child in current.children if not child.children and child.label != ',')
+        for index in range(0, len(leaves) - 1, 2):
+            vtype, name = leaves[index], leaves[index + 1]
+            self.declare(Symbol(name.label, 'argument', vtype.label, name.line_number, node))
+
+    # Work visiting the statements of a BLOCK (and of its nested BLOCK chain) in the current scope
+    def block_work(self, node):
+        work = []
+        stack = [node]
+        while stack:
+            block = stack.pop()
+            for child in block.children:
+                if child.label == 'BLOCK':
+                    stack.append(child)
+                else:
+                    work.append((self.visit, child))
+        return work
+
+    # A block of an if, else or while statement: its own scope
+    def visit_BLOCK(self, node):
+        self.table.enter('block')
+        self.schedule(*self.block_work(node), (self.exit_scope, None))
+
+    def visit_STMT(self, node):
+        children = node.children
+        work = []
+        condition = body = alternative = None
+        index = 0
+        while index < len(children):
+            child = children[index]
+            if not child.children and index + 1 < len(children) and children[index + 1].label == 'ASSIGN':
+                # Assignment: id ASSIGN(=, EXPR)
+                target = self.resolve(child)
+                target_type = target.type if target is not None and target.kind != 'function' else None
+                self.check_assignment(target_type, children[index + 1], child.label, child.line_number)
+                if target is not None:
+                    self.mark_assigned(target)
+                index += 2
+                continue
+            if child.label == 'ASSIGN':
+                # Assignment without its target (SyntaxAnalyzer)
+                self.check_assignment(None, child, None, first_line(child))
+            elif child.label == 'COND':
+                self.check_condition(child)
+                condition = child
+            elif child.label == 'BLOCK' and condition is not None and body is None:
+                body = child
+            elif child.label == 'ELSE':
+                alternative = child
+            elif child.children:
+                work.append((self.visit, child))
+            index += 1
+        if body is not None and alternative is not None:
+            # if (COND) BLOCK ELSE: assigned after it when assigned in both branches
+            work[:0] = [(self.fork_assigned, None), (self.visit, body), (self.switch_assigned, None),
+                        *((self.visit, block) for block in alternative.children), (self.join_assigned, None)]
+        elif body is not None:
+            # while (COND) BLOCK: the body may not run at all
+            work[:0] = [(self.fork_assigned, None), (self.visit, body), (self.end_loop_assigned, condition)]
+        self.schedule(*work)
+
+    # Definite assignment, as Java checks it: a local variable can only be read once it
+    # is assigned on every path to the read. `assigned` is None in unreachable code,
+    # where every variable counts as assigned.
+    def mark_assigned(self, symbol: Symbol):
+        if self.assigned is not None:
+            self.assigned.add(symbol)
+
+    # Start of the branches of an if, or of the body of a loop
+    def fork_assigned(self, _):
+        self.saved_assigned.append(self.assigned)
+        self.assigned = set(self.assigned) if self.assigned is not None else None
+
+    # End of the if branch: the else branch starts from the state before the if
+    def switch_assigned(self, _):
+        before = self.saved_assigned.pop()
+        self.saved_assigned.append(self.assigned)
+        self.assigned = set(before) if before is not None else None
+
+    # End of the else branch
+    def join_assigned(self, _):
+        branch = self.saved_assigned.pop()
+        if branch is None or self.assigned is None:
+            self.assigned = branch if self.assigned is None else self.assigned
+        else:
+            self.assigned &= branch
+
+    # End of a loop: back to the state before it, unless the loop never ends (while (true),
+    # since there is no break): the statements after it are unreachable
+    def end_loop_assigned(self, condition):
+        before = self.saved_assigned.pop()
+        operand = condition.children[0] if len(condition.children) == 1 else None
+        while operand is not None and len(operand.children) == 1:
+            operand = operand.children[0]
+        self.assigned = None if operand is not None and operand.label == 'true' else before
+
+    # Resolve an identifier leaf and record the reference
+    def resolve(self, leaf):
+        symbol = self.table.lookup(leaf.label)
+        self.references.append(Reference(leaf.label, leaf.line_number, symbol, leaf))
+        if symbol is None:
+            self.error(f'Undeclared identifier {leaf.label}', leaf.line_number)
+        return symbol
+
+    # Type of an operand leaf (None when unknown)
+    def operand_type(self, leaf):
+        token_type = classify_lexeme(leaf.label)
+        if token_type != 'id':
+            return LITERAL_TYPES.get(token_type)
+        symbol = self.resolve(leaf)
+        if symbol is None:
+            return None
+        if symbol.kind in ('function', 'class'):
+            self.error(f'{symbol.kind.capitalize()} {leaf.label} used as a value', leaf.line_number)
+            return None
+        if (symbol.kind == 'variable' and symbol.scope.kind in LOCAL_SCOPES
+                and self.assigned is not None and symbol not in self.assigned):
+            self.error(f'Variable {leaf.label} might not have been initialized', leaf.line_number)
+        return symbol.type
+
+    # Type of an expression (EXPR, TERM, FACTOR, RHS or bare operand leaf), None when
+    # unknown or invalid; typed on its expression tree (see TypingLowering)
+    def expression_type(self, root):
+        try:
+            if not root.children:
+                return self.lowering.operand(root).type
+            return self.lowering.lower(root).type
+        except ValueError:
+            # Malformed expression (e.g. from a recovering SyntaxAnalyzer)
+            return None
+
+    # ASSIGN(=, EXPR) into a variable of type `target_type` (None when unknown)
+    def check_assignment(self, target_type: str, assign, name: str, line_number: int):
+        expressions = [child for child in assign.children if child.children or child.label != '=']
+        if not expressions:
+            return
+        value_type = self.expression_type(expressions[0])
+        if target_type is not None and value_type is not None and not assignable(value_type, target_type):
+            self.error(f'Type mismatch: {value_type} assigned to {target_type} {name}', line_number)
+
+    # COND(EXPR comp EXPR) or COND(boolean operand)
+    def check_condition(self, node):
+        children = node.children
+        comparisons = [child for child in children if not child.children and child.label in COMPARISONS]
+        operands = [child for child in children if child.children or child.label not in COMPARISONS]
+        types = [self.expression_type(operand) for operand in operands]
+        if not comparisons:
+            if types and types[0] is not None and types[0] != 'boolean':
+                self.error(f'Type mismatch: condition of type {types[0]}', first_line(node))
+            return
+        if len(types) != 2 or None in types:
+            return
+        left, right = types
+        operator = comparisons[0]
+        numeric = left in NUMERIC_RANKS and right in NUMERIC_RANKS
+        if operator.label in ORDER_COMPARISONS and not numeric:
+            self.error(f'Operator {operator.label} cannot be applied to {left} and {right}', operator.line_number)
+        elif not numeric and left != right:
+            self.error(f'Incomparable types: {left} and {right}', operator.line_number)
+
+    def check_return(self, work):
+        node, function = work
+        if not node.children:
+            return
+        value_type = self.expression_type(node.children[0])
+        if value_type is None:
+            return
+        if function.type == 'void' or not assignable(value_type, function.type):
+            self.error(f'Type mismatch: {value_type} returned by {function.type} function {function.name}',
+                       first_line(node))
+
+    # Build the query indexes
+    def index(self):
+        for reference in self.references:
+            self.references_by_line.setdefault(reference.line_number, []).append(reference)
+            if reference.symbol is not None:
+                self.references_by_symbol.setdefault(reference.symbol, []).append(reference)
+
+    # Queries
+
+    # Every declaration of a name, in order
+    def declarations_of(self, name: str):
+        return self.declarations.get(name, [])
+
+    # References on a line
+    def references_at(self, line_number: int):
+        return self.references_by_line.get(line_number, [])
+
+    # References resolved to a symbol
+    def references_to(self, symbol: Symbol):
+        return self.references_by_symbol.get(symbol, [])
+
+    # References to undeclared names
+    def undeclared(self):
+        return [reference for reference in self.references if reference.symbol is None]
+
+
+# Parse a source with SLRParser (which accepts the whole grammar) and analyze its tree
+def analyze_source(source_code: str):
+    parser = SLRParser(tokenize(source_code))
+    parser.parse()
+    analyzer = SemanticAnalyzer(parser.parse_tree)
+    analyzer.analyze()
+    return analyzer
+
+
+# Main
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(f'usage: {sys.argv[0]} FILE')
+    with open(sys.argv[1], 'r') as file:
+        semantic_analyzer = analyze_source(file.read())
+    print("----------SYMBOLS----------")
+    for name, symbols in semantic_analyzer.declarations.items():
+        for symbol in symbols:
+            scope = symbol.scope.kind + (f' {symbol.scope.name}' if symbol.scope.name else '')
+            references = ', '.join(f'L{reference.line_number}' for reference in semantic_analyzer.references_to(symbol))
+            print(f'{name}\t{symbol.kind}\t{symbol.type}\t(L{symbol.line_number}, {scope})\t--->\t{references}')
+    if semantic_analyzer.errors:
+        print("----------ERRORS----------")
+        for error in semantic_analyzer.errors:
+            print(error)
+        sys.exit(1)
@@ -0,0 +1,482 @@
+#### File: slr_parser.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Table-driven SLR(1) parser for the Java subset grammar
+
+
+# Argparse module to parse the command line
+import argparse
+# Hashlib module to key the cached tables by grammar
+import hashlib
+# Os module to locate the table cache
+import os
+# Pickle module to store the tables
+import pickle
+# Time module to time the table generation
+import time
+
+from syntax_analyzer import ParseTreeNode, ParsingError, nest_list_node
+
+
+# Directory where the generated tables are cached (user cache directory, see XDG_CACHE_HOME)
+TABLE_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                               'java_subset_slr')
+# Version of the cached tables format, part of their key: to be increased whenever the
+# layout of the tables or the tree builders they refer to change
+TABLE_FORMAT_VERSION = 1
+
+# End of input marker
+END = '$'
+
+
+# Tree builders, called on reduction with the values of the right-hand side
+# (Token objects for terminals, ParseTreeNode objects for nonterminals)
+
+# Leaf node holding the value and the line of a token
+def leaf(token):
+    parse_tree = ParseTreeNode(token.value)
+    parse_tree.line_number = token.line_number
+    return parse_tree
+
+
+# Node labelled `label` whose children are the given values (tokens become leaves)
+def node(label, values):
+    parse_tree = ParseTreeNode(label)
+    for value in values:
+        parse_tree.add_child(value if isinstance(value, ParseTreeNode) else leaf(value))
+    return parse_tree
+
+
+# An expression made of a single operand, e.g. EXPR(TERM(RHS(x))), or None
+def bare_operand(expr):
+    if len(expr.children) == 1 and len(expr.children[0].children) == 1:
+        operand = expr.children[0].children[0]
+        if operand.label == 'RHS':
+            return operand
+    return None
+
+
+# CODE -> CODE decl, BLOCK -> BLOCK STMT (kept flat, without recursion)
+def build_append(values):
+    values[0].children.append(values[1])
+    return values[0]
+
+
+# MOREARGS -> MOREARGS comma vtype id
+def build_append_arg(values):
+    values[0].children.extend([leaf(values[1]), leaf(values[2]), leaf(values[3])])
+    return values[0]
+
+
+# EXPR -> EXPR addsub TERM, TERM -> TERM multdiv FACTOR
+# Operators and operands are kept flat in the first TERM, like SyntaxAnalyzer.parse_term
+def build_expr_more(values):
+    expr, operator, term = values
+    expr.children[0].children.extend([leaf(operator)] + term.children)
+    return expr
+
+
+def build_term_more(values):
+    term, operator, factor = values
+    term.children.extend([leaf(operator), factor])
+    return term
+
+
+# COND -> EXPR: a bare boolean is kept as a single leaf
+def build_cond_single(values):
+    operand = bare_operand(values[0])
+    if operand is not None:
+        return node('COND', operand.children)
+    return node('COND', values)
+
+
+# RETURN -> return EXPR semi: a bare operand is kept as RHS
+def build_return(values):
+    operand = bare_operand(values[1])
+    return node('RETURN', [operand if operand is not None else values[1]])
+
+
+# STMT -> id INIT semi
+def build_assign_stmt(values):
+    return node('STMT', [values[0], values[1]])
+
+
+BUILDERS = {
+    'append': build_append,
+    'append_arg': build_append_arg,
+    'expr_more': build_expr_more,
+    'term_more': build_term_more,
+    'cond_single': build_cond_single,
+    'return': build_return,
+    'assign_stmt': build_assign_stmt,
+}
+
+
+# Parse a grammar file (see java_subset.grammar) into its productions and start symbol
+# The productions are (left-hand side, right-hand side, builder) tuples, where a builder
+# is either a key of BUILDERS or ('node', label, positions of the kept values)
+def parse_grammar(text: str, file_name: str = '<grammar>'):
+    grammar = []
+    start_symbol = None
+    lhs = None
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith('%start'):
+            start_symbol = line[len('%start'):].strip()
+            continue
+        if '->' in line:
+            lhs, line = (part.strip() for part in line.split('->', 1))
+        elif line.startswith('|') and lhs is not None:
+            line = line[1:].strip()
+        else:
+            raise ValueError(f'{file_name}:{line_number}: expected "LHS -> ..." or "| ..."')
+        if not line.endswith('}') or '{' not in line:
+            raise ValueError(f'{file_name}:{line_number}: missing {{builder}}')
+        symbols, specification = line[:-1].split('{', 1)
+        rhs = tuple(symbol for symbol in symbols.split() if symbol != '%empty')
+        words = specification.split()
+        if not words:
+            raise ValueError(f'{file_name}:{line_number}: empty builder')
+        if words[0] in BUILDERS:
+            builder = words[0]
+        else:
+            try:
+                positions = tuple(int(word) for word in words[1:])
+            except ValueError:
+                raise ValueError(f'{file_name}:{line_number}: unknown builder {words[0]}') from None
+            if any(position >= len(rhs) for position in positions):
+                raise ValueError(f'{file_name}:{line_number}: builder position out of the right-hand side')
+            builder = ('node', words[0], positions)
+        grammar.append((lhs, rhs, builder))
+    if not grammar:
+        raise ValueError(f'{file_name}: no productions')
+    return grammar, start_symbol or grammar[0][0]
+
+
+def load_grammar(file_path: str):
+    with open(file_path, 'r') as file:
+        return parse_grammar(file.read(), file_path)
+
+
+# Grammar file of the Java subset
+GRAMMAR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'java_subset.grammar')
+
+# The grammar and its start symbol, read at import time
+GRAMMAR, START_SYMBOL = load_grammar(GRAMMAR_FILE)
+
+
+# Turn a builder specification into a function of the right-hand side values
+def make_builder(specification):
+    if isinstance(specification, str):
+        return BUILDERS[specification]
+    _, label, positions = specification
+
+    def build(values):
+        parse_tree = ParseTreeNode(label)
+        children = parse_tree.children
+        for position in positions:
+            value = values[position]
+            children.append(value if value.__class__ is ParseTreeNode else leaf(value))
+        return parse_tree
+    return build
+
+
+# Hash of the table format version and of the grammar structure (productions and start
+# symbol), used to key the cached tables
+# The builders do not change the tables, so they are left out
+def grammar_hash(grammar, start_symbol=START_SYMBOL):
+    text = repr((TABLE_FORMAT_VERSION, start_symbol, [(lhs, rhs) for lhs, rhs, _ in grammar]))
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+# Compute the FIRST sets of the nonterminals and the set of nullable nonterminals
+def compute_first(grammar, nonterminals):
+    first = {symbol: set() for symbol in nonterminals}
+    nullable = set()
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs, _ in grammar:
+            before = (len(first[lhs]), lhs in nullable)
+            for symbol in rhs:
+                if symbol in nonterminals:
+                    first[lhs] |= first[symbol]
+                    if symbol not in nullable:
+                        break
+                else:
+                    first[lhs].add(symbol)
+                    break
+            else:
+                nullable.add(lhs)
+            if (len(first[lhs]), lhs in nullable) != before:
+                changed = True
+    return first, nullable
+
+
+# Compute the FOLLOW sets of the nonterminals
+def compute_follow(grammar, nonterminals, first, nullable, start_symbol):
+    follow = {symbol: set() for symbol in nonterminals}
+    follow[start_symbol].add(END)
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs, _ in grammar:
+            # What can follow the symbol currently looked at, scanning from the right
+            trailer = set(follow[lhs])
+            for symbol in reversed(rhs):
+                if symbol in nonterminals:
+                    if not trailer <= follow[symbol]:
+                        follow[symbol] |= trailer
+                        changed = True
+                    if symbol in nullable:
+                        trailer = trailer | first[symbol]
+                    else:
+                        trailer = set(first[symbol])
+                else:
+                    trailer = {symbol}
+    return follow
+
+
+# Build the canonical collection of LR(0) item sets and the SLR(1) tables
+# Production 0 is the augmented production S' -> START_SYMBOL
+# ACTION entries: n >= 0 shifts to state n, -(p + 1) reduces by production p
+# (reducing by production 0 accepts the input)
+# Returns a dictionary of the ACTION and GOTO tables, the FIRST and FOLLOW sets, the
+# nullable nonterminals and the number of LR(0) states
+def build_tables(grammar, start_symbol):
+    productions = [("S'", (start_symbol,))] + [(lhs, rhs) for lhs, rhs, _ in grammar]
+    nonterminals = {lhs for lhs, _ in productions}
+    by_lhs = {}
+    for index, (lhs, _) in enumerate(productions):
+        by_lhs.setdefault(lhs, []).append(index)
+
+    first, nullable = compute_first(grammar, nonterminals - {"S'"})
+    follow = compute_follow(grammar, nonterminals - {"S'"}, first, nullable, start_symbol)
+    follow["S'"] = {END}
+
+    # Closure of a set of (production, dot position) items
+    def closure(items):
+        result = set(items)
+        stack = list(items)
+        while stack:
+            production, dot = stack.pop()
+            rhs = productions[production][1]
+            if dot < len(rhs) and rhs[dot] in nonterminals:
+                for other in by_lhs[rhs[dot]]:
+                    if (other, 0) not in result:
+                        result.add((other, 0))
+                        stack.append((other, 0))
+        return frozenset(result)
+
+    states = [closure({(0, 0)})]
+    state_ids = {states[0]: 0}
+    transitions = []
+    index = 0
+    while index < len(states):
+        # Group the items of the state by the symbol after their dot
+        moves = {}
+        for production, dot in states[index]:
+            rhs = productions[production][1]
+            if dot < len(rhs):
+                moves.setdefault(rhs[dot], set()).add((production, dot + 1))
+        edges = {}
+        for symbol in sorted(moves):
+            target = closure(moves[symbol])
+            if target not in state_ids:
+                state_ids[target] = len(states)
+                states.append(target)
+            edges[symbol] = state_ids[target]
+        transitions.append(edges)
+        index += 1
+
+    action = []
+    goto = []
+    for state, edges in zip(states, transitions):
+        state_action = {}
+        state_goto = {}
+        for symbol, target in edges.items():
+            if symbol in nonterminals:
+                state_goto[symbol] = target
+            else:
+                state_action[symbol] = target
+        for production, dot in state:
+            lhs, rhs = productions[production]
+            if dot == len(rhs):
+                for terminal in follow[lhs]:
+                    if terminal in state_action and state_action[terminal] != -(production + 1):
+                        raise ValueError(f'SLR conflict on {terminal} for production {lhs} -> {" ".join(rhs)}')
+                    state_action[terminal] = -(production + 1)
+        action.append(state_action)
+        goto.append(state_goto)
+    # The augmented start symbol is an artifact of the construction
+    del follow["S'"]
+    return {'action': action, 'goto': goto, 'first': first, 'follow': follow, 'nullable': nullable,
+            'states': len(states)}
+
+
+# Load the tables from the disk cache, generating and storing them if needed
+# (see build_tables; `rebuild` ignores the cached tables)
+def load_tables(grammar=GRAMMAR, start_symbol=START_SYMBOL, rebuild: bool = False):
+    path = os.path.join(TABLE_CACHE_DIR, f'slr_tables-{grammar_hash(grammar, start_symbol)}.pickle')
+    if not rebuild:
+        try:
+            with open(path, 'rb') as file:
+                return pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+    tables = build_tables(grammar, start_symbol)
+    try:
+        os.makedirs(TABLE_CACHE_DIR, exist_ok=True)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(tables, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+    except OSError:
+        # Read-only installation: keep the tables in memory only
+        pass
+    return tables
+
+
+# Tables and reductions of the grammar, built on first use
+_tables = None
+
+
+def get_tables():
+    global _tables
+    if _tables is None:
+        tables = load_tables()
+        # Reductions: (left-hand side, length of the right-hand side, builder), indexed like ACTION
+        reductions = [("S'", 1, None)] + [(lhs, len(rhs), make_builder(builder)) for lhs, rhs, builder in GRAMMAR]
+        _tables = (tables['action'], tables['goto'], reductions)
+    return _tables
+
+
+# Our SLR parser object
+# Same interface as SyntaxAnalyzer: construct with the tokens, call parse(),
+# and read the result from parse_tree. It is slower than SyntaxAnalyzer ('benchmark.py
+# parser': about 0.7x to 0.9x of its throughput at the default scale, 0.6x on small
+# sources) but has no recursion limit
+class SLRParser:
+    def __init__(self, tokens, nested_lists: bool = False):
+        # List (or iterable) of tokens to be analyzed
+        self.tokens = tokens
+        # Rebuild the right-nested BLOCK/MOREARGS chains, like SyntaxAnalyzer(nested_lists=True)
+        self.nested_lists = nested_lists
+        # The resulting parse tree
+        self.parse_tree = None
+
+    def parse(self):
+        action, goto, reductions = get_tables()
+        # Parallel stacks of states and values, no recursion involved
+        states = [0]
+        values = []
+        tokens = iter(self.tokens)
+        token = next(tokens, None)
+        last_token = None
+
+        # Bind the hot methods locally
+        push_state = states.append
+        push_value = values.append
+        state = 0
+        token_type = token.type if token is not None else END
+
+        while True:
+            entry = action[state].get(token_type)
+            if entry is None:
+                self.error(token if token is not None else last_token, states, token_type)
+            if entry >= 0:
+                # Shift
+                state = entry
+                push_state(state)
+                push_value(token)
+                last_token = token
+                token = next(tokens, None)
+                token_type = token.type if token is not None else END
+                continue
+            production = -entry - 1
+            if production == 0:
+                # Accept
+                self.parse_tree = values[0]
+                if self.nested_lists:
+                    self.nest_lists()
+                return
+            lhs, length, builder = reductions[production]
+            if length:
+                arguments = values[-length:]
+                del values[-length:]
+                del states[-length:]
+            else:
+                arguments = []
+            push_value(builder(arguments))
+            state = goto[states[-1]][lhs]
+            push_state(state)
+
+    # Give the flat BLOCK and MOREARGS nodes their right-nested shape
+    def nest_lists(self):
+        list_nodes = []
+        stack = [self.parse_tree]
+        while stack:
+            node = stack.pop()
+            if node.label == 'BLOCK' or node.label == 'MOREARGS':
+                list_nodes.append(node)
+            stack.extend(node.children)
+        for node in list_nodes:
+            nest_list_node(node, 1 if node.label == 'BLOCK' else 3)
+
+    # Terminals that can be shifted (or accept the input) from a stack of states: the
+    # reductions of an ACTION row are entered on the whole FOLLOW set of their left-hand
+    # side, so each terminal of the row is checked by running the reductions it triggers
+    @staticmethod
+    def expected_terminals(states):
+        action, goto, reductions = get_tables()
+        expected = []
+        for terminal in action[states[-1]]:
+            stack = list(states)
+            while True:
+                entry = action[stack[-1]].get(terminal)
+                if entry is None:
+                    break
+                if entry >= 0 or entry == -1:
+                    expected.append(terminal)
+                    break
+                lhs, length, _ = reductions[-entry - 1]
+                if length:
+                    del stack[-length:]
+                stack.append(goto[stack[-1]][lhs])
+        return expected
+
+    def error(self, token, states, found):
+        # The end of input is reported as SyntaxAnalyzer reports it: 'EOF' on the line of
+        # the last token, or line 0 when there are no tokens
+        line_number = token.line_number if token is not None else 0
+        expected = ', '.join(sorted('EOF' if terminal == END else terminal
+                                    for terminal in self.expected_terminals(states)))
+        found = 'EOF' if found == END else found
+        raise ParsingError(f'Expected one of {expected}, found {found}', line_number, expected, found)
+
+
+# Main: generate (or load) the tables of a grammar file and report them
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description='SLR(1) table generator')
+    argument_parser.add_argument('--grammar', default=GRAMMAR_FILE, help='grammar file (default: java_subset.grammar)')
+    argument_parser.add_argument('--rebuild', action='store_true', help='regenerate the cached tables')
+    argument_parser.add_argument('--sets', action='store_true', help='print the FIRST and FOLLOW sets')
+    arguments = argument_parser.parse_args()
+    grammar, start_symbol = load_grammar(arguments.grammar)
+    start = time.perf_counter()
+    tables = load_tables(grammar, start_symbol, rebuild=arguments.rebuild)
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    build_tables(grammar, start_symbol)
+    build_time = time.perf_counter() - start
+    print(f'{arguments.grammar}: {len(grammar)} productions, {tables["states"]} states, '
+          f'hash {grammar_hash(grammar, start_symbol)}')
+    print(f'tables {"rebuilt" if arguments.rebuild else "loaded"} in {load_time * 1000:.2f} ms '
+          f'(generation alone: {build_time * 1000:.2f} ms)')
+    if arguments.sets:
+        for nonterminal in sorted(tables['first']):
+            nullable = ' (nullable)' if nonterminal in tables['nullable'] else ''
+            print(f'FIRST({nonterminal}) = {{{", ".join(sorted(tables["first"][nonterminal]))}}}{nullable}')
+        for nonterminal in sorted(tables['follow']):
+            print(f'FOLLOW({nonterminal}) = {{{", ".join(sorted(tables["follow"][nonterminal]))}}}')
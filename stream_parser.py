@@ -0,0 +1,211 @@
+#### File: stream_parser.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Streaming lexing and parsing of sources arriving in chunks (pipes, sockets, asyncio)
+
+
+# Asyncio module to read the standard input as a stream in the demo
+import asyncio
+# Codecs module to decode bytes cut in the middle of a character
+import codecs
+# Os module to find the kind of file of the standard input
+import os
+# Stat module for the kinds of files
+import stat
+# Sys module for the standard input
+import sys
+
+from syntax_analyzer import (FIRST_CHARACTERS, FIXED_LEXEMES, TOKEN_CODES, TOKEN_REGEX, ParsingError, SyntaxAnalyzer,
+                             Token, classify_other, print_parse_tree, tokenize)
+
+
+# Number of bytes read at once from a stream
+CHUNK_SIZE = 65536
+
+
+# ChunkLexer class
+# Lexes a source given piece by piece: the tokens are returned as soon as they are
+# settled, i.e. when more text cannot change them. The text from the first unsettled
+# lexeme on is kept for the next chunk: a lexeme reaching the end of the text received
+# so far (identifier, number, comment, whitespace or operator that may go on), a
+# quote not closed yet, or a quote too close to the end to be a character.
+class ChunkLexer:
+    def __init__(self):
+        # Text received but not lexed yet, starting at a lexeme boundary
+        self.buffer = ''
+        # Line number at the start of the buffer
+        self.line_number = 1
+
+    # Add a chunk of text and return the tokens that are now settled
+    def feed(self, chunk: str):
+        buffer = self.buffer + chunk
+        size = len(buffer)
+        fixed_lexemes = FIXED_LEXEMES
+        first_characters = FIRST_CHARACTERS
+        codes = TOKEN_CODES
+        line_number = self.line_number
+        tokens = []
+        settled = 0
+
+        for match in TOKEN_REGEX.finditer(buffer):
+            start, end = match.span()
+            lexeme = match.group()
+            if end == size or lexeme == '"' or (lexeme == "'" and start + 3 > size):
+                break
+            token_type = fixed_lexemes.get(lexeme) or first_characters.get(lexeme[0]) or classify_other(lexeme)
+            if token_type in codes:
+                tokens.append(Token(token_type, lexeme, line_number))
+            if '\n' in lexeme:
+                line_number += lexeme.count('\n')
+            settled = end
+
+        self.buffer = buffer[settled:]
+        self.line_number = line_number
+        return tokens
+
+    # End of the source: return the remaining tokens
+    def close(self):
+        tokens = tokenize(self.buffer)
+        for token in tokens:
+            token.line_number += self.line_number - 1
+        self.buffer = ''
+        return tokens
+
+
+# StreamParser class
+# Parses a source given piece by piece and returns its top-level declarations
+# (VDECL, CDECL, ...) as soon as they are complete, as SyntaxAnalyzer.parse_decls
+# would build them from the whole source. Declarations can only end with a semicolon
+# or a closing brace outside of any braces, so parsing is only attempted then.
+class StreamParser:
+    def __init__(self):
+        self.lexer = ChunkLexer()
+        # Tokens of the declarations not complete yet
+        self.pending = []
+        # Depth of braces at the end of the pending tokens
+        self.depth = 0
+
+    # Add a chunk of text and return the declarations completed by it
+    def feed(self, chunk: str):
+        tokens = self.lexer.feed(chunk)
+        boundary = False
+        depth = self.depth
+        for token in tokens:
+            token_type = token.type
+            if token_type == 'lbrace':
+                depth += 1
+            elif token_type == 'rbrace':
+                # A stray closing brace is an empty declaration
+                depth = max(depth - 1, 0)
+                boundary = boundary or depth == 0
+            elif token_type == 'semi' and depth == 0:
+                boundary = True
+        self.depth = depth
+        self.pending.extend(tokens)
+        return self.parse_pending(final=False) if boundary else []
+
+    # End of the source: return the last declarations
+    # Raises the ParsingError of an incomplete or invalid declaration
+    def close(self):
+        self.pending.extend(self.lexer.close())
+        return self.parse_pending(final=True)
+
+    # Parse the complete declarations of the pending tokens and drop their tokens
+    def parse_pending(self, final: bool):
+        analyzer = SyntaxAnalyzer(self.pending)
+        analyzer.advance()
+        declarations = []
+        consumed = 0
+        while analyzer.current_token.type != 'EOF':
+            try:
+                declaration = analyzer.parse_decl()
+            except ParsingError as exception:
+                if exception.found == 'EOF' and not final:
+                    # Declaration not complete yet: parsed again with the next tokens
+                    break
+                raise
+            if (not final and analyzer.current_token.type == 'EOF'
+                    and self.pending[analyzer.token_index - 1].type not in ('semi', 'rbrace')):
+                # The declaration used up the tokens received so far without ending on a
+                # semicolon or closing brace: it may have stopped at the end of input
+                # (e.g. `int x` before `= 1;`), so it is parsed again with the next tokens
+                break
+            consumed = analyzer.token_index
+            if declaration is not None:
+                declarations.append(declaration)
+        del self.pending[:consumed]
+        return declarations
+
+
+# Parse the chunks of text of an (synchronous) iterable, yielding the declarations
+def iter_parse_chunks(chunks):
+    parser = StreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+# Parse the chunks of text of an async iterable, yielding the declarations as soon as
+# they are complete: `async for declaration in parse_stream(chunks): ...`
+async def parse_stream(chunks):
+    parser = StreamParser()
+    async for chunk in chunks:
+        for declaration in parser.feed(chunk):
+            yield declaration
+    for declaration in parser.close():
+        yield declaration
+
+
+# Text chunks of an asyncio.StreamReader, decoded incrementally
+# (a character may be split between two reads)
+async def iter_reader_chunks(reader, chunk_size: int = CHUNK_SIZE, encoding: str = 'utf-8'):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        data = await reader.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+# FileReader class
+# Reads a regular file with the read and readline coroutines of asyncio.StreamReader,
+# the blocking reads running in the default executor (asyncio only connects pipes,
+# sockets and terminals)
+class FileReader:
+    def __init__(self, file):
+        self.file = file
+
+    async def read(self, size: int = -1):
+        return await asyncio.get_running_loop().run_in_executor(None, self.file.read, size)
+
+    async def readline(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self.file.readline)
+
+
+# Reader of the standard input: an asyncio.StreamReader connected to it when it is a pipe,
+# a socket or a terminal, a FileReader when it is redirected from a file (`< source.java`)
+async def open_stdin_reader(limit: int = CHUNK_SIZE):
+    mode = os.fstat(sys.stdin.fileno()).st_mode
+    if not (stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode) or stat.S_ISCHR(mode)):
+        return FileReader(sys.stdin.buffer)
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=limit)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+
+# Print the declarations of the standard input as soon as they are complete
+async def main():
+    reader = await open_stdin_reader()
+    async for declaration in parse_stream(iter_reader_chunks(reader)):
+        print_parse_tree(declaration)
+        sys.stdout.flush()
+
+
+# Main: python stream_parser.py < source.java (or from a pipe)
+if __name__ == "__main__":
+    asyncio.run(main())
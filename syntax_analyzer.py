@@ -8,101 +8,386 @@
 
 # Regular expressions module
 import re
+# Array module for the compact token stream
+from array import array
+# Mmap module to lex files without reading them into memory
+import mmap
 # Sys module to get program's arguments
 import sys
+# Argparse module to parse the command line
+import argparse
+# Glob and os modules to find the files of a batch
+import glob
+import os
+# Time module to measure the analysis time
+import time
+# Process pool to analyze batches of files in parallel
+from concurrent.futures import ProcessPoolExecutor
+# Partial to bind the batch options of the worker function
+from functools import partial
+# Context doing nothing, in place of the profiling timers
+from contextlib import nullcontext
+
+from parse_tree_io import FORMATS, iter_tree_lines, write_lines, write_output
+
+
+# Version of the analyzer, part of the parse cache keys
+# Bump it whenever the tokens or the parse trees produced for a source change
+ANALYZER_VERSION = '1.4'
 
 
 # Token class
+# Slots avoid a per-instance __dict__ for every lexeme
 class Token:
+    __slots__ = ('type', 'value', 'line_number')
+
     def __init__(self, type: str, value: str, line_number: int):
         self.type = type
         self.value = value
         self.line_number = line_number
 
 
-def tokenize(source_code: str):
-    # Define regular expressions for the 21 terminals
-    patterns = [
-        # vtype for the types of variables and functions
-        ('vtype', r'int|double|boolean|char|String|void'),
-        # num for signed integers
-        ('num', r'-?\d+'),
-        # character for a single character
-        ('character', r"'.'"),
-        # boolstr for Boolean strings
-        ('boolstr', r'true|false'),
-        # literal for literal strings
-        ('literal', r'"[^"]*"'),
-        # if for if statement
-        ('if', r'if'),
-        # else for else statement
-        ('else', r'else'),
-        # while for while statement
-        ('while', r'while'),
-        # return for return statement
-        ('return', r'return'),
-        # class for class declarations
-        ('class', r'class'),
-        # Used to detect comment
-        ('comment', r'//.*'),
-        # id for the identifiers of variables and functions
-        ('id', r'[A-Za-z_]\w*'),
-        # addsub for + and - arithmetic operators
-        ('addsub', r'\+|-'),
-        # multdiv for * and / arithmetic operators
-        ('multdiv', r'\*|/'),
-        # assign for assignment operators
-        ('assign', r'='),
-        # comp for comparison operators
-        ('comp', r'==|!=|<=|>=|<|>'),
-        # semi for semicolon
-        ('semi', r';'),
-        # comma for comma
-        ('comma', r','),
-        # lparen for (
-        ('lparen', r'\('),
-        # rparen for )
-        ('rparen', r'\)'),
-        # lbrace for {
-        ('lbrace', r'{'),
-        # rbrace for }
-        ('rbrace', r'}'),
-        # Used only for parsing
-        ('whitespace', r'\s+')
-    ]
-
-    # Combine the regular expressions into a single pattern
-    combined_pattern = '|'.join('(?P<%s>%s)' % pair for pair in patterns)
-
-    # Initialize an empty list to store identified tokens
-    tokens = []
+# Lexemes of the source, as one regular expression without groups: every identifier
+# or keyword is matched at once as the longest word, and every operator as the
+# longest sequence of punctuation (maximal munch, e.g. '==' rather than '=' twice).
+# The last alternative matches any other character, so the lexemes cover the
+# whole source one after another; such characters are skipped like before.
+LEXEME_PATTERNS = [
+    # Identifiers and keywords
+    r'[A-Za-z_]\w*',
+    # Signed integers
+    r'-?\d+',
+    # Comments, before the '/' operator
+    r'//.*',
+    # Literal strings and single characters
+    r'"[^"]*"',
+    r"'.'",
+    # Operators and punctuation, longest first
+    r'==|!=|<=|>=|[-+*/=<>;,(){}]',
+    r'\s+',
+    # Any other character
+    r'.',
+]
+
+# Combined pattern, compiled once at import time
+TOKEN_REGEX = re.compile('|'.join(LEXEME_PATTERNS))
+
+# Same pattern over bytes, used to lex memory-mapped files
+# It has ASCII semantics (\w, \d and '.' match single bytes), so it is only used on
+# ASCII sources, where it matches the same lexemes at the same offsets as TOKEN_REGEX
+TOKEN_REGEX_BYTES = re.compile(TOKEN_REGEX.pattern.encode())
+# Any byte outside of ASCII
+NON_ASCII_BYTES = re.compile(rb'[\x80-\xff]')
+
+# Token types of the 21 terminals, in a fixed order giving their integer codes
+TOKEN_TYPES = ('vtype', 'num', 'character', 'boolstr', 'literal', 'if', 'else', 'while', 'return', 'class',
+               'id', 'addsub', 'multdiv', 'assign', 'comp', 'semi', 'comma', 'lparen', 'rparen', 'lbrace', 'rbrace')
+# Integer code of each token type
+TOKEN_CODES = {name: code for code, name in enumerate(TOKEN_TYPES)}
+
+# Token type of the lexemes with a fixed spelling (keywords and punctuation),
+# looked up with the whole lexeme
+FIXED_LEXEMES = {
+    # vtype for the types of variables and functions
+    'int': 'vtype', 'double': 'vtype', 'boolean': 'vtype', 'char': 'vtype', 'String': 'vtype', 'void': 'vtype',
+    # boolstr for Boolean strings
+    'true': 'boolstr', 'false': 'boolstr',
+    # Statement and declaration keywords
+    'if': 'if', 'else': 'else', 'while': 'while', 'return': 'return', 'class': 'class',
+    # Arithmetic, assignment and comparison operators
+    '+': 'addsub', '-': 'addsub', '*': 'multdiv', '/': 'multdiv', '=': 'assign',
+    '==': 'comp', '!=': 'comp', '<=': 'comp', '>=': 'comp', '<': 'comp', '>': 'comp',
+    # Punctuation
+    ';': 'semi', ',': 'comma', '(': 'lparen', ')': 'rparen', '{': 'lbrace', '}': 'rbrace',
+    # Lone quotes (unterminated literal or character): skipped
+    '"': 'invalid', "'": 'invalid',
+}
+
+# Token type of the other lexemes, looked up with their first character
+# ('comment', 'whitespace' and 'invalid' are not kept in the token list)
+FIRST_CHARACTERS = {'_': 'id', '-': 'num', '/': 'comment', '"': 'literal', "'": 'character'}
+FIRST_CHARACTERS.update(dict.fromkeys('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz', 'id'))
+FIRST_CHARACTERS.update(dict.fromkeys('0123456789', 'num'))
+FIRST_CHARACTERS.update(dict.fromkeys(' \t\n\r\f\v', 'whitespace'))
+
+# Same tables for the bytes lexemes of memory-mapped files (indexing bytes gives integers)
+FIXED_LEXEMES_BYTES = {lexeme.encode(): token_type for lexeme, token_type in FIXED_LEXEMES.items()}
+FIRST_CHARACTERS_BYTES = {ord(character): token_type for character, token_type in FIRST_CHARACTERS.items()}
+
+
+# Token type of a lexeme matched by TOKEN_REGEX (str or bytes)
+def classify_lexeme(lexeme):
+    if isinstance(lexeme, str):
+        token_type = FIXED_LEXEMES.get(lexeme) or FIRST_CHARACTERS.get(lexeme[0])
+    else:
+        token_type = FIXED_LEXEMES_BYTES.get(lexeme) or FIRST_CHARACTERS_BYTES.get(lexeme[0])
+    return token_type or classify_other(lexeme)
+
+
+# Token type of a lexeme starting with a non-ASCII (or unexpected) character
+def classify_other(lexeme):
+    first = lexeme[:1]
+    if first.isspace():
+        return 'whitespace'
+    if first.isdigit():
+        # \d also matches non-ASCII digits
+        return 'num'
+    return 'invalid'
+
+
+def iter_tokens(source_code: str):
+    # Bind the lookup tables locally
+    fixed_lexemes = FIXED_LEXEMES
+    first_characters = FIRST_CHARACTERS
+    codes = TOKEN_CODES
     # Initialize the line number
     line_number = 1
 
-    # Iterate over matches found in the source code
-    for match in re.finditer(combined_pattern, source_code):
-        # Get the type of the matched token
-        token_type = match.lastgroup
-        # Get the value of the matched token
-        token_value = match.group(token_type)
+    # Iterate over the lexemes found in the source code
+    for match in TOKEN_REGEX.finditer(source_code):
+        lexeme = match.group()
+        # Whole keywords and punctuation first, then the class of the first character
+        token_type = fixed_lexemes.get(lexeme) or first_characters.get(lexeme[0]) or classify_other(lexeme)
 
-        # Exclude whitespace tokens
-        if token_type != 'whitespace' and token_type != 'comment':
-            # Add the token to the list
-            tokens.append(Token(token_type, token_value, line_number))
+        # Exclude whitespace, comments and invalid characters
+        if token_type in codes:
+            # Hand the token to the consumer
+            yield Token(token_type, lexeme, line_number)
 
         # Update the line number if a newline character is encountered
-        if '\n' in token_value:
-            line_number += token_value.count('\n')
+        if '\n' in lexeme:
+            line_number += lexeme.count('\n')
 
+
+def tokenize(source_code: str):
+    fixed_lexemes = FIXED_LEXEMES
+    first_characters = FIRST_CHARACTERS
+    codes = TOKEN_CODES
+    tokens = []
+    append = tokens.append
+    line_number = 1
+    # The whole list is built anyway, so the lexemes are extracted at once
+    # (no match objects), then classified as in iter_tokens
+    for lexeme in TOKEN_REGEX.findall(source_code):
+        token_type = fixed_lexemes.get(lexeme) or first_characters.get(lexeme[0]) or classify_other(lexeme)
+        if token_type in codes:
+            append(Token(token_type, lexeme, line_number))
+        if '\n' in lexeme:
+            line_number += lexeme.count('\n')
     # Return the list of identified tokens
     return tokens
 
-def parse_java_code(file_path: str):
+
+# Tokens of a file, lexed lazily over its memory mapping with the bytes regex:
+# neither the source nor the token list is ever held in memory as a whole, so a
+# streaming SyntaxAnalyzer (see iter_decls) only keeps the declaration being parsed.
+# Files that are not pure ASCII are decoded first (see map_source), then lexed lazily
+def iter_file_tokens(file_path: str):
+    source = map_source(file_path)
+    if isinstance(source, str):
+        # Not pure ASCII: lexed from the decoded text
+        yield from iter_tokens(source)
+        return
+    fixed_lexemes = FIXED_LEXEMES_BYTES
+    first_characters = FIRST_CHARACTERS_BYTES
+    codes = TOKEN_CODES
+    line_number = 1
+    try:
+        for match in TOKEN_REGEX_BYTES.finditer(source):
+            lexeme = match.group()
+            token_type = fixed_lexemes.get(lexeme) or first_characters.get(lexeme[0]) or classify_other(lexeme)
+            if token_type in codes:
+                yield Token(token_type, lexeme.decode(), line_number)
+            if b'\n' in lexeme:
+                line_number += lexeme.count(b'\n')
+    finally:
+        if isinstance(source, mmap.mmap):
+            source.close()
+
+
+# Largest source a TokenStream can hold: offsets are 32-bit unsigned integers
+MAX_STREAM_SOURCE_SIZE = 2 ** 32 - 1
+
+
+# TokenStream class
+# Compact, array-backed replacement for a list of Token objects:
+# token types are stored as integer codes, positions and line numbers as
+# unsigned integers, and values are sliced from the source only when needed
+class TokenStream:
+    def __init__(self, source_code):
+        if len(source_code) > MAX_STREAM_SOURCE_SIZE:
+            raise ValueError(f'Source too large for a token stream ({len(source_code)} > {MAX_STREAM_SOURCE_SIZE} '
+                             f'characters): use the streaming mode (--stream)')
+        # Source buffer the offsets refer to
+        self.source = source_code
+        # Token type codes (see TOKEN_TYPES)
+        self.kinds = array('B')
+        # Start and end offsets of each token in the source
+        self.starts = array('I')
+        self.ends = array('I')
+        # Line number of each token
+        self.lines = array('I')
+        # Whether the source has been lexed (see extend)
+        self.lexed = False
+
+    # Lex the whole source into a new stream
+    @classmethod
+    def from_source(cls, source_code: str):
+        stream = cls(source_code)
+        stream.extend(source_code)
+        return stream
+
+    # A stream is single use: extend lexes the source of the stream once, with offsets
+    # into it and line numbers from 1, so no text can be appended afterwards
+    def start_lexing(self, source_code):
+        if self.lexed or source_code is not self.source:
+            raise ValueError('A token stream only lexes its own source, once: create a new stream for more text')
+        self.lexed = True
+
+    # Append the tokens found in `source_code`, the source of the stream (see start_lexing)
+    def extend(self, source_code: str):
+        self.start_lexing(source_code)
+        # Bind the hot attributes locally
+        kinds_append = self.kinds.append
+        starts_append = self.starts.append
+        ends_append = self.ends.append
+        lines_append = self.lines.append
+        fixed_lexemes = FIXED_LEXEMES
+        first_characters = FIRST_CHARACTERS
+        codes = TOKEN_CODES
+        line_number = 1
+
+        # Iterate over the lexemes found in the source code (one match at a time,
+        # so that no list of all the lexemes is built)
+        for match in TOKEN_REGEX.finditer(source_code):
+            lexeme = match.group()
+            code = codes.get(fixed_lexemes.get(lexeme) or first_characters.get(lexeme[0]) or classify_other(lexeme))
+            if code is not None:
+                # Store the token without copying its value
+                start, end = match.span()
+                kinds_append(code)
+                starts_append(start)
+                ends_append(end)
+                lines_append(line_number)
+            if '\n' in lexeme:
+                line_number += lexeme.count('\n')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    # Type of the token at `index`
+    def type(self, index: int):
+        return TOKEN_TYPES[self.kinds[index]]
+
+    # Value of the token at `index`, sliced lazily from the source
+    def value(self, index: int):
+        return self.source[self.starts[index]:self.ends[index]]
+
+    # Build a transient Token view so SyntaxAnalyzer can index the stream like a list
+    def __getitem__(self, index: int):
+        return Token(TOKEN_TYPES[self.kinds[index]], self.value(index), self.lines[index])
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield self[index]
+
+
+# Memory map of a file for the bytes lexers, or its text when it is not pure ASCII
+# (lexed with TOKEN_REGEX then, like tokenize does: see TOKEN_REGEX_BYTES)
+def map_source(file_path: str):
+    with open(file_path, 'rb') as file:
+        try:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return b''
+    if NON_ASCII_BYTES.search(source) is None:
+        return source
+    try:
+        return str(source, 'utf-8')
+    finally:
+        source.close()
+
+
+# MappedTokenStream class
+# TokenStream lexed directly over a memory-mapped file with the bytes regex:
+# the file is never decoded or copied as a whole, values are decoded one at a time
+# and the mapped pages are shared through the page cache with other processes.
+# Files that are not pure ASCII are decoded and lexed as a TokenStream instead.
+class MappedTokenStream(TokenStream):
+    def __init__(self, file_path: str):
+        source = map_source(file_path)
+        try:
+            super().__init__(source)
+        except ValueError:
+            if isinstance(source, mmap.mmap):
+                source.close()
+            raise
+        if isinstance(source, str):
+            TokenStream.extend(self, source)
+        else:
+            self.extend(source)
+
+    # Append the tokens found in the mapped bytes (see start_lexing)
+    def extend(self, source):
+        self.start_lexing(source)
+        # Bind the hot attributes locally
+        kinds_append = self.kinds.append
+        starts_append = self.starts.append
+        ends_append = self.ends.append
+        lines_append = self.lines.append
+        fixed_lexemes = FIXED_LEXEMES_BYTES
+        first_characters = FIRST_CHARACTERS_BYTES
+        codes = TOKEN_CODES
+        line_number = 1
+        # Offset of the next newline not yet accounted for
+        newline = source.find(b'\n')
+
+        # Iterate over the lexemes found in the mapped file (one at a time, so that
+        # the whole file is never copied)
+        for match in TOKEN_REGEX_BYTES.finditer(source):
+            lexeme = match.group()
+            code = codes.get(fixed_lexemes.get(lexeme) or first_characters.get(lexeme[0]) or classify_other(lexeme))
+            if code is None:
+                continue
+            start, end = match.span()
+            # Line number = 1 + number of newlines before the token
+            while newline != -1 and newline < start:
+                line_number += 1
+                newline = source.find(b'\n', newline + 1)
+            kinds_append(code)
+            starts_append(start)
+            ends_append(end)
+            lines_append(line_number)
+
+    # Value of the token at `index`, decoded from the mapped bytes
+    def value(self, index: int):
+        value = self.source[self.starts[index]:self.ends[index]]
+        return value if value.__class__ is str else value.decode()
+
+    # Release the mapping (values can no longer be read afterwards)
+    def close(self):
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parse_java_code(file_path: str, compact: bool = False, use_mmap: bool = False):
+    if use_mmap:
+        # Lex the memory-mapped file directly with the bytes regex
+        return MappedTokenStream(file_path)
     # Open the file in read mode
     with open(file_path, 'r') as file:
         # Read the contents of the file
         source_code = file.read()
+    if compact:
+        # Keep the tokens in an array-backed stream instead of Token objects
+        return TokenStream.from_source(source_code)
     # Call the `tokenize` function to extract tokens from the source code
     tokens = tokenize(source_code)
     # Return the list of tokens extracted from the source code
@@ -113,6 +398,9 @@ def parse_java_code(file_path: str):
 # Basic structure for representing a parse tree
 # Each node has a label and can have multiple children
 class ParseTreeNode:
+    # Line of the token of a leaf, set by the parsers (inner nodes keep this default)
+    line_number = None
+
     def __init__(self, label):
         self.label = label
         self.children = []
@@ -123,12 +411,167 @@ class ParseTreeNode:
             self.children.append(child)
 
 
+# ParseTreeArena class
+# Compact parse tree stored in parallel arrays indexed by node number:
+# label ids (into a shared label table) for inner nodes, token indices for
+# leaves (their value is read from the tokens when needed) and
+# first-child/next-sibling links (-1 for none)
+class ParseTreeArena:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        # Table of the distinct labels and their ids
+        self.labels = []
+        self.label_ids = {}
+        # Label id of each node (-1 for leaves referring to a token)
+        self.node_labels = array('i')
+        # Token index of each leaf (-1 for inner nodes)
+        self.token_refs = array('i')
+        # Tree links
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        # Last child of each node, to append in constant time
+        self.last_child = array('i')
+        # Bound appends of the node arrays, in the order of new_node's arguments
+        self.appends = (self.node_labels.append, self.token_refs.append, self.first_child.append,
+                        self.next_sibling.append, self.last_child.append)
+
+    def __len__(self):
+        return len(self.node_labels)
+
+    # Id of `label` in the label table
+    def label_id(self, label: str):
+        label_id = self.label_ids.get(label)
+        if label_id is None:
+            label_id = self.label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return label_id
+
+    # Allocate a node and return its number
+    def new_node(self, label_id: int, token_index: int):
+        index = len(self.node_labels)
+        append_label, append_token, append_first, append_next, append_last = self.appends
+        append_label(label_id)
+        append_token(token_index)
+        append_first(-1)
+        append_next(-1)
+        append_last(-1)
+        return index
+
+    # Append `child` to the children of `parent`
+    def add_child(self, parent: int, child: int):
+        last = self.last_child[parent]
+        if last == -1:
+            self.first_child[parent] = child
+        else:
+            self.next_sibling[last] = child
+        self.last_child[parent] = child
+
+    # Label of a node (the token value for leaves)
+    def label(self, index: int):
+        token_index = self.token_refs[index]
+        if token_index == -1:
+            return self.labels[self.node_labels[index]]
+        if isinstance(self.tokens, TokenStream):
+            # Sliced from the source without building a Token
+            return self.tokens.value(token_index)
+        return self.tokens[token_index].value
+
+    # Line of the token of a leaf (None for inner nodes)
+    def line_number(self, index: int):
+        token_index = self.token_refs[index]
+        if token_index == -1:
+            return None
+        if isinstance(self.tokens, TokenStream):
+            return self.tokens.lines[token_index]
+        return self.tokens[token_index].line_number
+
+    # Numbers of the children of a node, in order
+    def iter_children(self, index: int):
+        child = self.first_child[index]
+        next_sibling = self.next_sibling
+        while child != -1:
+            yield child
+            child = next_sibling[child]
+
+    # Lightweight view of a node with the ParseTreeNode interface
+    def node(self, index: int):
+        return ArenaNode(self, index)
+
+
+# ArenaNode class
+# Read-only view of an arena node, usable wherever a ParseTreeNode is read
+# (label, children and line_number), e.g. by print_parse_tree
+class ArenaNode:
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def label(self):
+        return self.arena.label(self.index)
+
+    @property
+    def line_number(self):
+        return self.arena.line_number(self.index)
+
+    # Views of the same node are equal, so that nodes can key dictionaries
+    def __eq__(self, other):
+        return other.__class__ is ArenaNode and other.arena is self.arena and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.arena), self.index))
+
+    @property
+    def children(self):
+        arena = self.arena
+        return [ArenaNode(arena, child) for child in arena.iter_children(self.index)]
+
+
+# Turn a flat list node into the right-nested shape of its grammar rule, in place
+# `width` children per level, e.g. with width 1: BLOCK(s1, s2) -> BLOCK(s1, BLOCK(s2, BLOCK()))
+def nest_list_node(node, width: int):
+    items = node.children
+    # Build the chain from its innermost (empty) level, without recursion
+    tail = ParseTreeNode(node.label)
+    for index in range(len(items) - width, 0, -width):
+        level = ParseTreeNode(node.label)
+        level.children = items[index:index + width] + [tail]
+        tail = level
+    if items:
+        node.children = items[:width] + [tail]
+    return node
+
+
+# ParsingError class
+# Syntax error with its structured details: line number, what was expected
+# (token type or construct, if known) and the type of the token found ('EOF' at the end)
+class ParsingError(Exception):
+    def __init__(self, message: str, line_number: int, expected: str = None, found: str = None):
+        super().__init__(f'Parsing error (L{line_number}): {message}')
+        self.message = message
+        self.line_number = line_number
+        self.expected = expected
+        self.found = found
+
+
 # Our syntax analyzer object
 class SyntaxAnalyzer:
-    def __init__(self, tokens):
+    def __init__(self, tokens, nested_lists: bool = False, recover: bool = False):
         # List of tokens to be analyzed
         self.tokens = tokens
-        # Current token being processed
+        # In recovering mode, syntax errors are collected in `diagnostics` instead of raised:
+        # the parser skips to the next semicolon or closing brace and goes on, leaving an
+        # ERROR node in place of the declaration or statement it could not parse
+        self.recover = recover
+        self.diagnostics = []
+        # Statements of a BLOCK and arguments of MOREARGS are flat children lists,
+        # unless the right-nested shape of the grammar (BLOCK -> STMT BLOCK) is asked for
+        self.nested_lists = nested_lists
+        # Iterator pulling tokens on demand when they are not indexable (e.g. `iter_tokens`)
+        self.token_iterator = None if hasattr(tokens, '__getitem__') else iter(tokens)
+        # Current token being processed (an EOF token at the end of input, see end_token)
         self.current_token = None
         # Index of the current token
         self.token_index = -1
@@ -138,43 +581,108 @@ class SyntaxAnalyzer:
     # To advance in our tree (analyze the next token)
     def advance(self):
         self.token_index += 1
-        if self.token_index < len(self.tokens):
-            self.current_token = self.tokens[self.token_index]
+        if self.token_iterator is not None:
+            # Pull the next token from the lazy source
+            token = next(self.token_iterator, None)
+        elif self.token_index < len(self.tokens):
+            token = self.tokens[self.token_index]
         else:
-            self.current_token = None
+            token = None
+        self.current_token = token if token is not None else self.end_token()
 
-    def parse(self):
+    # Token of type 'EOF' standing for the end of input, on the line of the last token:
+    # the productions see it like any other unexpected token and report a ParsingError
+    def end_token(self):
+        previous = self.current_token
+        if previous is None and self.token_iterator is None and len(self.tokens) > 0:
+            previous = self.tokens[len(self.tokens) - 1]
+        return Token('EOF', '', previous.line_number if previous is not None else 0)
+
+    # With `on_decl`, the parser streams: every top-level declaration is handed to
+    # on_decl(decl) as soon as it is complete instead of being kept under the CODE root,
+    # which stays empty (see iter_decls)
+    def parse(self, on_decl=None):
+        if on_decl is not None:
+            for decl in self.iter_decls():
+                on_decl(decl)
+            self.parse_tree = self.create_node('CODE')
+            return
         # Start by advancing to the first/next token
         self.advance()
         # Parse declarations
         self.parse_tree = self.parse_decls()
-        if self.current_token is not None:
+        if self.current_token.type != 'EOF':
             # If there are remaining tokens, raise an error
-            self.error('Unexpected token')
+            self.error('Unexpected token', 'EOF')
+
+    # Streaming mode: yield the top-level declarations (the children of CODE in parse())
+    # one by one as they are completed, without keeping them.
+    # With a lazy token source (e.g. iter_tokens or iter_file_tokens) the consumed tokens
+    # are released too, so memory is bounded by the largest declaration, not the file.
+    def iter_decls(self):
+        self.advance()
+        while self.current_token.type != 'EOF':
+            decl = self.parse_recovering(self.parse_decl)
+            if decl is not None:
+                yield decl
+                # Do not hold the declaration while parsing the next one
+                decl = None
 
-    def error(self, message):
-        raise Exception(f'Parsing error (L{self.current_token.line_number}): {message}')
+    def error(self, message, expected=None):
+        raise ParsingError(message, self.current_token.line_number, expected, self.current_token.type)
 
     def match(self, token_type):
-        if self.current_token is not None and self.current_token.type == token_type:
+        if self.current_token.type == token_type:
             # If the current token matches the expected type, move to the next token
             self.advance()
         else:
-            self.error(f'Expected {token_type}, found {self.current_token.type}')
+            self.error(f'Expected {token_type}, found {self.current_token.type}', token_type)
+
+    # Parse one element of a list (declaration or statement) with `parse_function`,
+    # recovering from a syntax error in recovering mode
+    def parse_recovering(self, parse_function):
+        if not self.recover:
+            return parse_function()
+        start = self.token_index
+        try:
+            return parse_function()
+        except ParsingError as exception:
+            self.diagnostics.append(exception)
+        self.synchronize(start)
+        return self.create_node('ERROR')
+
+    # Panic mode: skip tokens up to the next semicolon (consumed) or closing brace (kept
+    # for the enclosing block), always making progress
+    def synchronize(self, start):
+        while self.current_token.type not in ('semi', 'rbrace', 'EOF'):
+            self.advance()
+        if self.current_token.type == 'semi' or (self.current_token.type != 'EOF' and self.token_index == start):
+            self.advance()
 
     def create_node(self, label):
         # Create a parse tree node with the given label
         return ParseTreeNode(label)
 
+    def create_leaf(self):
+        # Create a leaf node holding the value and the line of the current token
+        leaf = ParseTreeNode(self.current_token.value)
+        leaf.line_number = self.current_token.line_number
+        return leaf
+
+    def add_child(self, parent, child):
+        # Add the child (if any) to the parent node
+        if child is not None:
+            parent.children.append(child)
+
     def parse_decls(self):
         # Create a root node for declarations
         parse_tree = self.create_node('CODE')
-        while self.current_token is not None:
+        while self.current_token.type != 'EOF':
             # Parse a single declaration
-            decl = self.parse_decl()
+            decl = self.parse_recovering(self.parse_decl)
             if decl is not None:
                 # Add the declaration to the parse tree
-                parse_tree.add_child(decl)
+                self.add_child(parse_tree, decl)
         return parse_tree
 
     def parse_decl(self):
@@ -207,38 +715,38 @@ class SyntaxAnalyzer:
         elif self.current_token.type == 'rbrace':
             self.advance()
         else:
-            self.error(f'Invalid declaration: {self.current_token.type}')
+            self.error(f'Invalid declaration: {self.current_token.type}', 'declaration')
 
     def parse_vdecl(self):
         # Create a node for variable declaration
         parse_tree = self.create_node('VDECL')
         # Add variable type node
-        parse_tree.add_child(self.create_node(self.current_token.value))
+        self.add_child(parse_tree, self.create_leaf())
         # Match and consume the variable type token
         self.match('vtype')
         if self.current_token.type == 'id':
             # Add variable identifier node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Match and consume the variable identifier
             self.match('id')
             if self.current_token.type == 'assign':
                 # Parse and add the assignment expression
-                parse_tree.add_child(self.parse_assign())
+                self.add_child(parse_tree, self.parse_assign())
                 # Match and consume the semicolon token
                 self.match('semi')
         else:
-            self.error(f'Invalid variable declaration: {self.current_token.type}')
+            self.error(f'Invalid variable declaration: {self.current_token.type}', 'id')
         return parse_tree
 
     def parse_assign(self):
         # Create a node for assignment expression
         parse_tree = self.create_node('ASSIGN')
         # Add assignment operator node
-        parse_tree.add_child(self.create_node(self.current_token.value))
+        self.add_child(parse_tree, self.create_leaf())
         # Match and consume the assignment operator
         self.match('assign')
         # Parse and add the expression on the right-hand side of the assignment
-        parse_tree.add_child(self.parse_expr())
+        self.add_child(parse_tree, self.parse_expr())
         return parse_tree
 
     def parse_rhs(self):
@@ -246,36 +754,36 @@ class SyntaxAnalyzer:
         parse_tree = self.create_node('RHS')
         if self.current_token.type in ['id', 'num', 'literal', 'character', 'boolstr']:
             # Add the token value as a child node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Move to the next token
             self.advance()
         else:
-            self.error(f'Invalid right-hand side: {self.current_token.type}')
+            self.error(f'Invalid right-hand side: {self.current_token.type}', 'operand')
         return parse_tree
 
     def parse_fdecl(self):
         # Create a node for function declaration
         parse_tree = self.create_node('FDECL')
         # Add return type node
-        parse_tree.add_child(self.create_node(self.current_token.value))
+        self.add_child(parse_tree, self.create_leaf())
         # Match and consume the return type token
         self.match('vtype')
         # Add function name node
-        parse_tree.add_child(self.create_node(self.current_token.value))
+        self.add_child(parse_tree, self.create_leaf())
         # Match and consume the function name
         self.match('id')
         # Match and consume the left parenthesis for function arguments
         self.match('lparen')
         # Parse and add the function arguments
-        parse_tree.add_child(self.parse_arg())
+        self.add_child(parse_tree, self.parse_arg())
         # Match and consume the right parenthesis for function arguments
         self.match('rparen')
         # Match and consume the left brace for the function block
         self.match('lbrace')
         # Parse and add the function block
-        parse_tree.add_child(self.parse_block())
+        self.add_child(parse_tree, self.parse_block())
         # Parse and add the return statement
-        parse_tree.add_child(self.parse_return())
+        self.add_child(parse_tree, self.parse_return())
         # Match and consume the right brace for the function block
         self.match('rbrace')
         return parse_tree
@@ -287,72 +795,72 @@ class SyntaxAnalyzer:
             # Match and consume the left parenthesis
             self.match('lparen')
             # Parse and add the expression within parentheses
-            parse_tree.add_child(self.parse_expr())
+            self.add_child(parse_tree, self.parse_expr())
             # Match and consume the right parenthesis
             self.match('rparen')
         elif self.current_token.type in ['id', 'num', 'literal', 'character', 'boolstr']:
             # Create a node for the right-hand side
             parse_tree = self.create_node('RHS')
             # Add the token value as a child node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Move to the next token
             self.advance()
         else:
-            self.error(f'Invalid right-hand side: {self.current_token.type}')
+            self.error(f'Invalid right-hand side: {self.current_token.type}', 'operand')
         return parse_tree
 
     def parse_term(self):
         # Create a node for a term in an expression
         parse_tree = self.create_node('TERM')
         # Parse and add the first factor
-        parse_tree.add_child(self.parse_factor())
-        while self.current_token is not None and self.current_token.type in ['addsub', 'multdiv']:
+        self.add_child(parse_tree, self.parse_factor())
+        while self.current_token.type in ['addsub', 'multdiv']:
             # Add the operator node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Move to the next token
             self.advance()
             # Parse and add the next factor
-            parse_tree.add_child(self.parse_factor())
+            self.add_child(parse_tree, self.parse_factor())
         return parse_tree
 
     def parse_expr(self):
         # Create a node for an expression
         parse_tree = self.create_node('EXPR')
         # Parse and add the first term
-        parse_tree.add_child(self.parse_term())
-        while self.current_token is not None and self.current_token.type in ['addsub']:
+        self.add_child(parse_tree, self.parse_term())
+        while self.current_token.type in ['addsub']:
             # Add the operator node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Move to the next token
             self.advance()
             # Parse and add the next factor
-            parse_tree.add_child(self.parse_factor())
-            while self.current_token is not None and self.current_token.type in ['addsub', 'multdiv']:
+            self.add_child(parse_tree, self.parse_factor())
+            while self.current_token.type in ['addsub', 'multdiv']:
                 # Add the operator node
-                parse_tree.add_child(self.create_node(self.current_token.value))
+                self.add_child(parse_tree, self.create_leaf())
                 # Move to the next token
                 self.advance()
                 if self.current_token.type == 'lparen':
                     # Match and consume the left parenthesis
                     self.match('lparen')
                     # Parse and add the expression within parentheses
-                    parse_tree.add_child(self.parse_expr())
+                    self.add_child(parse_tree, self.parse_expr())
                     # Match and consume the right parenthesis
                     self.match('rparen')
                 elif self.current_token.type == 'id':
                     # Add identifier node
-                    parse_tree.add_child(self.create_node(self.current_token.value))
+                    self.add_child(parse_tree, self.create_leaf())
                     # Match and consume the identifier
                     self.match('id')
                 elif self.current_token.type in ['num', 'literal', 'character', 'boolstr']:
                     # Add value node
-                    parse_tree.add_child(self.create_node(self.current_token.value))
+                    self.add_child(parse_tree, self.create_leaf())
                     # Move to the next token
                     self.advance()
                 else:
-                    self.error(f'Invalid factor: {self.current_token.type}')
+                    self.error(f'Invalid factor: {self.current_token.type}', 'factor')
             # Add the parse tree of the subexpression
-            parse_tree.add_child(self.parse_tree)
+            self.add_child(parse_tree, self.parse_tree)
         return parse_tree
 
     def parse_arg(self):
@@ -360,54 +868,52 @@ class SyntaxAnalyzer:
         parse_tree = self.create_node('ARG')
         if self.current_token.type == 'vtype':
             # Add variable type node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Match and consume the variable type
             self.match('vtype')
             # Add variable identifier node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Match and consume the variable identifier
             self.match('id')
             # Parse and add any additional arguments
-            parse_tree.add_child(self.parse_moreargs())
+            self.add_child(parse_tree, self.parse_moreargs())
         elif self.current_token.type == 'id':
             # Epsilon production - parse expression as an argument
-            parse_tree.add_child(self.parse_expr())
+            self.add_child(parse_tree, self.parse_expr())
         return parse_tree
 
     def parse_moreargs(self):
         # Create a node for more function arguments
         parse_tree = self.create_node('MOREARGS')
-        if self.current_token.type == 'comma':
+        # Loop instead of recursing once per argument
+        while self.current_token.type == 'comma':
             # Add comma node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Match and consume the comma token
             self.match('comma')
             # Add variable type node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Match and consume the variable type
             self.match('vtype')
             # Add variable identifier node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Match and consume the variable identifier
             self.match('id')
-            # Recursively parse and add any additional arguments
-            parse_tree.add_child(self.parse_moreargs())
-        else:
-            # Epsilon production - no more arguments
-            parse_tree.add_child(None)
+        if self.nested_lists:
+            # MOREARGS(',', vtype, id, MOREARGS(...)) chain
+            nest_list_node(parse_tree, 3)
         return parse_tree
 
     def parse_block(self):
         # Create a node for a block
         parse_tree = self.create_node('BLOCK')
-        if self.current_token.type in ['vtype', 'id', 'if', 'while']:
+        # Loop instead of recursing once per statement
+        while self.current_token.type in ['vtype', 'id', 'if', 'while']:
             # Parse and add a statement
-            parse_tree.add_child(self.parse_stmt())
-            # Recursively parse and add more statements
-            parse_tree.add_child(self.parse_block())
-        else:
-            # Epsilon production - no more statements
-            parse_tree.add_child(None)
+            self.add_child(parse_tree, self.parse_recovering(self.parse_stmt))
+        if self.nested_lists:
+            # BLOCK(STMT, BLOCK(...)) chain
+            nest_list_node(parse_tree, 1)
         return parse_tree
 
     def parse_stmt(self):
@@ -415,10 +921,10 @@ class SyntaxAnalyzer:
         parse_tree = self.create_node('STMT')
         if self.current_token.type == 'vtype':
             # Parse and add a variable declaration
-            parse_tree.add_child(self.parse_vdecl())
+            self.add_child(parse_tree, self.parse_vdecl())
         elif self.current_token.type == 'id':
             # Parse and add an assignment
-            parse_tree.add_child(self.parse_assign())
+            self.add_child(parse_tree, self.parse_assign())
             # Match and consume the semicolon
             self.match('semi')
         elif self.current_token.type == 'if':
@@ -427,7 +933,7 @@ class SyntaxAnalyzer:
             # Match and consume the left parenthesis
             self.match('lparen')
             # Parse and add the condition
-            parse_tree.add_child(self.parse_cond())
+            self.add_child(parse_tree, self.parse_cond())
             # Match and consume the comparison operator
             self.match('comp')
             # Match and consume the boolean value
@@ -435,34 +941,34 @@ class SyntaxAnalyzer:
             # Match and consume the right parenthesis
             self.match('rparen')
             # Parse and add the if block
-            parse_tree.add_child(self.parse_block())
+            self.add_child(parse_tree, self.parse_block())
             # Match and consume the left brace
             self.match('lbrace')
             # Parse and add the else block (if present)
-            parse_tree.add_child(self.parse_else())
+            self.add_child(parse_tree, self.parse_else())
             # Match and consume the right brace
             self.match('rbrace')
             # Add the parse tree of the subexpression
-            parse_tree.add_child(self.parse_tree)
+            self.add_child(parse_tree, self.parse_tree)
         elif self.current_token.type == 'while':
             # Match and consume the 'while' keyword
             self.match('while')
             # Match and consume the left parenthesis
             self.match('lparen')
             # Parse and add the condition
-            parse_tree.add_child(self.parse_cond())
+            self.add_child(parse_tree, self.parse_cond())
             # Match and consume the right parenthesis
             self.match('rparen')
             # Match and consume the left brace
             self.match('lbrace')
             # Parse and add the while block
-            parse_tree.add_child(self.parse_block())
+            self.add_child(parse_tree, self.parse_block())
             # Match and consume the right brace
             self.match('rbrace')
             # Add the parse tree of the subexpression
-            parse_tree.add_child(self.parse_tree)
+            self.add_child(parse_tree, self.parse_tree)
         else:
-            self.error(f'Invalid statement: {self.current_token.type}')
+            self.error(f'Invalid statement: {self.current_token.type}', 'statement')
         return parse_tree
 
     def parse_cond(self):
@@ -470,20 +976,20 @@ class SyntaxAnalyzer:
         parse_tree = self.create_node('COND')
         if self.current_token.type == 'boolstr':
             # Add boolean value node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Match and consume the boolean value
             self.match('boolstr')
         elif self.current_token.type in ['id', 'num', 'literal', 'character']:
             # Parse and add the first expression
-            parse_tree.add_child(self.parse_expr())
+            self.add_child(parse_tree, self.parse_expr())
             # Add comparison operator node
-            parse_tree.add_child(self.create_node(self.current_token.value))
+            self.add_child(parse_tree, self.create_leaf())
             # Match and consume the comparison operator
             self.match('comp')
             # Parse and add the second expression
-            parse_tree.add_child(self.parse_expr())
+            self.add_child(parse_tree, self.parse_expr())
         else:
-            self.error(f'Invalid condition: {self.current_token.type}')
+            self.error(f'Invalid condition: {self.current_token.type}', 'condition')
         return parse_tree
 
     def parse_else(self):
@@ -495,12 +1001,12 @@ class SyntaxAnalyzer:
             # Match and consume the left brace
             self.match('lbrace')
             # Parse and add the else block
-            parse_tree.add_child(self.parse_block())
+            self.add_child(parse_tree, self.parse_block())
             # Match and consume the right brace
             self.match('rbrace')
         else:
             # Epsilon production - no else block
-            parse_tree.add_child(None)
+            self.add_child(parse_tree, None)
         return parse_tree
 
     def parse_return(self):
@@ -509,7 +1015,7 @@ class SyntaxAnalyzer:
         # Match and consume the 'return' keyword
         self.match('return')
         # Parse and add the right-hand side of the return expression
-        parse_tree.add_child(self.parse_rhs())
+        self.add_child(parse_tree, self.parse_rhs())
         # Match and consume the semicolon
         self.match('semi')
         return parse_tree
@@ -518,22 +1024,22 @@ class SyntaxAnalyzer:
         # Create a node for a class declaration
         parse_tree = self.create_node('CDECL')
         # Add the class name node
-        parse_tree.add_child(self.create_node(self.current_token.value))
+        self.add_child(parse_tree, self.create_leaf())
         # Match and consume the 'class' keyword
         self.match('class')
         # Add the class identifier node
-        parse_tree.add_child(self.create_node(self.current_token.value))
+        self.add_child(parse_tree, self.create_leaf())
         # Match and consume the class identifier
         self.match('id')
         # Match and consume the left brace
         self.match('lbrace')
-        while (self.current_token.type != 'lbrace'):
+        while self.current_token.type not in ('lbrace', 'EOF'):
             # Skip tokens until the left brace is encountered
             self.advance()
         # Match and consume the left brace
         self.match('lbrace')
         # Parse and add the declarations within the class
-        parse_tree.add_child(self.parse_odecl())
+        self.add_child(parse_tree, self.parse_odecl())
         # Match and consume the right brace
         self.match('rbrace')
         return parse_tree
@@ -546,43 +1052,256 @@ class SyntaxAnalyzer:
             self.match('id')
         if self.current_token.type in ['vtype', 'class']:
             # Parse and add a declaration
-            parse_tree.add_child(self.parse_decl())
+            self.add_child(parse_tree, self.parse_decl())
             # Recursively parse and add more declarations
-            parse_tree.add_child(self.parse_odecl())
+            self.add_child(parse_tree, self.parse_odecl())
             while self.current_token.type == 'id':
                 # Match and consume the object identifiers
                 self.match('id')
                 # Parse and add the final declaration
-            parse_tree.add_child(self.parse_decl())
+            self.add_child(parse_tree, self.parse_decl())
         else:
             # Epsilon production - no more declarations
-            parse_tree.add_child(None)
+            self.add_child(parse_tree, None)
         return parse_tree
 
 
+# Syntax analyzer building a ParseTreeArena instead of ParseTreeNode objects
+# After parse(), parse_tree is the ArenaNode view of the root and arena holds the tree
+class ArenaSyntaxAnalyzer(SyntaxAnalyzer):
+    def __init__(self, tokens, recover: bool = False):
+        super().__init__(tokens, recover=recover)
+        self.arena = ParseTreeArena(tokens)
+        # Leaves can only refer to tokens that stay reachable by index
+        self.refer_to_tokens = self.token_iterator is None
+
+    def create_node(self, label):
+        arena = self.arena
+        label_id = arena.label_ids.get(label)
+        if label_id is None:
+            label_id = arena.label_id(label)
+        return arena.new_node(label_id, -1)
+
+    def create_leaf(self):
+        if self.refer_to_tokens:
+            return self.arena.new_node(-1, self.token_index)
+        # Lazily produced tokens are gone once consumed: keep the value in the label table
+        return self.arena.new_node(self.arena.label_id(self.current_token.value), -1)
+
+    def add_child(self, parent, child):
+        if child is not None:
+            self.arena.add_child(parent, child)
+
+    # Same as SyntaxAnalyzer.parse; the declarations handed to on_decl are views too.
+    # The arena keeps their nodes, so streaming does not bound the memory here.
+    def parse(self, on_decl=None):
+        if on_decl is None:
+            super().parse()
+        else:
+            super().parse(lambda decl: on_decl(self.arena.node(decl)))
+        # Expose the root through the ParseTreeNode-like view
+        self.parse_tree = self.arena.node(self.parse_tree)
+
+
 # Print the parse tree
 def print_parse_tree(node, indent=''):
-    print(indent + node.label)
-    for child in node.children:
-        print_parse_tree(child, indent + '  ')
+    # Lines are produced without recursion (deep trees) and written in chunks
+    write_lines(sys.stdout, iter_tree_lines(node, indent))
 
 
-# Main
-if __name__ == "__main__":
-    # Get java source code file path
-    file_path = sys.argv[1]
+# Content-addressed parse caches, one per cache directory and process
+_parse_caches = {}
+
+
+def get_parse_cache(cache_dir: str):
+    if cache_dir not in _parse_caches:
+        # Imported here since parse_cache itself imports this module
+        from parse_cache import ParseCache
+        _parse_caches[cache_dir] = ParseCache(cache_dir)
+    return _parse_caches[cache_dir]
+
+
+# Analyze a single file and print its tokens and parse tree (see parse_tree_io.FORMATS)
+# With an AnalyzerProfile, the phases and the productions of the analyzer are profiled
+def run_single(file_path: str, use_mmap: bool = False, cache_dir: str = None, use_arena: bool = False,
+               recover: bool = False, profile=None, output_format: str = 'text'):
+    # Phase timer of the profile, or a context doing nothing
+    def phase(name):
+        return profile.phase(name) if profile is not None else nullcontext()
+
+    if cache_dir is not None and not recover:
+        # Reuse the tokens and tree of an identical source analyzed before
+        with phase('cache'):
+            tokens, parse_tree, error = get_parse_cache(cache_dir).analyze_file_result(file_path)
+        # As below, the tokens are printed before the error is raised
+        with phase('print'):
+            write_output(output_format, tokens, parse_tree)
+        if error is not None:
+            raise error
+        return
 
     # Generate tokens from Java source code
-    tokens = parse_java_code(file_path)
-    # Print tokens' value and type
-    print("----------TOKENS----------")
-    for token in tokens:
-        print(token.value + "\t(L" + str(token.line_number) + ")" + "\t--->\t" + token.type)
+    with phase('lex'):
+        tokens = parse_java_code(file_path, use_mmap=use_mmap)
 
     # Init our SyntaxAnalyzer with the obtained tokens
-    analyzer = SyntaxAnalyzer(tokens)
+    if use_arena:
+        analyzer = ArenaSyntaxAnalyzer(tokens, recover=recover)
+    else:
+        analyzer = SyntaxAnalyzer(tokens, recover=recover)
+    if profile is not None:
+        profile.instrument(analyzer)
+
+    # Parse them to generate our tree
+    try:
+        with phase('parse'):
+            analyzer.parse()
+    except Exception:
+        # The tokens are still printed before the error is raised
+        with phase('print'):
+            write_output(output_format, tokens, None)
+        raise
+    # Print the tokens' value and type, the tree and the errors found in recovering mode
+    with phase('print'):
+        write_output(output_format, tokens, analyzer.parse_tree, analyzer.diagnostics)
+
+
+# Analyze a single file in streaming mode: the tokens are lexed lazily from the mapped
+# file and each top-level declaration is printed, then dropped, as soon as it is parsed.
+# The tree is printed like print_parse_tree would print the whole CODE tree; the tokens
+# are not printed since they are not kept.
+def run_stream(file_path: str, recover: bool = False):
+    analyzer = SyntaxAnalyzer(iter_file_tokens(file_path), recover=recover)
+    sys.stdout.write("----------PARSE TREE----------\nCODE\n")
+    analyzer.parse(on_decl=lambda decl: write_lines(sys.stdout, iter_tree_lines(decl, '  ')))
+    if analyzer.diagnostics:
+        sys.stdout.write("----------ERRORS----------\n")
+        write_lines(sys.stdout, (str(diagnostic) for diagnostic in analyzer.diagnostics))
+
 
-    # Parse them to generate our tree and print it
-    analyzer.parse()
-    print("----------PARSE TREE----------")
-    print_parse_tree(analyzer.parse_tree)
+# Lex and parse one file without printing anything
+# Returns (file_path, error message or None, number of tokens, elapsed seconds)
+# Defined at module level so it can be sent to worker processes
+def analyze_file(file_path: str, use_mmap: bool = False, cache_dir: str = None, recover: bool = False):
+    # Open the cache outside of the timed section (it only keeps the first error of a file)
+    cache = get_parse_cache(cache_dir) if cache_dir is not None and not recover else None
+    start = time.perf_counter()
+    token_count = 0
+    try:
+        if cache is not None:
+            tokens, _ = cache.analyze_file(file_path)
+            return file_path, None, len(tokens), time.perf_counter() - start
+        tokens = parse_java_code(file_path, compact=True, use_mmap=use_mmap)
+        token_count = len(tokens)
+        analyzer = SyntaxAnalyzer(tokens, recover=recover)
+        analyzer.parse()
+        # All the errors of the file in recovering mode
+        error = '; '.join(str(diagnostic) for diagnostic in analyzer.diagnostics) or None
+    except Exception as exception:
+        error = f'{type(exception).__name__}: {exception}'
+    return file_path, error, token_count, time.perf_counter() - start
+
+
+# Expand directories (recursively) and glob patterns into a sorted list of Java files
+def collect_java_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '**', '*.java'), recursive=True))
+        elif glob.has_magic(path):
+            files.extend(glob.glob(path, recursive=True))
+        else:
+            files.append(path)
+    # Remove duplicates while keeping a stable order
+    return sorted(set(files))
+
+
+# Analyze many files over a process pool and print a per-file summary
+# Returns the number of files that failed
+def run_batch(paths, workers: int = None, use_mmap: bool = False, cache_dir: str = None, recover: bool = False):
+    files = collect_java_files(paths)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    analyze = partial(analyze_file, use_mmap=use_mmap, cache_dir=cache_dir, recover=recover)
+
+    if workers == 1 or len(files) <= 1:
+        # Not worth starting worker processes
+        workers = 1
+        results = [analyze(file_path) for file_path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Send files in chunks to amortize the inter-process overhead
+            chunksize = max(1, len(files) // (workers * 4))
+            results = list(executor.map(analyze, files, chunksize=chunksize))
+        if cache_dir is not None and not recover:
+            # Each worker only bounded the cache by the entries it knew of: the bounds are
+            # enforced again over the whole directory, re-read with the recency of every entry
+            from parse_cache import ParseCache
+            ParseCache(cache_dir).evict()
+
+    wall_time = time.perf_counter() - start
+    failures = 0
+    total_tokens = 0
+    total_time = 0.0
+    for file_path, error, token_count, elapsed in results:
+        total_tokens += token_count
+        total_time += elapsed
+        if error is None:
+            print(f'OK    {file_path}\t({token_count} tokens, {elapsed * 1000:.2f} ms)')
+        else:
+            failures += 1
+            print(f'FAIL  {file_path}\t{error}')
+
+    print("----------SUMMARY----------")
+    print(f'{len(files)} files, {len(files) - failures} succeeded, {failures} failed')
+    print(f'{total_tokens} tokens, {total_time:.3f} s analysis time, '
+          f'{wall_time:.3f} s wall time with {workers} worker(s)')
+    return failures
+
+
+# Main
+if __name__ == "__main__":
+    # Command line arguments
+    argument_parser = argparse.ArgumentParser(description='Lexical and syntax analyzer for the Java subset')
+    argument_parser.add_argument('paths', nargs='+', help='Java source file (or files, directories and globs with --batch)')
+    argument_parser.add_argument('--batch', action='store_true', help='analyze many files over a process pool and print a summary')
+    argument_parser.add_argument('--workers', type=int, default=None, help='number of worker processes in batch mode (default: CPU count)')
+    argument_parser.add_argument('--mmap', action='store_true', help='lex memory-mapped files instead of reading them')
+    argument_parser.add_argument('--cache', metavar='DIR', default=None, help='reuse tokens and parse trees cached in DIR for identical sources')
+    argument_parser.add_argument('--arena', action='store_true', help='build the parse tree in a compact arena')
+    argument_parser.add_argument('--recover', action='store_true', help='report every syntax error instead of stopping at the first one')
+    argument_parser.add_argument('--profile', action='store_true', help='print the time and counters of each phase and production on stderr')
+    argument_parser.add_argument('--profile-json', metavar='FILE', default=None, help='write the profile to FILE as JSON')
+    argument_parser.add_argument('--format', choices=sorted(FORMATS), default='text', help='output format of the tokens and parse tree')
+    argument_parser.add_argument('--stream', action='store_true', help='print each top-level declaration as soon as it is parsed, in bounded memory (no tokens)')
+    arguments = argument_parser.parse_args()
+
+    if arguments.batch and (arguments.profile or arguments.profile_json or arguments.stream):
+        argument_parser.error('--profile and --stream are not supported with --batch')
+    if arguments.cache and (arguments.arena or arguments.mmap):
+        # Cached sources are neither lexed from a mapped file nor parsed into an arena
+        argument_parser.error('--cache cannot be combined with --arena or --mmap')
+    if arguments.batch:
+        sys.exit(1 if run_batch(arguments.paths, arguments.workers, arguments.mmap, arguments.cache, arguments.recover) else 0)
+    if len(arguments.paths) > 1:
+        argument_parser.error('several paths require --batch')
+    if arguments.stream:
+        if arguments.arena or arguments.cache or arguments.profile or arguments.profile_json or arguments.format != 'text':
+            argument_parser.error('--stream only supports the text format, without --arena, --cache or --profile')
+        run_stream(arguments.paths[0], arguments.recover)
+        sys.exit(0)
+    profile = None
+    if arguments.profile or arguments.profile_json:
+        # Imported here since analyzer_profile itself imports this module
+        from analyzer_profile import AnalyzerProfile
+        profile = AnalyzerProfile()
+    # Get java source code file path
+    try:
+        run_single(arguments.paths[0], arguments.mmap, arguments.cache, arguments.arena, arguments.recover, profile,
+                   arguments.format)
+    finally:
+        # Also reported when the analysis stops on an error
+        if arguments.profile:
+            print(profile.report(), file=sys.stderr)
+        if arguments.profile_json:
+            profile.dump(arguments.profile_json)
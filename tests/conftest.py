@@ -0,0 +1,11 @@
+#### File: tests/conftest.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Make the modules of the repository importable when the tests run with a plain `pytest`
+
+import os
+import sys
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPOSITORY not in sys.path:
+    sys.path.insert(0, REPOSITORY)
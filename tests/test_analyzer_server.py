@@ -0,0 +1,93 @@
+#### File: tests/test_analyzer_server.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Requests of the analyzer server, over stdin/stdout and over a Unix socket
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from analyzer_server import AnalyzerClient, analyze_request
+from parse_cache import flatten_tree
+from syntax_analyzer import SyntaxAnalyzer, tokenize
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALID_SOURCE = 'int a = 1;\nint b = a + 2;\n'
+INVALID_SOURCE = 'int a = 1;\nint = 2;\n'
+
+
+def requests_text(*requests):
+    return ''.join(json.dumps(dict(request, id=number)) + '\n' for number, request in enumerate(requests, 1))
+
+
+def responses_by_id(output):
+    return {response['id']: response for response in map(json.loads, output.splitlines())}
+
+
+def test_analyze_request_reports_tokens_tree_and_errors():
+    result = analyze_request({'source': VALID_SOURCE, 'tree': True})
+    assert result['tokens'] == len(tokenize(VALID_SOURCE))
+    assert result['errors'] == []
+    analyzer = SyntaxAnalyzer(tokenize(VALID_SOURCE))
+    analyzer.parse()
+    assert result['tree'] == flatten_tree(analyzer.parse_tree)
+    error, = analyze_request({'source': INVALID_SOURCE})['errors']
+    assert error['line'] == 2 and error['found'] == 'assign'
+
+
+def test_analyze_request_with_a_cache_matches_without(tmp_path):
+    for source_code in (VALID_SOURCE, INVALID_SOURCE):
+        expected = analyze_request({'source': source_code, 'output': 'text'})
+        for _ in range(2):
+            # Filled by the first request, read by the second one
+            result = analyze_request({'source': source_code, 'output': 'text'}, cache_dir=str(tmp_path))
+            assert result['errors'] == expected['errors']
+            assert result['output'] == expected['output']
+
+
+def test_stdio_server_with_a_file_on_stdin(tmp_path):
+    path = tmp_path / 'requests.jsonl'
+    path.write_text(requests_text({'method': 'ping'}, {'method': 'analyze', 'params': {'source': VALID_SOURCE}},
+                                  {'method': 'unknown'}))
+    with open(path, 'rb') as file:
+        completed = subprocess.run([sys.executable, 'analyzer_server.py', 'serve', '--workers', '1'], stdin=file,
+                                   cwd=REPOSITORY, capture_output=True, check=True, timeout=60)
+    responses = responses_by_id(completed.stdout.decode())
+    assert responses[1]['result'] == 'pong'
+    assert responses[2]['result']['errors'] == []
+    assert responses[3]['error']['message'] == 'ValueError: Unknown method: unknown'
+
+
+def test_stdio_server_with_a_pipe_on_stdin():
+    completed = subprocess.run([sys.executable, 'analyzer_server.py', 'serve', '--workers', '1'],
+                               input=requests_text({'method': 'ping'}).encode(), cwd=REPOSITORY,
+                               capture_output=True, check=True, timeout=60)
+    assert responses_by_id(completed.stdout.decode())[1]['result'] == 'pong'
+
+
+def test_socket_server_and_client(tmp_path):
+    socket_path = str(tmp_path / 'server.sock')
+    paths = []
+    for name, source_code in (('valid', VALID_SOURCE), ('invalid', INVALID_SOURCE)):
+        path = tmp_path / f'{name}.java'
+        path.write_text(source_code)
+        paths.append(str(path))
+    server = subprocess.Popen([sys.executable, 'analyzer_server.py', 'serve', '--socket', socket_path,
+                               '--workers', '2'], cwd=REPOSITORY)
+    try:
+        deadline = time.monotonic() + 60
+        while not os.path.exists(socket_path):
+            assert server.poll() is None and time.monotonic() < deadline
+            time.sleep(0.05)
+        with AnalyzerClient(socket_path) as client:
+            valid, invalid = client.analyze_files(paths)
+            assert valid['result']['errors'] == []
+            assert invalid['result']['errors'][0]['line'] == 2
+            client.call('shutdown')
+        assert server.wait(timeout=60) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
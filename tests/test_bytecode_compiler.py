@@ -0,0 +1,46 @@
+#### File: tests/test_bytecode_compiler.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Bytecode of the compiled functions against the tree-walking evaluator
+
+import pytest
+
+from bytecode_compiler import RETURN, compile_source
+from interpreter import SUBSET_PROGRAMS, execute, load_program
+from semantic_analyzer import SemanticError
+
+
+@pytest.mark.parametrize('name', sorted(SUBSET_PROGRAMS))
+def test_subset_programs_match_the_tree_evaluator(name):
+    source_code, function_name, arguments = SUBSET_PROGRAMS[name]
+    functions, evaluator = load_program(source_code)
+    assert execute(functions[function_name], list(arguments)) == evaluator.call(function_name, arguments)
+
+
+def test_precedence_and_string_concatenation():
+    functions, evaluator = load_program('String f(int n) { String s = "a" + n * 2 + n; return s; }')
+    assert execute(functions['f'], [3]) == evaluator.call('f', (3,)) == 'a63'
+
+
+def test_conversions_of_char_and_int_values():
+    functions = compile_source("double f(int n) { char c = 'a'; int i = c + n; double d = i; return d / 2; }")
+    assert execute(functions['f'], [1]) == 49.0
+
+
+def test_possibly_unassigned_variable_is_rejected():
+    # x is only assigned when a > 0: refused before any of the executors runs it
+    source_code = 'int f(int a) { int x; if (a > 0) { x = 1; } return x; }'
+    with pytest.raises(SemanticError, match='Variable x might not have been initialized'):
+        compile_source(source_code)
+    with pytest.raises(SemanticError):
+        load_program(source_code)
+
+
+def test_variable_assigned_on_every_path_is_accepted():
+    functions, evaluator = load_program('int f(int a) { int x; if (a > 0) { x = 1; } else { x = 2; } return x; }')
+    assert [execute(functions['f'], [a]) for a in (0, 1)] == [evaluator.call('f', (a,)) for a in (0, 1)] == [2, 1]
+
+
+def test_methods_are_compiled_by_qualified_name():
+    functions = compile_source('class A { int f(int a) { return a + 1; } }')
+    assert list(functions) == ['A.f']
+    assert functions['A.f'].instructions()[-1][0] == RETURN
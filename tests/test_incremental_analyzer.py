@@ -0,0 +1,43 @@
+#### File: tests/test_incremental_analyzer.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Line numbers of the leaves kept up to date by IncrementalAnalyzer
+
+from incremental_analyzer import IncrementalAnalyzer
+from syntax_analyzer import SyntaxAnalyzer, tokenize
+
+
+SOURCE = 'int a = 1;\nint b = 2;\nint c = a;\n'
+
+
+# (label, line) of the leaves of a tree, in preorder
+def leaf_lines(root):
+    lines = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if not node.children:
+            lines.append((node.label, node.line_number))
+        stack.extend(reversed(node.children))
+    return lines
+
+
+def full_parse_lines(source_code):
+    analyzer = SyntaxAnalyzer(tokenize(source_code))
+    analyzer.parse()
+    return leaf_lines(analyzer.parse_tree)
+
+
+def test_inserted_newline_shifts_reused_leaves():
+    analyzer = IncrementalAnalyzer(SOURCE)
+    # Break the second declaration over two lines: the third one is reused
+    analyzer.apply_edit(SOURCE.index('= 2'), 0, '\n\n')
+    assert analyzer.last_edit[1] != 'full'
+    assert leaf_lines(analyzer.parse_tree) == full_parse_lines(analyzer.source)
+    assert ('c', 5) in leaf_lines(analyzer.parse_tree)
+
+
+def test_deleted_newline_shifts_reused_leaves():
+    analyzer = IncrementalAnalyzer(SOURCE)
+    analyzer.apply_edit(SOURCE.index('\nint b'), 1, ' ')
+    assert leaf_lines(analyzer.parse_tree) == full_parse_lines(analyzer.source)
+    assert ('c', 2) in leaf_lines(analyzer.parse_tree)
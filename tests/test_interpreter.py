@@ -0,0 +1,47 @@
+#### File: tests/test_interpreter.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Bytecode interpreter and tree-walking evaluator on Java int, double and String semantics
+
+import math
+
+import pytest
+
+from interpreter import SUBSET_PROGRAMS, execute, load_program
+
+
+def run_both(source_code, arguments):
+    functions, evaluator = load_program(source_code)
+    return execute(functions['f'], list(arguments)), evaluator.call('f', tuple(arguments))
+
+
+@pytest.mark.parametrize('name', sorted(SUBSET_PROGRAMS))
+def test_subset_programs(name):
+    source_code, function_name, arguments = SUBSET_PROGRAMS[name]
+    functions, evaluator = load_program(source_code)
+    expected = {'adder': 30, 'lcm': 360, 'octal': 342391}[name]
+    assert execute(functions[function_name], list(arguments)) == evaluator.call(function_name, arguments) == expected
+
+
+def test_int_overflow_and_truncated_division():
+    source_code = 'int f(int a, int b) { int c = a * a + b / 2; return c; }'
+    assert run_both(source_code, (65536, -7)) == (-3, -3)
+    assert run_both('int f(int a, int b) { int c = a / b; return c; }', (-2147483648, -1)) == (-2147483648,) * 2
+
+
+def test_double_division_by_zero_and_string_conversion():
+    source_code = 'double f(int a, int b) { double d = a; return d / b; }'
+    assert run_both(source_code, (1, 0)) == (math.inf, math.inf)
+    assert run_both(source_code, (-1, 0)) == (-math.inf, -math.inf)
+    assert all(map(math.isnan, run_both(source_code, (0, 0))))
+    assert run_both('String f(int a, int b) { double d = a; String s = "" + d + b; return s; }', (1, 0)) == ('1.00',) * 2
+
+
+@pytest.mark.parametrize('executor', ['bytecode', 'tree'])
+def test_division_by_zero_reports_the_line_of_the_operator(executor):
+    source_code = 'int f(int a, int b) {\n  int c = a + 1;\n  int d = c\n    / b;\n  return d;\n}'
+    functions, evaluator = load_program(source_code)
+    with pytest.raises(ArithmeticError, match=r'^Runtime error \(L4\): / by zero$'):
+        if executor == 'bytecode':
+            execute(functions['f'], [1, 0])
+        else:
+            evaluator.call('f', (1, 0))
@@ -0,0 +1,40 @@
+#### File: tests/test_lexer.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Differential tests of the token streams against tokenize
+
+import pytest
+
+from syntax_analyzer import MappedTokenStream, TokenStream, tokenize
+
+
+SOURCES = {
+    'ascii': 'class Adder {\n  int add(int a, int b) {\n    // sum\n    int c = a + b;\n    return c;\n  }\n}\n',
+    'non_ascii': ("class Café {\n  int bé = 1;\n  char c = 'é';\n  String s = \"naïve\";\n"
+                  "  // commentaire à ignorer\n  int x٣ = ٣;\n}\n"),
+    'empty': '',
+}
+
+
+def token_records(tokens):
+    return [(token.type, token.value, token.line_number) for token in tokens]
+
+
+@pytest.mark.parametrize('name', sorted(SOURCES))
+def test_token_streams_match_tokenize(tmp_path, name):
+    source_code = SOURCES[name]
+    path = tmp_path / f'{name}.java'
+    path.write_text(source_code, encoding='utf-8')
+    expected = token_records(tokenize(source_code))
+    assert token_records(TokenStream.from_source(source_code)) == expected
+    with MappedTokenStream(str(path)) as tokens:
+        assert token_records(tokens) == expected
+
+
+def test_token_stream_cannot_be_extended_twice():
+    # Offsets and line numbers refer to the source of the stream: more text needs a new stream
+    tokens = TokenStream.from_source(SOURCES['ascii'])
+    with pytest.raises(ValueError, match='create a new stream'):
+        tokens.extend('int d = 1;\n')
+    with pytest.raises(ValueError, match='create a new stream'):
+        tokens.extend(tokens.source)
+    assert token_records(tokens) == token_records(tokenize(SOURCES['ascii']))
@@ -0,0 +1,139 @@
+#### File: tests/test_optimizer.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Optimized functions against the unoptimized bytecode and the tree-walking evaluator
+
+import random
+
+import pytest
+
+from bytecode_compiler import DIV, JUMP_IF, JUMP_IF_NOT, MUL, REM, SUB
+from interpreter import SUBSET_PROGRAMS, execute, load_program
+from optimizer import PassManager
+
+
+COMPARISONS = ('<', '>', '<=', '>=', '==', '!=')
+
+
+# Random program of the subset: int and boolean variables, if/else, bounded loops,
+# the remainder idiom and divisions that may be by zero
+class ProgramGenerator:
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.count = 0
+
+    def name(self, prefix):
+        self.count += 1
+        return f'{prefix}{self.count}'
+
+    def expression(self, names, depth=0):
+        generator = self.random
+        if depth > 2 or generator.random() < 0.35:
+            return generator.choice(names) if generator.random() < 0.6 else str(generator.randint(0, 9))
+        if generator.random() < 0.15:
+            dividend, divisor = generator.choice(names), generator.choice(names + ['3'])
+            return f'({dividend} - {dividend} / {divisor} * {divisor})'
+        expression = f'{self.expression(names, depth + 1)} {generator.choice("+-*/")} {self.expression(names, depth + 1)}'
+        return f'({expression})' if generator.random() < 0.3 else expression
+
+    def condition(self, names, flags):
+        if flags and self.random.random() < 0.4:
+            return self.random.choice(flags)
+        return f'{self.expression(names)} {self.random.choice(COMPARISONS)} {self.expression(names)}'
+
+    def block(self, names, flags, counters, depth):
+        generator = self.random
+        names, flags = list(names), list(flags)
+        lines = []
+        for _ in range(generator.randint(1, 4)):
+            kind = generator.random()
+            assignable = [name for name in names if name not in counters]
+            if kind < 0.25:
+                name = self.name('v')
+                lines.append(f'int {name} = {self.expression(names)};')
+                names.append(name)
+            elif kind < 0.4:
+                name = self.name('f')
+                lines.append(f'boolean {name} = {generator.choice(["true", "false"])};')
+                flags.append(name)
+            elif kind < 0.55 and assignable:
+                lines.append(f'{generator.choice(assignable)} = {self.expression(names)};')
+            elif kind < 0.65 and flags:
+                lines.append(f'{generator.choice(flags)} = {generator.choice(["true", "false"])};')
+            elif kind < 0.85 and depth < 3:
+                statement = (f'if ({self.condition(names, flags)}) '
+                             f'{{ {self.block(names, flags, counters, depth + 1)} }}')
+                if generator.random() < 0.5:
+                    statement += f' else {{ {self.block(names, flags, counters, depth + 1)} }}'
+                lines.append(statement)
+            elif depth < 3:
+                counter = self.name('i')
+                body = self.block(names + [counter], flags, counters | {counter}, depth + 1)
+                lines.append(f'int {counter} = 0; '
+                             f'while ({counter} < {generator.randint(0, 4)}) {{ {body} {counter} = {counter} + 1; }}')
+                names.append(counter)
+        self.names = names
+        return ' '.join(lines)
+
+    def program(self):
+        body = self.block(['a', 'b'], [], frozenset(), 0)
+        return f'int f(int a, int b) {{ {body} return {self.random.choice(self.names)}; }}'
+
+
+# Result of a call, or the message of the error it raised
+def outcome(call):
+    try:
+        return call()
+    except ArithmeticError as error:
+        return str(error)
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_random_programs_match_the_interpreters(seed):
+    generator = ProgramGenerator(seed)
+    for _ in range(40):
+        source_code = generator.program()
+        functions, evaluator = load_program(source_code)
+        optimized = PassManager().run_all(functions)
+        for arguments in ([1, 2], [7, -3], [-8, 5], [0, 0]):
+            expected = outcome(lambda: execute(functions['f'], arguments))
+            assert outcome(lambda: execute(optimized['f'], arguments)) == expected, (source_code, arguments)
+            reference = outcome(lambda: evaluator.call('f', arguments))
+            # Same result, or an error from both
+            assert reference == expected or str(reference).endswith('/ by zero') == str(expected).endswith('/ by zero')
+
+
+@pytest.mark.parametrize('name', sorted(SUBSET_PROGRAMS))
+def test_subset_programs_match_the_interpreter(name):
+    source_code, function_name, arguments = SUBSET_PROGRAMS[name]
+    functions, _ = load_program(source_code)
+    optimized = PassManager().run(functions[function_name])
+    assert execute(optimized, list(arguments)) == execute(functions[function_name], list(arguments))
+    assert len(optimized.instructions()) <= len(functions[function_name].instructions())
+    assert optimized.register_count <= functions[function_name].register_count
+
+
+def test_least_common_multiple_loop_is_simplified():
+    source_code, function_name, arguments = SUBSET_PROGRAMS['lcm']
+    function = load_program(source_code)[0][function_name]
+    opcodes = [instruction[0] for instruction in PassManager().run(function).instructions()]
+    # Both remainders fused, and the `searching` flag gone: the loop exits by its inner branch
+    assert opcodes.count(REM) == 2 and DIV not in opcodes and MUL not in opcodes and SUB not in opcodes
+    assert JUMP_IF not in opcodes and JUMP_IF_NOT not in opcodes
+
+
+def test_fused_remainder_keeps_the_line_of_the_division():
+    source_code = 'int f(int a, int b) {\n  int r = a - a / b * b;\n  return r;\n}'
+    function = load_program(source_code)[0]['f']
+    optimized = PassManager().run(function)
+    assert REM in [instruction[0] for instruction in optimized.instructions()]
+    assert [execute(optimized, [arguments[0], arguments[1]]) for arguments in ((7, 3), (-7, 3), (7, -3))] == [1, -1, 1]
+    with pytest.raises(ArithmeticError, match=r'\(L2\): / by zero'):
+        execute(optimized, [7, 0])
+
+
+def test_statistics_count_the_registers_in_use():
+    source_code, function_name, _ = SUBSET_PROGRAMS['lcm']
+    manager = PassManager()
+    manager.run(load_program(source_code)[0][function_name])
+    coalescing = [stats for stats in manager.statistics if stats.name == 'register-coalescing']
+    assert coalescing and coalescing[0].registers_after < coalescing[0].registers_before
@@ -0,0 +1,91 @@
+#### File: tests/test_parse_cache.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: ParseCache hits, eviction and damaged entries, and its command line options
+
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from parse_cache import ENTRY_SUFFIX, ParseCache, flatten_tree
+from syntax_analyzer import ParsingError, SyntaxAnalyzer, tokenize
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALID_SOURCE = 'int a = 1;\nint b = a + 2;\n'
+INVALID_SOURCE = 'int a = 1;\nint = 2;\n'
+
+
+def entry_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(ENTRY_SUFFIX))
+
+
+def test_second_analysis_is_a_hit_with_the_same_tree(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    analyzer = SyntaxAnalyzer(tokenize(VALID_SOURCE))
+    analyzer.parse()
+    for _ in range(2):
+        tokens, parse_tree = cache.analyze_source(VALID_SOURCE)
+        assert flatten_tree(parse_tree) == flatten_tree(analyzer.parse_tree)
+        assert [token.type for token in tokens] == [token.type for token in tokenize(VALID_SOURCE)]
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_invalid_source_raises_the_cached_error(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    for _ in range(2):
+        with pytest.raises(ParsingError) as error:
+            cache.analyze_source(INVALID_SOURCE)
+        assert error.value.line_number == 2
+    assert cache.hits == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ParseCache(str(tmp_path), max_entries=2)
+    sources = [f'int a{number} = {number};' for number in range(3)]
+    cache.analyze_source(sources[0])
+    cache.analyze_source(sources[1])
+    cache.analyze_source(sources[0])
+    cache.analyze_source(sources[2])
+    assert entry_files(tmp_path) == sorted(key + ENTRY_SUFFIX for key in (ParseCache.key(sources[0].encode()),
+                                                                           ParseCache.key(sources[2].encode())))
+
+
+# Empty, truncated, not a pickle, unknown protocol, renamed class, renamed module
+DAMAGED_ENTRIES = [b'', pickle.dumps(ParseCache)[:-1], b'not a pickle', b'\x80\x09.',
+                   pickle.dumps(ParseCache).replace(b'ParseCache', b'ParseCachX'),
+                   pickle.dumps(ParseCache).replace(b'parse_cache', b'parse_cachX')]
+
+
+@pytest.mark.parametrize('content', DAMAGED_ENTRIES)
+def test_damaged_entry_is_discarded_and_reanalyzed(tmp_path, content):
+    cache = ParseCache(str(tmp_path))
+    key = ParseCache.key(VALID_SOURCE.encode())
+    cache.analyze_source(VALID_SOURCE)
+    with open(cache.entry_path(key), 'wb') as file:
+        file.write(content)
+    assert cache.get(key) is None
+    assert not os.path.exists(cache.entry_path(key))
+    _, parse_tree = cache.analyze_source(VALID_SOURCE)
+    assert parse_tree.label == 'CODE'
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    with pytest.raises(Exception):
+        # Functions defined in a test are not picklable
+        cache.put('key', lambda: None)
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('option', ['--arena', '--mmap'])
+def test_cache_is_rejected_with_arena_and_mmap(tmp_path, option):
+    path = tmp_path / 'source.java'
+    path.write_text(VALID_SOURCE)
+    completed = subprocess.run([sys.executable, 'syntax_analyzer.py', str(path), '--cache', str(tmp_path / 'cache'),
+                                option], cwd=REPOSITORY, capture_output=True, text=True)
+    assert completed.returncode == 2
+    assert '--cache cannot be combined with --arena or --mmap' in completed.stderr
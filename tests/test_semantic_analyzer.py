@@ -0,0 +1,60 @@
+#### File: tests/test_semantic_analyzer.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Declarations, references and type checks of SemanticAnalyzer
+
+from semantic_analyzer import analyze_source
+
+
+def error_messages(source_code):
+    return [str(error) for error in analyze_source(source_code).errors]
+
+
+def test_precedence_of_operators_with_a_string_operand():
+    # n * 2 is an int added to a String, not a String multiplied by an int
+    assert error_messages('String f(int n) { String s = "a" + n * 2; return s; }') == []
+    assert error_messages('String f(int n) { String s = n * 2 + "a"; return s; }') == []
+    assert error_messages('int f(int n) { int s = n * "a" + 2; return s; }') == [
+        'Semantic error (L1): Operator * cannot be applied to int and String']
+
+
+def test_type_of_parenthesized_expressions():
+    assert error_messages('double f(int n) { double d = (n + 1) * 2 / 3; return d; }') == []
+    assert error_messages('int f(int n) { int s = ("a" + n) * 2; return s; }') == [
+        'Semantic error (L1): Operator * cannot be applied to String and int']
+
+
+def test_type_mismatches():
+    assert error_messages('int f(int n) {\n  int s = "a" + n;\n  return s;\n}') == [
+        'Semantic error (L2): Type mismatch: String assigned to int s']
+    assert error_messages('int f(int n) { boolean b = true; return b; }') == [
+        'Semantic error (L1): Type mismatch: boolean returned by int function f']
+    assert error_messages('int f(int n) { if (n < "a") { n = 1; } return n; }') == [
+        'Semantic error (L1): Operator < cannot be applied to int and String']
+
+
+def test_undeclared_and_redeclared_names():
+    assert error_messages('int f(int n) { int m = k + 1; return m; }') == [
+        'Semantic error (L1): Undeclared identifier k']
+    assert error_messages('int f(int n) {\n  int n = 1;\n  return n;\n}') == [
+        'Semantic error (L2): n is already declared in this scope (L1)']
+
+
+def test_references_resolved_to_their_declaration():
+    analyzer = analyze_source('class A {\n  int x = 1;\n  int f(int y) {\n    int z = x + y;\n    return z;\n  }\n}')
+    assert analyzer.errors == []
+    x = analyzer.declarations_of('x')[0]
+    assert x.kind == 'variable' and x.scope.kind == 'class'
+    assert [reference.line_number for reference in analyzer.references_to(x)] == [4]
+    assert sorted(reference.name for reference in analyzer.references_at(4)) == ['x', 'y']
+
+
+def test_definite_assignment_of_local_variables():
+    unassigned = ['Semantic error (L1): Variable x might not have been initialized']
+    assert error_messages('int f(int a) { int x; if (a > 0) { x = 1; } return x; }') == unassigned
+    assert error_messages('int f(int a) { int x; while (a > 0) { x = 1; a = a - 1; } return x; }') == unassigned
+    assert error_messages('int f(int a) { int x; x = x + 1; return x; }') == unassigned
+    assert error_messages('int f(int a) { int x; if (a > 0) { x = 1; } else { x = 2; } return x; }') == []
+    # The statements after a loop that never ends are unreachable
+    assert error_messages('int f(int a) { int x; while (true) { a = 1; } return x; }') == []
+    # Fields have a default value
+    assert error_messages('class A { int y; int f(int a) { return y; } }') == []
@@ -0,0 +1,77 @@
+#### File: tests/test_slr_parser.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: SLRParser trees against SyntaxAnalyzer, its syntax errors, the grammar file and the table cache
+
+import sys
+
+import pytest
+
+from corpus_generator import generate_source
+from parse_cache import flatten_tree
+import slr_parser
+from slr_parser import SLRParser, grammar_hash, load_tables, parse_grammar
+from syntax_analyzer import ParsingError, SyntaxAnalyzer, tokenize
+
+
+def parse(parser_class, source_code, **options):
+    parser = parser_class(tokenize(source_code), **options)
+    parser.parse()
+    return parser.parse_tree
+
+
+def parsing_error(source_code):
+    with pytest.raises(ParsingError) as error:
+        parse(SLRParser, source_code)
+    return error.value
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_declarations_match_syntax_analyzer(seed):
+    source_code = generate_source('declarations', 20, seed)
+    assert flatten_tree(parse(SLRParser, source_code)) == flatten_tree(parse(SyntaxAnalyzer, source_code))
+
+
+def test_deep_nesting_does_not_recurse():
+    source_code = 'int a = ' + '(' * (sys.getrecursionlimit() * 2) + '1' + ')' * (sys.getrecursionlimit() * 2) + ';'
+    assert parse(SLRParser, source_code).label == 'CODE'
+
+
+def test_expected_terminals_come_from_the_viable_actions():
+    # After `int a = 1` the row of the state reduces on all of FOLLOW(EXPR), which
+    # contains comp and rparen; neither can be shifted in a declaration
+    error = parsing_error('int a = 1 }')
+    assert error.expected == 'addsub, multdiv, semi'
+    assert error.found == 'rbrace'
+    assert str(error) == 'Parsing error (L1): Expected one of addsub, multdiv, semi, found rbrace'
+
+
+def test_end_of_input_is_reported_on_the_line_of_the_last_token():
+    error = parsing_error('int a = 1;\nint b = a\n\n')
+    assert (error.line_number, error.found) == (2, 'EOF')
+    assert error.expected == 'addsub, multdiv, semi'
+
+
+def test_empty_input_is_accepted():
+    assert parse(SLRParser, '\n// nothing\n').label == 'CODE'
+
+
+def test_grammar_file_errors_name_the_line():
+    with pytest.raises(ValueError, match=r'^g:2: missing \{builder\}$'):
+        parse_grammar('A -> a {A 0}\n   | b\n', 'g')
+    with pytest.raises(ValueError, match=r'^g:1: builder position out of the right-hand side$'):
+        parse_grammar('A -> a {A 1}\n', 'g')
+
+
+def test_tables_are_cached_by_grammar_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(slr_parser, 'TABLE_CACHE_DIR', str(tmp_path))
+    grammar, start_symbol = parse_grammar('%start S\nS -> S a {append}\n  | %empty {S}\n')
+    built = load_tables(grammar, start_symbol)
+    path = tmp_path / f'slr_tables-{grammar_hash(grammar, start_symbol)}.pickle'
+    assert path.exists()
+    # Loaded from the file, and rebuilt when the file is damaged
+    assert load_tables(grammar, start_symbol) == built
+    path.write_bytes(b'damaged')
+    assert load_tables(grammar, start_symbol) == built
+    # Another grammar gets other tables
+    other_grammar, _ = parse_grammar('%start S\nS -> a S {S 0 1}\n  | %empty {S}\n')
+    assert grammar_hash(other_grammar, start_symbol) != grammar_hash(grammar, start_symbol)
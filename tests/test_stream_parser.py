@@ -0,0 +1,89 @@
+#### File: tests/test_stream_parser.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: StreamParser on random chunkings against a whole-source parse, and its command line
+
+import asyncio
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from corpus_generator import generate_source
+from parse_tree_io import iter_tree_lines
+from stream_parser import iter_parse_chunks, parse_stream
+from syntax_analyzer import SyntaxAnalyzer, tokenize
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCES = {
+    'corpus': generate_source('declarations', 10),
+    'split_declaration': 'int a = 1;\nint x\n= 2;',
+    'stray_brace': 'int a = 1; } int b = 2;',
+    'strings': 'String s = "a;b}";\nchar c = \';\';\nString t = "naïve";',
+    'incomplete': 'int a = 1; int x',
+}
+
+
+# Tree lines of the declarations of a whole-source parse, or the error raised
+def whole_source_result(source_code):
+    analyzer = SyntaxAnalyzer(tokenize(source_code))
+    try:
+        analyzer.parse()
+    except Exception as exception:
+        return 'error', str(exception)
+    return [list(iter_tree_lines(declaration)) for declaration in analyzer.parse_tree.children]
+
+
+def streamed_result(chunks):
+    try:
+        return [list(iter_tree_lines(declaration)) for declaration in iter_parse_chunks(chunks)]
+    except Exception as exception:
+        return 'error', str(exception)
+
+
+@pytest.mark.parametrize('name', sorted(SOURCES))
+def test_random_chunkings_match_whole_source(name):
+    source_code = SOURCES[name]
+    expected = whole_source_result(source_code)
+    generator = random.Random(name)
+    for _ in range(30):
+        cuts = sorted(generator.sample(range(1, len(source_code)), generator.randint(1, min(12, len(source_code) - 1))))
+        chunks = [source_code[start:end] for start, end in zip([0] + cuts, cuts + [len(source_code)])]
+        assert streamed_result(chunks) == expected, chunks
+
+
+def test_async_stream_of_single_characters():
+    source_code = SOURCES['corpus']
+
+    async def chunks():
+        for character in source_code:
+            yield character
+
+    async def collect():
+        return [list(iter_tree_lines(declaration)) async for declaration in parse_stream(chunks())]
+
+    assert asyncio.run(collect()) == whole_source_result(source_code)
+
+
+def expected_output(source_code):
+    return ''.join(line + '\n' for declaration in whole_source_result(source_code) for line in declaration)
+
+
+def test_command_line_with_a_file_on_stdin(tmp_path):
+    source_code = SOURCES['strings']
+    path = tmp_path / 'source.java'
+    path.write_text(source_code, encoding='utf-8')
+    with open(path, 'rb') as file:
+        completed = subprocess.run([sys.executable, 'stream_parser.py'], stdin=file, cwd=REPOSITORY,
+                                   capture_output=True, check=True)
+    assert completed.stdout.decode('utf-8') == expected_output(source_code)
+
+
+def test_command_line_with_a_pipe_on_stdin():
+    source_code = SOURCES['corpus']
+    completed = subprocess.run([sys.executable, 'stream_parser.py'], input=source_code.encode('utf-8'),
+                               cwd=REPOSITORY, capture_output=True, check=True)
+    assert completed.stdout.decode('utf-8') == expected_output(source_code)
@@ -0,0 +1,45 @@
+#### File: tests/test_streaming.py
+#### Authors: Team 31 - BERNAD Thomas (50221636) & GUICHARD Lucas (50221623)
+#### Description: Streaming mode of SyntaxAnalyzer against the whole-tree mode
+
+import pytest
+
+from parse_tree_io import iter_tree_lines
+from syntax_analyzer import ArenaSyntaxAnalyzer, SyntaxAnalyzer, iter_file_tokens, tokenize
+
+
+SOURCES = {
+    'ascii': 'int a = 1;\nint b = a + 2;\nString s = "ab";\n',
+    'non_ascii': "int bé = 1;\nchar c = 'é';\nString s = \"naïve\";\nint x٣ = ٣;\n",
+    # Syntax errors, the last one at the end of the input
+    'errors': 'int a = 1;\nint = 2;\nint b = (\n',
+}
+
+
+@pytest.mark.parametrize('name', sorted(SOURCES))
+def test_streamed_declarations_match_whole_tree(tmp_path, name):
+    source_code = SOURCES[name]
+    path = tmp_path / f'{name}.java'
+    path.write_text(source_code, encoding='utf-8')
+    analyzer = SyntaxAnalyzer(tokenize(source_code), recover=True)
+    analyzer.parse()
+    expected = [list(iter_tree_lines(decl)) for decl in analyzer.parse_tree.children]
+    streaming_analyzer = SyntaxAnalyzer(iter_file_tokens(str(path)), recover=True)
+    streamed = [list(iter_tree_lines(decl)) for decl in streaming_analyzer.iter_decls()]
+    assert streamed == expected
+    assert [str(error) for error in streaming_analyzer.diagnostics] == [str(error) for error in analyzer.diagnostics]
+    # Non-ASCII identifiers and literals are kept whole
+    assert any('é' in line for lines in streamed for line in lines) == ('é' in source_code)
+
+
+@pytest.mark.parametrize('name', sorted(SOURCES))
+def test_on_decl_of_the_arena_analyzer_matches_syntax_analyzer(name):
+    source_code = SOURCES[name]
+    results = []
+    for analyzer_class in (SyntaxAnalyzer, ArenaSyntaxAnalyzer):
+        analyzer = analyzer_class(tokenize(source_code), recover=True)
+        declarations = []
+        analyzer.parse(on_decl=lambda decl: declarations.append(list(iter_tree_lines(decl))))
+        results.append((declarations, [str(error) for error in analyzer.diagnostics],
+                        list(iter_tree_lines(analyzer.parse_tree))))
+    assert results[1] == results[0]